@@ -0,0 +1,35 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Header
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.core.profiler import profiler
+from core.utils import create_error_response, create_success_response
+
+router = APIRouter(prefix='/admin', tags=['admin'])
+
+
+def _authorized(token: Optional[str]) -> bool:
+    """Admin endpoints are disabled unless ADMIN_TOKEN is configured."""
+    return bool(settings.admin_token) and hmac.compare_digest(token or '', settings.admin_token)
+
+
+@router.get('/profile')
+async def profile_status(x_admin_token: Optional[str] = Header(default=None)):
+    """Report how many analyses are still going to be profiled and recent outputs."""
+    if not _authorized(x_admin_token):
+        return JSONResponse(create_error_response('Forbidden', 'auth'), status_code=403)
+    return create_success_response(profiler.status())
+
+
+@router.post('/profile')
+async def arm_profiler(count: int = 1, mode: Optional[str] = None, interval_ms: Optional[float] = None,
+                       x_admin_token: Optional[str] = Header(default=None)):
+    """Profile the next `count` analyses (count=0 disarms)."""
+    if not _authorized(x_admin_token):
+        return JSONResponse(create_error_response('Forbidden', 'auth'), status_code=403)
+    try:
+        profiler.arm(count, mode, interval_ms)
+    except ValueError as e:
+        return JSONResponse(create_error_response(str(e), 'validation'), status_code=400)
+    return create_success_response(profiler.status(), f'Profiling the next {profiler.remaining} analyses')
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi import APIRouter, File, Form, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.config import settings
+from app.core.image_header import ImageRejected, inspect_image
+from app.core.rate_limit import RateLimitExceeded, analysis_slots, client_ip, rate_limiter
+from app.core.tracing import traced_request
+from app.services.analysis_service import analysis_service
+from app.services.video_service import video_service
+from core.utils import create_error_response, create_success_response
+
+router = APIRouter(prefix='/api', tags=['analysis'])
+
+
+async def _read_upload(upload: UploadFile) -> bytes:
+    """Validate and read an uploaded image."""
+    extension = os.path.splitext(upload.filename or '')[1].lower()
+    if extension not in settings.allowed_extensions:
+        raise ValueError(f'Invalid file type: {upload.filename}')
+
+    data = await upload.read()
+    if len(data) > settings.max_file_size:
+        raise ValueError(f'File too large: {upload.filename}')
+    try:
+        inspect_image(data)
+    except ImageRejected as e:
+        raise ValueError(f'{upload.filename}: {e}')
+    return data
+
+
+def _parse_boxes(text: Optional[str]) -> Optional[List[Tuple[int, int, int, int]]]:
+    """Face boxes given as a JSON list of [x, y, w, h] (in analyzed-image coordinates)."""
+    if not text:
+        return None
+    try:
+        boxes = [tuple(int(v) for v in box) for box in json.loads(text)]
+    except (TypeError, ValueError):
+        raise ValueError('boxes must be a JSON list of [x, y, w, h] lists')
+    if any(len(box) != 4 or box[2] <= 0 or box[3] <= 0 for box in boxes):
+        raise ValueError('boxes must be a JSON list of [x, y, w, h] lists')
+    if len(boxes) > settings.max_faces:
+        raise ValueError(f'Too many face boxes (maximum {settings.max_faces})')
+    return boxes
+
+
+def _save_video(upload: UploadFile) -> str:
+    """Validate a video upload and spool it to a temporary file (VideoCapture needs a path)."""
+    extension = os.path.splitext(upload.filename or '')[1].lower()
+    if extension not in settings.video_extensions:
+        raise ValueError(f'Invalid video type: {upload.filename}')
+
+    upload.file.seek(0, os.SEEK_END)
+    size = upload.file.tell()
+    upload.file.seek(0)
+    if size > settings.max_video_file_size:
+        raise ValueError(f'File too large: {upload.filename}')
+
+    with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as f:
+        shutil.copyfileobj(upload.file, f)
+    return f.name
+
+
+def _admit(request: Request, count: int) -> Callable[[], None]:
+    """Charge the client's quota and reserve analysis slots; returns the slot release."""
+    rate_limiter.check('api', cost=count, ip=client_ip(request.scope))
+    return analysis_slots.reserve('api', count)
+
+
+def _rejected(error: RateLimitExceeded) -> JSONResponse:
+    return JSONResponse(create_error_response(str(error), 'rate_limit'), status_code=429,
+                        headers={'Retry-After': str(math.ceil(error.retry_after))})
+
+
+@traced_request('api')
+async def _analyze_upload(filename: str, data: bytes) -> Dict[str, Any]:
+    """Analyze one image, reporting failures per file instead of failing the request."""
+    start = time.perf_counter()
+    try:
+        result = await analysis_service.analyze_bytes(data)
+        result['error'] = None
+    except Exception as e:
+        result = {'error': str(e)}
+    result['filename'] = filename
+    result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+
+async def _read_batch(files: List[UploadFile]) -> Tuple[List[Tuple[str, bytes]], List[Dict[str, Any]]]:
+    """Read all uploads up front; invalid files become per-file errors."""
+    if len(files) > settings.api_max_batch_files:
+        raise ValueError(f'Too many files (maximum {settings.api_max_batch_files})')
+
+    valid, invalid = [], []
+    for upload in files:
+        try:
+            valid.append((upload.filename, await _read_upload(upload)))
+        except ValueError as e:
+            invalid.append({'filename': upload.filename, 'error': str(e)})
+    return valid, invalid
+
+
+@router.post('/analyze')
+async def analyze(request: Request, file: UploadFile = File(...)):
+    """Analyze a single image and return skin tone analysis plus recommendations."""
+    try:
+        data = await _read_upload(file)
+    except ValueError as e:
+        return JSONResponse(create_error_response(str(e), 'validation'), status_code=400)
+
+    try:
+        release = _admit(request, 1)
+    except RateLimitExceeded as e:
+        return _rejected(e)
+    try:
+        result = await _analyze_upload(file.filename, data)
+    finally:
+        release()
+    if result['error'] is not None:
+        return JSONResponse(create_error_response(result['error'], 'analysis'), status_code=422)
+    return create_success_response(result)
+
+
+@router.post('/analyze/batch')
+async def analyze_batch(request: Request, files: List[UploadFile] = File(...)):
+    """Analyze several images; results are returned in upload order."""
+    try:
+        valid, invalid = await _read_batch(files)
+    except ValueError as e:
+        return JSONResponse(create_error_response(str(e), 'validation'), status_code=400)
+
+    try:
+        release = _admit(request, len(valid))
+    except RateLimitExceeded as e:
+        return _rejected(e)
+    try:
+        results = await asyncio.gather(*(_analyze_upload(name, data) for name, data in valid))
+    finally:
+        release()
+    return create_success_response(invalid + list(results))
+
+
+@router.post('/analyze/stream')
+async def analyze_stream(request: Request, files: List[UploadFile] = File(...)):
+    """Analyze several images, streaming each result as NDJSON as soon as it is ready."""
+    try:
+        valid, invalid = await _read_batch(files)
+    except ValueError as e:
+        return JSONResponse(create_error_response(str(e), 'validation'), status_code=400)
+
+    try:
+        release = _admit(request, len(valid))
+    except RateLimitExceeded as e:
+        return _rejected(e)
+    # Start the analyses now so the slots are released even if the client never reads the stream
+    pending = [asyncio.ensure_future(_analyze_upload(name, data)) for name, data in valid]
+    asyncio.gather(*pending).add_done_callback(lambda _: release())
+
+    async def results():
+        for item in invalid:
+            yield json.dumps(item) + '\n'
+        for next_result in asyncio.as_completed(pending):
+            yield json.dumps(await next_result) + '\n'
+
+    return StreamingResponse(results(), media_type='application/x-ndjson')
+
+
+@traced_request('api')
+async def _analyze_faces_upload(data: bytes, boxes: Optional[List[Tuple[int, int, int, int]]]) -> Dict[str, Any]:
+    return await analysis_service.analyze_faces_bytes(data, boxes)
+
+
+@router.post('/analyze/faces')
+async def analyze_faces(request: Request, file: UploadFile = File(...), boxes: Optional[str] = Form(None)):
+    """Analyze every face of an image (or the given face boxes) separately."""
+    try:
+        data = await _read_upload(file)
+        face_boxes = _parse_boxes(boxes)
+    except ValueError as e:
+        return JSONResponse(create_error_response(str(e), 'validation'), status_code=400)
+
+    try:
+        release = _admit(request, 1)
+    except RateLimitExceeded as e:
+        return _rejected(e)
+    try:
+        result = await _analyze_faces_upload(data, face_boxes)
+    except Exception as e:
+        return JSONResponse(create_error_response(f'{file.filename}: {e}', 'analysis'), status_code=422)
+    finally:
+        release()
+    result['filename'] = file.filename
+    return create_success_response(result)
+
+
+@traced_request('api')
+async def _analyze_video_file(path: str) -> Dict[str, Any]:
+    return await video_service.analyze_file(path)
+
+
+@router.post('/analyze/video')
+async def analyze_video(request: Request, file: UploadFile = File(...)):
+    """Analyze a video clip: sampled frames, face tracking and a smoothed skin tone estimate."""
+    # Admitted before the upload is spooled to disk, which is already real work for a video
+    try:
+        release = _admit(request, 1)
+    except RateLimitExceeded as e:
+        return _rejected(e)
+    try:
+        try:
+            path = await asyncio.to_thread(_save_video, file)
+        except ValueError as e:
+            return JSONResponse(create_error_response(str(e), 'validation'), status_code=400)
+        try:
+            result = await _analyze_video_file(path)
+        except Exception as e:
+            return JSONResponse(create_error_response(f'{file.filename}: {e}', 'analysis'), status_code=422)
+        finally:
+            os.unlink(path)
+    finally:
+        release()
+    result['filename'] = file.filename
+    return create_success_response(result)
@@ -0,0 +1,13 @@
+from typing import Optional
+from fastapi import APIRouter, Header
+from starlette.responses import Response
+from app.core.assets import ASSET_PREFIX, assets
+
+router = APIRouter(prefix=ASSET_PREFIX, tags=['assets'])
+
+
+@router.get('/{name}', include_in_schema=False)
+async def asset(name: str, accept_encoding: str = Header(default=''),
+                if_none_match: Optional[str] = Header(default=None)) -> Response:
+    """Serve a fingerprinted static file, precompressed and cacheable forever."""
+    return assets.response(name, accept_encoding, if_none_match)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import registry
+
+router = APIRouter(tags=['monitoring'])
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Expose latency histograms, counters and gauges in Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
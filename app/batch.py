@@ -0,0 +1,283 @@
+"""Offline batch analysis of image (and video) directories.
+
+Usage:
+    python -m app.batch PHOTO_DIR [--output results.jsonl] [--workers N] [--no-videos]
+
+Results are streamed as JSON lines (one per file, with per-stage timings).
+Video clips are sampled frame by frame (see app.services.video_service) and
+their frame throughput is reported alongside the image throughput.
+Completed files are recorded in a manifest next to the output so an
+interrupted run can be restarted and will skip work it already finished.
+Failed files are recorded there too, marked as failed, and retried by the
+next run. A file whose worker process dies (e.g. killed for running out of
+memory) does not end the run: the pool is replaced and the files that were in
+flight are retried one at a time, so only the one that kills a worker on its
+own is recorded as failed.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from app.config import settings
+from app.core.concurrency import detect_cpus, limit_native_threads
+from app.models.analysis import AnalysisResult
+
+# Per-process service instances (created once by the pool initializer)
+_color_service = None
+_image_service = None
+_video_service = None
+
+
+def _init_worker():
+    """Create the services once per worker process."""
+    global _color_service, _image_service, _video_service
+    # Each process already gets its own core, so native libraries must not fan out further
+    limit_native_threads(1)
+    from app.services.color_service import ColorService
+    from app.services.image_service import ImageService
+    from app.services.video_service import VideoService
+
+    _color_service = ColorService()
+    _image_service = ImageService()
+    _video_service = VideoService(_image_service, _color_service)
+
+
+def is_video(file_path: str) -> bool:
+    return os.path.splitext(file_path)[1].lower() in {ext.lower() for ext in settings.video_extensions}
+
+
+async def _analyze_video(file_path: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    result = await _video_service.analyze_video(file_path)
+    video = result['analysis']['analysis_metadata']['video']
+    timings = {'analyze_ms': video['elapsed_s'] * 1000, 'total_ms': (time.perf_counter() - start) * 1000}
+    encoded = AnalysisResult.from_dicts(result['analysis'], result['recommendations']).to_bytes()
+    return {'result': encoded, 'timings': timings, 'frames_read': video['frames_read']}
+
+
+async def _analyze(file_path: str) -> Dict[str, Any]:
+    if is_video(file_path):
+        return await _analyze_video(file_path)
+    timings = {}
+
+    start = time.perf_counter()
+    image = await _image_service.load_image(file_path)
+    timings['load_ms'] = (time.perf_counter() - start) * 1000
+
+    stage_start = time.perf_counter()
+    analysis = await _color_service.analyze_skin_tone(image)
+    timings['analyze_ms'] = (time.perf_counter() - stage_start) * 1000
+
+    stage_start = time.perf_counter()
+    recommendations = await _color_service.get_color_recommendations(analysis)
+    timings['recommend_ms'] = (time.perf_counter() - stage_start) * 1000
+
+    timings['total_ms'] = (time.perf_counter() - start) * 1000
+    # Results cross the process boundary in their compact binary encoding
+    encoded = AnalysisResult.from_dicts(analysis, recommendations).to_bytes()
+    return {'result': encoded, 'timings': timings}
+
+
+def analyze_file(file_path: str) -> Dict[str, Any]:
+    """Analyze a single image or video inside a worker process."""
+    start = time.perf_counter()
+    try:
+        result = asyncio.run(_analyze(file_path))
+        result['error'] = None
+    except Exception as e:
+        result = {'error': str(e), 'timings': {'total_ms': (time.perf_counter() - start) * 1000}}
+    result['file'] = file_path
+    return result
+
+
+def find_images(directory: str, videos: bool = True) -> Iterator[str]:
+    """Yield image (and video) files under a directory in a stable order."""
+    extensions = {ext.lower() for ext in settings.allowed_extensions}
+    if videos:
+        extensions |= {ext.lower() for ext in settings.video_extensions}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in extensions:
+                yield os.path.join(root, name)
+
+
+# Manifest lines of failed files: the key, this marker and the error
+_FAILED = '\tfailed\t'
+
+
+def _manifest_key(file_path: str) -> str:
+    stat = os.stat(file_path)
+    return f'{os.path.abspath(file_path)}\t{stat.st_size}\t{int(stat.st_mtime)}'
+
+
+def load_manifest(manifest_path: str) -> Set[str]:
+    """Read the keys of files completed by previous runs (failed ones are left out, to be retried)."""
+    if not os.path.exists(manifest_path):
+        return set()
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return {line.rstrip('\n') for line in f if line.strip() and _FAILED not in line}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_batch(directory: str, output_path: str, manifest_path: Optional[str] = None,
+              workers: Optional[int] = None, videos: bool = True) -> Dict[str, Any]:
+    """Analyze every image (and video) under a directory and stream results to JSONL."""
+    manifest_path = manifest_path or f'{output_path}.manifest'
+    workers = workers or detect_cpus()[0]
+
+    completed = load_manifest(manifest_path)
+    pending = []
+    skipped = 0
+    for file_path in find_images(directory, videos):
+        key = _manifest_key(file_path)
+        if key in completed:
+            skipped += 1
+        else:
+            pending.append((file_path, key))
+
+    latencies: List[float] = []
+    errors = 0
+    images = 0
+    video_frames = 0
+    video_seconds = 0.0
+    start = time.perf_counter()
+
+    queue = iter(pending)
+    # Files in flight when a worker process died, retried one at a time
+    suspects = deque()
+    window = workers * 2
+    in_flight = {}
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+    def fill(pool: ProcessPoolExecutor):
+        """Keep a bounded window of submissions so results stream as they finish."""
+        while len(in_flight) < window:
+            if suspects:
+                if not in_flight:
+                    file_path, key = suspects.popleft()
+                    in_flight[pool.submit(analyze_file, file_path)] = (file_path, key, True)
+                return
+            item = next(queue, None)
+            if item is None:
+                return
+            in_flight[pool.submit(analyze_file, item[0])] = (*item, False)
+
+    with open(output_path, 'a', encoding='utf-8') as output, \
+            open(manifest_path, 'a', encoding='utf-8') as manifest:
+        pool = new_pool()
+        broken = False
+        try:
+            fill(pool)
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, key, alone = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                        if 'result' in result:
+                            result.update(AnalysisResult.from_bytes(result.pop('result')).to_dict())
+                    except BrokenProcessPool:
+                        broken = True
+                        if not alone:
+                            suspects.append((file_path, key))
+                            continue
+                        result = {'error': 'Worker process died analyzing this file', 'timings': {}, 'file': file_path}
+                    except Exception as e:
+                        result = {'error': f'{type(e).__name__}: {e}', 'timings': {}, 'file': file_path}
+
+                    output.write(json.dumps(result) + '\n')
+                    output.flush()
+
+                    images += not is_video(file_path)
+                    if result['error'] is None:
+                        latencies.append(result['timings']['total_ms'])
+                        if 'frames_read' in result:
+                            video_frames += result['frames_read']
+                            video_seconds += result['timings']['analyze_ms'] / 1000
+                        manifest.write(key + '\n')
+                    else:
+                        errors += 1
+                        manifest.write(key + _FAILED + ' '.join(result['error'].split()) + '\n')
+                    manifest.flush()
+
+                # Every other future of a broken pool fails too; replace it once they are all in
+                if broken and not in_flight:
+                    pool.shutdown(wait=False)
+                    pool, broken = new_pool(), False
+                if not broken:
+                    fill(pool)
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    processed = len(latencies) + errors
+
+    return {
+        'processed': processed,
+        'succeeded': len(latencies),
+        'errors': errors,
+        'skipped': skipped,
+        'workers': workers,
+        'elapsed_s': elapsed,
+        # Videos take far longer than images, so only images count here
+        'images': images,
+        'images_per_sec': images / elapsed if elapsed > 0 else 0.0,
+        'video_frames': video_frames,
+        # Per worker: frames read / time spent in the video sampling loops
+        'video_frames_per_sec': video_frames / video_seconds if video_seconds > 0 else 0.0,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Batch skin tone analysis of an image directory.')
+    parser.add_argument('directory', help='Directory to scan (recursively) for images')
+    parser.add_argument('--output', '-o', default='batch_results.jsonl', help='JSONL output file (appended to)')
+    parser.add_argument('--manifest', help='Manifest of completed files (default: <output>.manifest)')
+    parser.add_argument('--workers', '-w', type=int, help='Worker processes (default: usable CPUs)')
+    parser.add_argument('--no-videos', action='store_true', help='Skip video files')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f'Not a directory: {args.directory}')
+
+    summary = run_batch(args.directory, args.output, args.manifest, args.workers, videos=not args.no_videos)
+
+    print(
+        f"Processed {summary['processed']} files ({summary['errors']} errors, "
+        f"{summary['skipped']} skipped) in {summary['elapsed_s']:.1f}s with {summary['workers']} workers",
+        file=sys.stderr
+    )
+    if summary['video_frames']:
+        print(f"Video: {summary['video_frames']} frames read at {summary['video_frames_per_sec']:.1f} frames/sec per worker",
+              file=sys.stderr)
+    print(
+        f"Throughput: {summary['images_per_sec']:.2f} images/sec ({summary['images']} images), "
+        f"latency p50 {summary['p50_ms']:.0f} ms, p95 {summary['p95_ms']:.0f} ms",
+        file=sys.stderr
+    )
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
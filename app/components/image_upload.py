@@ -3,12 +3,15 @@ import uuid
 from typing import Callable, Optional
 from nicegui import ui, events
 from app.config import settings
+from app.core.image_header import FORMAT_EXTENSIONS, ImageRejected, inspect_image
+from app.core.rate_limit import RateLimitExceeded
 
 class ImageUploadComponent:
     """Component for handling image uploads with drag-and-drop functionality."""
     
-    def __init__(self, on_upload: Callable[[str, str], None]):
+    def __init__(self, on_upload: Callable[[str, str], None], admit: Optional[Callable[[], None]] = None):
         self.on_upload = on_upload
+        self.admit = admit
         self.upload_area = None
         self.file_info = None
         self.create_component()
@@ -56,17 +59,25 @@ class ImageUploadComponent:
                 ui.notify(f'❌ Invalid file type. Please upload an image file.', type='negative')
                 return
             
-            # Generate unique filename
-            file_extension = os.path.splitext(e.name)[1].lower()
+            # Rate limits are checked before anything is written to disk
+            if self.admit is not None:
+                self.admit()
+            
+            # Check the real format and dimensions from the header, before anything is decoded
+            plan = inspect_image(e.content)
+            
+            # Generate unique filename (with the extension of the real format)
+            file_extension = FORMAT_EXTENSIONS[plan.header.format][0]
             unique_filename = f"{uuid.uuid4()}{file_extension}"
-            file_path = os.path.join(settings.upload_dir, unique_filename)
+            file_path = os.path.join(settings.ensure_upload_dir(), unique_filename)
             
             # Save uploaded file
+            data = e.content.read()
             with open(file_path, 'wb') as f:
-                f.write(e.content.read())
+                f.write(data)
             
             # Update file info display
-            self._update_file_info(e.name, len(e.content.read()))
+            self._update_file_info(e.name, len(data))
             
             # Notify success
             ui.notify(f'✅ Image uploaded successfully: {e.name}', type='positive')
@@ -74,6 +85,10 @@ class ImageUploadComponent:
             # Call the upload callback
             await self.on_upload(file_path, e.name)
             
+        except RateLimitExceeded as error:
+            ui.notify(f'⏳ {str(error)}', type='warning')
+        except ImageRejected as error:
+            ui.notify(f'❌ {str(error)}', type='negative')
         except Exception as error:
             ui.notify(f'❌ Upload failed: {str(error)}', type='negative')
             print(f"Upload error: {error}")
@@ -0,0 +1,171 @@
+import base64
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from nicegui import ui, events
+from app.config import settings
+from app.core.metrics import timed
+
+# Browser side: capture the camera into a <video>, and every 1/fps seconds draw
+# a downscaled frame onto a canvas and send it as a JPEG data URL over the
+# NiceGUI websocket. Frames are not queued in the browser either: while the
+# tab is hidden, or the camera has no frame yet, the tick is skipped.
+_START_SCRIPT = '''
+(async () => {
+    const live = window.colorHarmonyLive = window.colorHarmonyLive || {};
+    if (live[%(id)s]) return;
+    const video = document.getElementById('c%(id)s');
+    try {
+        const stream = await navigator.mediaDevices.getUserMedia({video: {width: {ideal: 640}}, audio: false});
+        video.srcObject = stream;
+        await video.play();
+        const canvas = document.createElement('canvas');
+        const context = canvas.getContext('2d');
+        const timer = setInterval(() => {
+            if (document.hidden || !video.videoWidth) return;
+            canvas.width = %(width)s;
+            canvas.height = Math.round(video.videoHeight * %(width)s / video.videoWidth);
+            context.drawImage(video, 0, 0, canvas.width, canvas.height);
+            emitEvent('live_frame_%(id)s', canvas.toDataURL('image/jpeg', %(quality)s));
+        }, %(interval)s);
+        live[%(id)s] = {stream, timer};
+    } catch (error) {
+        emitEvent('live_error_%(id)s', error.message || String(error));
+    }
+})();
+'''
+
+_STOP_SCRIPT = '''
+(() => {
+    const live = window.colorHarmonyLive || {};
+    const session = live[%(id)s];
+    if (!session) return;
+    clearInterval(session.timer);
+    session.stream.getTracks().forEach(track => track.stop());
+    document.getElementById('c%(id)s').srcObject = null;
+    delete live[%(id)s];
+})();
+'''
+
+
+class LiveCameraComponent:
+    """Component for live skin tone analysis of the camera stream."""
+
+    def __init__(self, on_frame: Callable[[bytes], Awaitable[Optional[Dict[str, Any]]]],
+                 on_stop: Optional[Callable[[], None]] = None, stats: Optional[Callable[[], Dict[str, int]]] = None):
+        self.on_frame = on_frame
+        self.on_stop = on_stop
+        self.stats = stats
+        self.running = False
+        self.shown: Dict[str, Any] = {}
+        self.status_updated = 0.0
+        self.create_component()
+
+    def create_component(self):
+        """Create the live camera UI component."""
+        self.container = ui.element('div').classes('w-full')
+
+        with self.container:
+            with ui.row().classes('w-full gap-6'):
+                with ui.column().classes('flex-1'):
+                    self.video = ui.element('video').props('autoplay muted playsinline').classes('w-full max-w-md rounded-lg shadow-md bg-gray-100')
+                    with ui.row().classes('gap-2 mt-2'):
+                        self.start_button = ui.button('Start Camera', icon='videocam', on_click=self.start).props('color="primary"')
+                        self.stop_button = ui.button('Stop', icon='videocam_off', on_click=self.stop).props('flat color="grey"')
+                    self.status_label = ui.label('Camera is off').classes('text-sm text-gray-500')
+
+                with ui.column().classes('flex-1'):
+                    ui.label('Live Results').classes('text-lg font-semibold mb-3')
+                    with ui.card().classes('w-full p-4'):
+                        with ui.row().classes('items-center gap-3 mb-3'):
+                            self.swatch = ui.element('div').style('width: 40px; height: 40px; background-color: #eee; border-radius: 8px; border: 2px solid #ddd;')
+                            with ui.column().classes('gap-1'):
+                                self.category_label = ui.label('—').classes('font-medium')
+                                self.undertone_label = ui.label('').classes('text-sm text-gray-600')
+                        ui.label('Best colors right now').classes('text-sm font-medium text-gray-700')
+                        self.palette = ui.row().classes('gap-2 mt-2')
+
+        ui.on(f'live_frame_{self.video.id}', self._handle_frame)
+        ui.on(f'live_error_{self.video.id}', self._handle_error)
+
+    def _script(self, template: str) -> str:
+        return template % {
+            'id': self.video.id,
+            'width': settings.live_frame_width,
+            'quality': settings.live_jpeg_quality,
+            'interval': int(1000 / max(settings.live_fps, 0.1)),
+        }
+
+    def start(self):
+        """Ask the browser for the camera and start streaming frames."""
+        self.running = True
+        self.status_label.text = 'Starting camera...'
+        ui.run_javascript(self._script(_START_SCRIPT))
+
+    def stop(self):
+        """Stop the camera and forget the warm starts."""
+        self.running = False
+        ui.run_javascript(self._script(_STOP_SCRIPT))
+        self.status_label.text = 'Camera is off'
+        if self.on_stop is not None:
+            self.on_stop()
+
+    def _handle_error(self, e: events.GenericEventArguments):
+        self.running = False
+        self.status_label.text = 'Camera is off'
+        ui.notify(f'❌ Could not start the camera: {e.args}', type='negative')
+
+    async def _handle_frame(self, e: events.GenericEventArguments):
+        """Analyze a frame and push only what changed."""
+        if not self.running:
+            return
+        data_url = e.args[0] if isinstance(e.args, list) else e.args
+        try:
+            data = base64.b64decode(str(data_url).partition(',')[2], validate=True)
+        except ValueError:
+            return
+
+        result = await self.on_frame(data)
+        if result is not None:
+            await self.update_live(result['analysis'], result['recommendations'])
+        self._update_status(result)
+
+    @timed('ui.update_live')
+    async def update_live(self, analysis: Dict[str, Any], recommendations: Optional[Dict[str, Any]]):
+        """Update the live results; elements are only touched when their value changed.
+
+        Category, undertone and palette come with recommendations, which are
+        only sent once a change has settled.
+        """
+        self._set('primary_color', analysis['primary_color'],
+                  lambda color: self.swatch.style(f'background-color: {color}'))
+        if recommendations is not None:
+            self._set('category', recommendations['category'], lambda text: setattr(self.category_label, 'text', text))
+            self._set('undertone', recommendations['undertone'],
+                      lambda text: setattr(self.undertone_label, 'text', f'{text.title()} undertone'))
+            colors = recommendations.get('best_colors', [])[:8]
+            self._set('palette', tuple(color['hex'] for color in colors), lambda _: self._show_palette(colors))
+
+    def _set(self, name: str, value: Any, apply: Callable[[Any], None]):
+        if self.shown.get(name) != value:
+            self.shown[name] = value
+            apply(value)
+
+    def _show_palette(self, colors: List[Dict[str, Any]]):
+        self.palette.clear()
+        with self.palette:
+            for color in colors:
+                ui.element('div').style(
+                    f'width: 32px; height: 32px; background-color: {color["hex"]}; border-radius: 6px; border: 1px solid #ddd;'
+                ).tooltip(color.get('name', color['hex']))
+
+    def _update_status(self, result: Optional[Dict[str, Any]]):
+        """Frame time and drop counts, refreshed at most once a second."""
+        now = time.monotonic()
+        if now - self.status_updated < 1.0:
+            return
+        self.status_updated = now
+        counts = self.stats() if self.stats is not None else {}
+        analyzed = counts.get('changed', 0) + counts.get('unchanged', 0)
+        skipped = sum(counts.values()) - analyzed
+        frame_time = f'{result["elapsed_ms"]:.0f} ms/frame, ' if result is not None else ''
+        self.status_label.text = f'Live: {frame_time}{analyzed} frames analyzed, {skipped} skipped'
@@ -0,0 +1,82 @@
+from typing import Any, Callable, Dict, Generic, Hashable, List, Protocol, Sequence, TypeVar
+from nicegui import ui
+
+
+class View(Protocol):
+    """A piece of UI built once (root element) and updated in place from new data."""
+    root: ui.element
+
+    def update(self, item: Any) -> None: ...
+
+
+V = TypeVar('V', bound=View)
+
+
+class Shown:
+    """Last value applied per name, so unchanged values are not sent again.
+
+    NiceGUI already skips assignments of equal text and values, but style(),
+    classes() and props() always send the element; route those through set().
+    """
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+
+    def set(self, name: str, value: Any, apply: Callable[[Any], Any]) -> bool:
+        """Apply value unless it is the one applied last; returns whether it was applied."""
+        if name in self.values and self.values[name] == value:
+            return False
+        self.values[name] = value
+        apply(value)
+        return True
+
+    def clear(self):
+        self.values.clear()
+
+
+class KeyedList(Generic[V]):
+    """Children of a container reconciled by key, like a keyed list in a virtual DOM.
+
+    Views of keys that stay are updated in place (and only moved when their
+    position changed), views of new keys are created and stale ones deleted,
+    so an update of an unchanged list sends nothing.
+    """
+
+    def __init__(self, container: ui.element, create: Callable[[Any], V], key: Callable[[Any], Hashable]):
+        self.container = container
+        self.create = create
+        self.key = key
+        self.views: Dict[Hashable, V] = {}
+
+    def update(self, items: Sequence[Any]) -> List[V]:
+        """Show items in this order; returns their views."""
+        keys = self._keys(items)
+        for key in set(self.views) - set(keys):
+            self.container.remove(self.views.pop(key).root)
+
+        views = []
+        for index, (key, item) in enumerate(zip(keys, items)):
+            view = self.views.get(key)
+            if view is None:
+                with self.container:
+                    view = self.views[key] = self.create(item)
+            else:
+                view.update(item)
+            if self.container.default_slot.children.index(view.root) != index:
+                view.root.move(self.container, target_index=index)
+            views.append(view)
+        return views
+
+    def clear(self):
+        self.container.clear()
+        self.views.clear()
+
+    def _keys(self, items: Sequence[Any]) -> List[Hashable]:
+        """Item keys, numbered when an item repeats so every view stays distinct."""
+        seen: Dict[Hashable, int] = {}
+        keys = []
+        for item in items:
+            key = self.key(item)
+            seen[key] = seen.get(key, 0) + 1
+            keys.append(key if seen[key] == 1 else (key, seen[key]))
+        return keys
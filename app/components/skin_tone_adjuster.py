@@ -1,14 +1,64 @@
 import asyncio
-from typing import Dict, Any, Callable, Optional
+import base64
+import io
+from typing import Dict, Any, Callable, Optional, Awaitable, List
 import numpy as np
+from PIL import Image
 from nicegui import ui
+from app.core.metrics import timed
+from app.core.rate_limit import RateLimitExceeded
+
+# Quick presets offered next to the sliders (also used by the compare mode)
+PRESETS = [
+    {
+        'name': '☀️ Warmer Tone',
+        'description': 'Add golden warmth',
+        'adjustments': {'brightness': 5, 'warmth': 15, 'saturation': 5, 'hue_shift': 0}
+    },
+    {
+        'name': '❄️ Cooler Tone', 
+        'description': 'Add cool undertones',
+        'adjustments': {'brightness': 0, 'warmth': -15, 'saturation': 0, 'hue_shift': 0}
+    },
+    {
+        'name': '✨ Brighter',
+        'description': 'Increase brightness',
+        'adjustments': {'brightness': 20, 'warmth': 0, 'saturation': 10, 'hue_shift': 0}
+    },
+    {
+        'name': '🌙 Softer',
+        'description': 'Soften and mute',
+        'adjustments': {'brightness': -10, 'warmth': 0, 'saturation': -15, 'hue_shift': 0}
+    },
+    {
+        'name': '🌺 Enhanced',
+        'description': 'Boost vibrancy',
+        'adjustments': {'brightness': 10, 'warmth': 5, 'saturation': 20, 'hue_shift': 0}
+    }
+]
+
+class _Slider(ui.slider):
+    """Slider whose moves are not echoed back: the browser already shows the new position."""
+    LOOPBACK = False
+
 
 class SkinToneAdjusterComponent:
-    """Component for adjusting skin tone with real-time preview."""
+    """Component for adjusting skin tone with real-time preview.
+    
+    The controls are built once, on the first image. The current adjustment
+    values are labels bound to the sliders, so a slider move sends a single
+    label update instead of rebuilding the values grid.
+    """
     
-    def __init__(self, on_adjust: Callable[[Dict[str, Any]], None]):
+    def __init__(self, on_adjust: Callable[[Dict[str, Any]], None],
+                 on_history: Optional[Callable[[int], Awaitable[Optional[Dict[str, int]]]]] = None,
+                 on_compare: Optional[Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]] = None):
         self.on_adjust = on_adjust
+        self.on_history = on_history
+        self.on_compare = on_compare
         self.container = None
+        self.comparison_container = None
+        self.sliders: Dict[str, Any] = {}
         self.current_image: Optional[np.ndarray] = None
         self.adjustments = {
             'brightness': 0,
@@ -28,10 +78,18 @@ class SkinToneAdjusterComponent:
                 ui.icon('tune').classes('text-4xl mb-4')
                 ui.label('Upload an image to adjust skin tone').classes('text-lg')
     
+    @timed('ui.update_image')
     async def update_image(self, image: np.ndarray):
         """Update the component with a new image."""
         self.current_image = image
-        await self._create_adjustment_controls()
+        if not self.sliders:
+            await self._create_adjustment_controls()
+            return
+        
+        # A new image starts unadjusted
+        self.adjustments = {key: 0 for key in self.adjustments}
+        self._sync_sliders()
+        self.comparison_container.clear()
     
     async def _create_adjustment_controls(self):
         """Create the adjustment control interface."""
@@ -50,77 +108,59 @@ class SkinToneAdjusterComponent:
                         # Brightness control
                         with ui.card().classes('p-4 mb-4'):
                             ui.label('💡 Brightness').classes('font-medium mb-2')
-                            brightness_slider = ui.slider(
-                                min=-50, max=50, value=0, step=1
+                            brightness_slider = _Slider(
+                                min=-50, max=50, value=0, step=1,
+                                on_change=lambda e: self._update_adjustment('brightness', e.value)
                             ).classes('w-full').props('label-always')
-                            brightness_slider.on('update:model-value', lambda e: self._update_adjustment('brightness', e.args))
+                            self.sliders['brightness'] = brightness_slider
                             ui.label('Adjust overall lightness of your skin tone').classes('text-sm text-gray-500 mt-1')
                         
                         # Warmth control
                         with ui.card().classes('p-4 mb-4'):
                             ui.label('🌡️ Warmth').classes('font-medium mb-2')
-                            warmth_slider = ui.slider(
-                                min=-50, max=50, value=0, step=1
+                            warmth_slider = _Slider(
+                                min=-50, max=50, value=0, step=1,
+                                on_change=lambda e: self._update_adjustment('warmth', e.value)
                             ).classes('w-full').props('label-always')
-                            warmth_slider.on('update:model-value', lambda e: self._update_adjustment('warmth', e.args))
+                            self.sliders['warmth'] = warmth_slider
                             ui.label('Make skin tone warmer (yellow) or cooler (blue)').classes('text-sm text-gray-500 mt-1')
                         
                         # Saturation control
                         with ui.card().classes('p-4 mb-4'):
                             ui.label('🎨 Saturation').classes('font-medium mb-2')
-                            saturation_slider = ui.slider(
-                                min=-50, max=50, value=0, step=1
+                            saturation_slider = _Slider(
+                                min=-50, max=50, value=0, step=1,
+                                on_change=lambda e: self._update_adjustment('saturation', e.value)
                             ).classes('w-full').props('label-always')
-                            saturation_slider.on('update:model-value', lambda e: self._update_adjustment('saturation', e.args))
+                            self.sliders['saturation'] = saturation_slider
                             ui.label('Adjust color intensity and vibrancy').classes('text-sm text-gray-500 mt-1')
                         
                         # Hue shift control
                         with ui.card().classes('p-4 mb-4'):
                             ui.label('🌈 Hue Shift').classes('font-medium mb-2')
-                            hue_slider = ui.slider(
-                                min=-30, max=30, value=0, step=1
+                            hue_slider = _Slider(
+                                min=-30, max=30, value=0, step=1,
+                                on_change=lambda e: self._update_adjustment('hue_shift', e.value)
                             ).classes('w-full').props('label-always')
-                            hue_slider.on('update:model-value', lambda e: self._update_adjustment('hue_shift', e.args))
+                            self.sliders['hue_shift'] = hue_slider
                             ui.label('Shift the overall color hue').classes('text-sm text-gray-500 mt-1')
                         
                         # Control buttons
                         with ui.row().classes('gap-3 mt-6'):
                             ui.button('Reset All', on_click=self._reset_adjustments).props('flat color="grey"')
                             ui.button('Apply Changes', on_click=self._apply_adjustments).props('color="primary"')
+                        
+                        # History navigation (served from the session adjustment cache)
+                        if self.on_history is not None:
+                            with ui.row().classes('gap-3 mt-3'):
+                                ui.button('Undo', icon='undo', on_click=lambda: self._navigate_history(-1)).props('flat color="primary" size="sm"')
+                                ui.button('Redo', icon='redo', on_click=lambda: self._navigate_history(1)).props('flat color="primary" size="sm"')
                     
                     # Preset adjustments
                     with ui.column().classes('flex-1'):
                         ui.label('Quick Presets').classes('text-lg font-semibold mb-4')
                         
-                        presets = [
-                            {
-                                'name': '☀️ Warmer Tone',
-                                'description': 'Add golden warmth',
-                                'adjustments': {'brightness': 5, 'warmth': 15, 'saturation': 5, 'hue_shift': 0}
-                            },
-                            {
-                                'name': '❄️ Cooler Tone', 
-                                'description': 'Add cool undertones',
-                                'adjustments': {'brightness': 0, 'warmth': -15, 'saturation': 0, 'hue_shift': 0}
-                            },
-                            {
-                                'name': '✨ Brighter',
-                                'description': 'Increase brightness',
-                                'adjustments': {'brightness': 20, 'warmth': 0, 'saturation': 10, 'hue_shift': 0}
-                            },
-                            {
-                                'name': '🌙 Softer',
-                                'description': 'Soften and mute',
-                                'adjustments': {'brightness': -10, 'warmth': 0, 'saturation': -15, 'hue_shift': 0}
-                            },
-                            {
-                                'name': '🌺 Enhanced',
-                                'description': 'Boost vibrancy',
-                                'adjustments': {'brightness': 10, 'warmth': 5, 'saturation': 20, 'hue_shift': 0}
-                            }
-                        ]
-                        
-                        for preset in presets:
+                        for preset in PRESETS:
                             with ui.card().classes('p-4 mb-3 cursor-pointer hover:shadow-md transition-shadow'):
                                 ui.label(preset['name']).classes('font-medium mb-1')
                                 ui.label(preset['description']).classes('text-sm text-gray-600 mb-3')
@@ -128,34 +168,91 @@ class SkinToneAdjusterComponent:
                                     'Apply Preset',
                                     on_click=lambda p=preset: self._apply_preset(p['adjustments'])
                                 ).props('flat color="primary" size="sm"').classes('w-full')
+                        
+                        if self.on_compare is not None:
+                            ui.button(
+                                'Compare Presets', icon='compare', on_click=self._compare_presets
+                            ).props('outline color="primary"').classes('w-full mt-2')
+                
+                # Side-by-side preset comparison
+                self.comparison_container = ui.element('div').classes('w-full')
                 
                 # Current adjustment values display
                 with ui.card().classes('w-full p-4 mt-6 bg-gray-50'):
                     ui.label('Current Adjustments').classes('font-medium mb-3')
-                    self.adjustment_display = ui.element('div')
-                    self._update_adjustment_display()
+                    with ui.grid(columns=4).classes('gap-3'):
+                        for key, slider in self.sliders.items():
+                            with ui.element('div').classes('text-center'):
+                                ui.label(key.replace('_', ' ').title()).classes('text-sm font-medium')
+                                ui.label().classes('text-lg font-bold text-primary').bind_text_from(
+                                    slider, 'value', backward=lambda value: f'{int(value):+d}')
                 
         except Exception as e:
+            self.sliders.clear()
             self.container.clear()
             with self.container:
                 ui.label(f'Error creating adjustment controls: {str(e)}').classes('text-red-500')
             print(f"Error creating adjustment controls: {e}")
     
+    async def _compare_presets(self):
+        """Compute every preset at once and render the results side by side."""
+        self.comparison_container.clear()
+        with self.comparison_container:
+            with ui.row().classes('items-center gap-3 mt-6'):
+                ui.spinner(size='md')
+                ui.label('Comparing presets...').classes('text-gray-600')
+        
+        try:
+            results = await self.on_compare(PRESETS)
+        except RateLimitExceeded as e:
+            self.comparison_container.clear()
+            ui.notify(f'⏳ {str(e)}', type='warning')
+            return
+        except Exception as e:
+            self.comparison_container.clear()
+            ui.notify(f'❌ Error comparing presets: {str(e)}', type='negative')
+            print(f"Error comparing presets: {e}")
+            return
+        
+        self.comparison_container.clear()
+        with self.comparison_container:
+            ui.label('Preset Comparison').classes('text-lg font-semibold mt-6 mb-4')
+            with ui.grid(columns=len(results)).classes('w-full gap-4'):
+                for result in results:
+                    self._create_comparison_card(result)
+    
+    def _create_comparison_card(self, result: Dict[str, Any]):
+        """Create a card showing one preset's preview, tone and palette."""
+        preset = result['preset']
+        analysis = result['analysis']
+        recommendations = result['recommendations']
+        
+        with ui.card().classes('p-3'):
+            ui.image(self._preview_to_data_uri(result['preview'])).classes('w-full rounded-lg')
+            ui.label(preset['name']).classes('font-medium mt-2')
+            ui.label(f'{analysis["category"]} · {analysis["undertone"].title()}').classes('text-sm text-gray-600')
+            
+            with ui.row().classes('gap-1 mt-2'):
+                for color in recommendations.get('best_colors', [])[:5]:
+                    ui.element('div').style(
+                        f'width: 20px; height: 20px; background-color: {color["hex"]}; '
+                        f'border-radius: 4px; border: 1px solid #ddd;'
+                    )
+            
+            ui.button(
+                'Apply Preset',
+                on_click=lambda p=preset: self._apply_preset(p['adjustments'])
+            ).props('flat color="primary" size="sm"').classes('w-full mt-2')
+    
+    def _preview_to_data_uri(self, image: np.ndarray) -> str:
+        """Encode a preview render as a JPEG data URI."""
+        buffer = io.BytesIO()
+        Image.fromarray(image.astype('uint8')).save(buffer, format='JPEG', quality=80)
+        return f'data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode()}'
+    
     def _update_adjustment(self, adjustment_type: str, value):
-        """Update a specific adjustment value."""
+        """Update a specific adjustment value (the bound display follows the slider)."""
         self.adjustments[adjustment_type] = value
-        self._update_adjustment_display()
-    
-    def _update_adjustment_display(self):
-        """Update the current adjustments display."""
-        if hasattr(self, 'adjustment_display'):
-            self.adjustment_display.clear()
-            with self.adjustment_display:
-                with ui.grid(columns=4).classes('gap-3'):
-                    for key, value in self.adjustments.items():
-                        with ui.element('div').classes('text-center'):
-                            ui.label(key.replace('_', ' ').title()).classes('text-sm font-medium')
-                            ui.label(f'{value:+d}').classes('text-lg font-bold text-primary')
     
     async def _apply_adjustments(self):
         """Apply the current adjustments."""
@@ -165,10 +262,33 @@ class SkinToneAdjusterComponent:
                 ui.notify('🎨 Adjustments applied successfully!', type='positive')
             else:
                 ui.notify('❌ No image to adjust', type='negative')
+        except RateLimitExceeded as e:
+            ui.notify(f'⏳ {str(e)}', type='warning')
         except Exception as e:
             ui.notify(f'❌ Error applying adjustments: {str(e)}', type='negative')
             print(f"Error applying adjustments: {e}")
     
+    async def _navigate_history(self, direction: int):
+        """Step through previously applied adjustments."""
+        try:
+            adjustments = await self.on_history(direction)
+            if adjustments is None:
+                ui.notify('Nothing to undo' if direction < 0 else 'Nothing to redo', type='info')
+                return
+            
+            self.adjustments.update(adjustments)
+            self._sync_sliders()
+        except RateLimitExceeded as e:
+            ui.notify(f'⏳ {str(e)}', type='warning')
+        except Exception as e:
+            ui.notify(f'❌ Error restoring adjustments: {str(e)}', type='negative')
+            print(f"Error navigating adjustment history: {e}")
+    
+    def _sync_sliders(self):
+        """Move the sliders to match the current adjustment values."""
+        for key, slider in self.sliders.items():
+            slider.value = self.adjustments[key]
+    
     def _reset_adjustments(self):
         """Reset all adjustments to default values."""
         self.adjustments = {
@@ -177,11 +297,11 @@ class SkinToneAdjusterComponent:
             'saturation': 0,
             'hue_shift': 0
         }
-        self._update_adjustment_display()
+        self._sync_sliders()
         ui.notify('🔄 Adjustments reset to default', type='info')
     
     def _apply_preset(self, preset_adjustments: Dict[str, int]):
         """Apply a preset adjustment configuration."""
         self.adjustments.update(preset_adjustments)
-        self._update_adjustment_display()
+        self._sync_sliders()
         ui.notify('✨ Preset applied! Click "Apply Changes" to see results.', type='info')
\ No newline at end of file
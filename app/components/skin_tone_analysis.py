@@ -1,15 +1,37 @@
 import base64
+import hashlib
 import io
 from typing import Dict, Any, Optional
 import numpy as np
 from PIL import Image
 from nicegui import ui
+from app.components.rendering import KeyedList, Shown
+from app.core.metrics import timed
+
+class _CharacteristicCard:
+    """One skin tone characteristic, keyed by its title."""
+    
+    def __init__(self, char: Dict[str, str]):
+        with ui.card().classes('p-4 border-l-4 border-primary') as self.root:
+            ui.label(char["title"]).classes('font-medium text-primary mb-2')
+            self.description = ui.label(char["description"]).classes('text-gray-700')
+    
+    def update(self, char: Dict[str, str]):
+        self.description.text = char["description"]
+
 
 class SkinToneAnalysisComponent:
-    """Component for displaying skin tone analysis results."""
+    """Component for displaying skin tone analysis results.
+    
+    The result tree is built on the first update and afterwards updated in
+    place: only values that changed are sent to the browser, and the image is
+    only re-encoded when its pixels changed.
+    """
     
     def __init__(self):
         self.container = None
+        self.built = False
+        self.shown = Shown()
         self.create_component()
     
     def create_component(self):
@@ -22,98 +44,114 @@ class SkinToneAnalysisComponent:
                 ui.icon('analytics').classes('text-4xl mb-4')
                 ui.label('Upload an image to see skin tone analysis').classes('text-lg')
     
+    def _create_results(self):
+        """Build the result elements that update_analysis fills in."""
+        self.container.clear()
+        self.shown.clear()
+        
+        with self.container:
+            with ui.row().classes('w-full gap-6'):
+                # Image display
+                with ui.column().classes('flex-1'):
+                    ui.label('Analyzed Image').classes('text-lg font-semibold mb-3')
+                    self.image = ui.image().classes('w-full max-w-md rounded-lg shadow-md')
+                
+                # Analysis results
+                with ui.column().classes('flex-1'):
+                    ui.label('Analysis Results').classes('text-lg font-semibold mb-3')
+                    
+                    # Skin tone information
+                    with ui.card().classes('w-full p-4'):
+                        # Primary color
+                        with ui.row().classes('items-center gap-3 mb-3'):
+                            self.swatch = ui.element('div')
+                            with ui.column().classes('gap-1'):
+                                ui.label('Primary Skin Tone').classes('font-medium')
+                                self.primary_label = ui.label().classes('text-sm text-gray-600 font-mono')
+                        
+                        # Category and undertone
+                        with ui.grid(columns=2).classes('gap-4 mb-3'):
+                            with ui.card().classes('p-3 bg-blue-50'):
+                                ui.label('Category').classes('text-sm font-medium text-blue-700')
+                                self.category_label = ui.label().classes('text-lg font-semibold text-blue-900')
+                            
+                            with ui.card().classes('p-3 bg-purple-50'):
+                                ui.label('Undertone').classes('text-sm font-medium text-purple-700')
+                                self.undertone_label = ui.label().classes('text-lg font-semibold text-purple-900')
+                        
+                        # Confidence score and bar
+                        self.confidence_label = ui.label().classes('font-medium mb-2')
+                        with ui.element('div').classes('w-full bg-gray-200 rounded-full h-3'):
+                            self.confidence_bar = ui.element('div')
+                        
+                        # RGB values
+                        self.rgb_label = ui.label().classes('text-sm text-gray-600 mt-3 font-mono')
+                        
+                        # Analysis metadata
+                        with ui.expansion('Technical Details').classes('mt-3') as self.details:
+                            self.pixels_label = ui.label().classes('text-sm')
+                            self.variance_label = ui.label().classes('text-sm font-mono')
+            
+            # Skin tone characteristics
+            ui.separator().classes('my-6')
+            ui.label('Skin Tone Characteristics').classes('text-lg font-semibold mb-4')
+            self.characteristics = KeyedList(ui.grid(columns=1).classes('gap-4'), _CharacteristicCard,
+                                             key=lambda char: char["title"])
+        self.built = True
+    
+    @timed('ui.update_analysis')
     async def update_analysis(self, analysis_results: Dict[str, Any], image: np.ndarray):
         """Update the component with analysis results."""
         try:
-            # Clear existing content
-            self.container.clear()
+            if not self.built:
+                self._create_results()
             
-            with self.container:
-                with ui.row().classes('w-full gap-6'):
-                    # Image display
-                    with ui.column().classes('flex-1'):
-                        ui.label('Analyzed Image').classes('text-lg font-semibold mb-3')
-                        
-                        # Convert numpy array to base64 for display
-                        image_base64 = self._numpy_to_base64(image)
-                        ui.image(f'data:image/jpeg;base64,{image_base64}').classes('w-full max-w-md rounded-lg shadow-md')
-                    
-                    # Analysis results
-                    with ui.column().classes('flex-1'):
-                        ui.label('Analysis Results').classes('text-lg font-semibold mb-3')
-                        
-                        # Skin tone information
-                        with ui.card().classes('w-full p-4'):
-                            # Primary color
-                            with ui.row().classes('items-center gap-3 mb-3'):
-                                ui.element('div').style(f'width: 40px; height: 40px; background-color: {analysis_results["primary_color"]}; border-radius: 8px; border: 2px solid #ddd;')
-                                with ui.column().classes('gap-1'):
-                                    ui.label('Primary Skin Tone').classes('font-medium')
-                                    ui.label(analysis_results["primary_color"]).classes('text-sm text-gray-600 font-mono')
-                            
-                            # Category and undertone
-                            with ui.grid(columns=2).classes('gap-4 mb-3'):
-                                with ui.card().classes('p-3 bg-blue-50'):
-                                    ui.label('Category').classes('text-sm font-medium text-blue-700')
-                                    ui.label(analysis_results["category"]).classes('text-lg font-semibold text-blue-900')
-                                
-                                with ui.card().classes('p-3 bg-purple-50'):
-                                    ui.label('Undertone').classes('text-sm font-medium text-purple-700')
-                                    ui.label(analysis_results["undertone"].title()).classes('text-lg font-semibold text-purple-900')
-                            
-                            # Confidence score
-                            confidence = analysis_results.get("confidence", 0.0)
-                            confidence_percent = int(confidence * 100)
-                            
-                            ui.label(f'Analysis Confidence: {confidence_percent}%').classes('font-medium mb-2')
-                            
-                            # Confidence bar
-                            with ui.element('div').classes('w-full bg-gray-200 rounded-full h-3'):
-                                confidence_color = 'bg-green-500' if confidence > 0.8 else 'bg-yellow-500' if confidence > 0.6 else 'bg-red-500'
-                                ui.element('div').classes(f'{confidence_color} h-3 rounded-full transition-all duration-500').style(f'width: {confidence_percent}%;')
-                            
-                            # RGB values
-                            if "rgb_values" in analysis_results:
-                                rgb = analysis_results["rgb_values"]
-                                ui.label(f'RGB: ({rgb[0]}, {rgb[1]}, {rgb[2]})').classes('text-sm text-gray-600 mt-3 font-mono')
-                            
-                            # Analysis metadata
-                            if "analysis_metadata" in analysis_results:
-                                metadata = analysis_results["analysis_metadata"]
-                                with ui.expansion('Technical Details').classes('mt-3'):
-                                    ui.label(f'Pixels Analyzed: {metadata.get("pixels_analyzed", "N/A"):,}').classes('text-sm')
-                                    if "color_variance" in metadata:
-                                        variance = metadata["color_variance"]
-                                        ui.label(f'Color Variance: R:{variance[0]:.1f}, G:{variance[1]:.1f}, B:{variance[2]:.1f}').classes('text-sm font-mono')
+            # The preview is only encoded (and sent) when its pixels changed
+            self.shown.set('image', hashlib.blake2b(np.ascontiguousarray(image).data, digest_size=16).digest(),
+                           lambda _: self.image.set_source(f'data:image/jpeg;base64,{self._numpy_to_base64(image)}'))
+            
+            primary_color = analysis_results["primary_color"]
+            self.shown.set('primary_color', primary_color, lambda color: self.swatch.style(
+                f'width: 40px; height: 40px; background-color: {color}; border-radius: 8px; border: 2px solid #ddd;'))
+            self.primary_label.text = primary_color
+            self.category_label.text = analysis_results["category"]
+            self.undertone_label.text = analysis_results["undertone"].title()
+            
+            # Confidence score
+            confidence = analysis_results.get("confidence", 0.0)
+            confidence_percent = int(confidence * 100)
+            self.confidence_label.text = f'Analysis Confidence: {confidence_percent}%'
+            confidence_color = 'bg-green-500' if confidence > 0.8 else 'bg-yellow-500' if confidence > 0.6 else 'bg-red-500'
+            self.shown.set('confidence_bar', (confidence_color, confidence_percent), lambda _: self.confidence_bar.classes(
+                replace=f'{confidence_color} h-3 rounded-full transition-all duration-500').style(f'width: {confidence_percent}%;'))
+            
+            # RGB values
+            rgb = analysis_results.get("rgb_values")
+            self.rgb_label.visible = rgb is not None
+            if rgb is not None:
+                self.rgb_label.text = f'RGB: ({rgb[0]}, {rgb[1]}, {rgb[2]})'
+            
+            # Analysis metadata
+            metadata = analysis_results.get("analysis_metadata")
+            self.details.visible = metadata is not None
+            if metadata is not None:
+                self.pixels_label.text = f'Pixels Analyzed: {metadata.get("pixels_analyzed", "N/A"):,}'
+                variance = metadata.get("color_variance")
+                self.variance_label.visible = variance is not None
+                if variance is not None:
+                    self.variance_label.text = f'Color Variance: R:{variance[0]:.1f}, G:{variance[1]:.1f}, B:{variance[2]:.1f}'
             
             # Skin tone characteristics
-            await self._add_skin_tone_characteristics(analysis_results)
+            self.characteristics.update(self._get_skin_tone_characteristics(
+                analysis_results.get("category", "Medium"), analysis_results.get("undertone", "neutral")))
             
         except Exception as e:
+            self.built = False
             self.container.clear()
             with self.container:
                 ui.label(f'Error displaying analysis: {str(e)}').classes('text-red-500')
             print(f"Error updating analysis component: {e}")
     
-    async def _add_skin_tone_characteristics(self, analysis_results: Dict[str, Any]):
-        """Add detailed skin tone characteristics."""
-        category = analysis_results.get("category", "Medium")
-        undertone = analysis_results.get("undertone", "neutral")
-        
-        # Characteristics based on skin tone
-        characteristics = self._get_skin_tone_characteristics(category, undertone)
-        
-        with self.container:
-            ui.separator().classes('my-6')
-            
-            ui.label('Skin Tone Characteristics').classes('text-lg font-semibold mb-4')
-            
-            with ui.grid(columns=1).classes('gap-4'):
-                for char in characteristics:
-                    with ui.card().classes('p-4 border-l-4 border-primary'):
-                        ui.label(char["title"]).classes('font-medium text-primary mb-2')
-                        ui.label(char["description"]).classes('text-gray-700')
-    
     def _get_skin_tone_characteristics(self, category: str, undertone: str) -> list:
         """Get characteristics based on skin tone category and undertone."""
         characteristics = []
@@ -22,11 +22,93 @@ class Settings(BaseSettings):
     # Image processing settings
     max_image_width: int = Field(default=1920, description="Maximum image width")
     max_image_height: int = Field(default=1080, description="Maximum image height")
+    max_image_megapixels: float = Field(default=100.0, description="Images declaring more pixels are rejected from their header")
+    max_decode_megapixels: float = Field(default=24.0, description="Most pixels decoded per image (after reduced JPEG decoding)")
     thumbnail_size: int = Field(default=300, description="Thumbnail size")
-    
+    preview_size: int = Field(default=512, description="Longest side of preview renders shown in the UI")
+    image_backend: str = Field(default="opencv", description="Brightness, saturation, sharpness and contrast implementation: opencv or pil")
+
+    # Adjustment cache settings
+    adjustment_cache_size: int = Field(default=16, description="Maximum cached adjustment results per session")
+    adjustment_quantization_step: int = Field(default=1, description="Slider step used to quantize adjustment cache keys")
+    buffer_pool_max_mb: int = Field(default=64, description="Idle arrays kept per session for reuse by adjustments and analysis")
+
     # Analysis settings
     confidence_threshold: float = Field(default=0.7, description="Minimum confidence for analysis")
     max_colors_extract: int = Field(default=5, description="Maximum colors to extract")
+    worker_pool_size: int = Field(default=0, description="Analysis worker threads (0 = derive from CPU count)")
+    cpu_limit: int = Field(default=0, description="CPUs available to the app (0 = detect from cgroup quota and affinity)")
+    native_threads: int = Field(default=0, description="OpenCV/OpenMP/BLAS threads per analysis worker (0 = CPUs / workers)")
+    tiled_analysis_megapixels: float = Field(default=40.0, description="Images declaring more pixels (print-resolution photos) are analyzed strip by strip")
+    tile_megapixels: float = Field(default=0.5, description="Pixels per strip in tiled analysis (bounds its memory)")
+    analysis_cache_size: int = Field(default=64, description="Analysis results memoized by image content hash")
+    max_faces: int = Field(default=10, description="Most faces analyzed per image in multi-face mode (largest first)")
+    face_cache_size: int = Field(default=512, description="Per-face results memoized by image content hash and face box")
+
+    # Video analysis settings
+    video_extensions: List[str] = Field(default=[".mp4", ".mov", ".webm", ".avi", ".mkv"], description="Video file extensions accepted by the batch CLI and the video API")
+    max_video_file_size: int = Field(default=100 * 1024 * 1024, description="Maximum video upload size in bytes (100MB)")
+    video_max_seconds: float = Field(default=120.0, description="Only the first this many seconds of a clip are analyzed")
+    video_max_samples: int = Field(default=240, description="Most frames analyzed per clip")
+    video_frame_width: int = Field(default=640, description="Sampled frames are downscaled to this width for analysis")
+    video_sample_fps: float = Field(default=4.0, description="Initial frame sampling rate; slowed down while the estimate is steady")
+    video_keyframe_interval: int = Field(default=8, description="Sampled frames between face detections (the face is tracked in between)")
+    video_track_threshold: float = Field(default=0.6, description="Template match score below which the face is re-detected")
+    video_smoothing: float = Field(default=0.3, description="Weight of each new frame in the running skin color estimate")
+    video_stable_delta: float = Field(default=1.5, description="Estimate change (RGB distance) per sample considered steady")
+    video_stable_samples: int = Field(default=8, description="Steady samples in a row (at confidence_threshold) before stopping early")
+
+    # Live camera settings
+    live_enabled: bool = Field(default=True, description="Offer the live camera mode in the UI")
+    live_frame_width: int = Field(default=320, description="Width the browser downscales camera frames to before sending")
+    live_fps: float = Field(default=5.0, description="Camera frames sent per second")
+    live_jpeg_quality: float = Field(default=0.7, description="JPEG quality of the frames sent by the browser (0-1)")
+    live_max_frame_bytes: int = Field(default=256 * 1024, description="Larger live frames are discarded")
+    live_frame_budget_ms: float = Field(default=120.0, description="Hard time budget per live frame, from arrival to result")
+    live_max_pixels: int = Field(default=4000, description="Skin pixels clustered per live frame (evenly subsampled)")
+    live_kmeans_iterations: int = Field(default=10, description="KMeans iterations per live frame (warm-started from the previous one)")
+    live_confirm_frames: int = Field(default=3, description="Frames a new category/undertone must hold before the palette is pushed")
+
+    # API settings
+    api_max_batch_files: int = Field(default=20, description="Maximum images per batch API request")
+    
+    # Rate limiting settings (per browser session; per IP the limits are multiplied)
+    rate_limit_enabled: bool = Field(default=True, description="Enforce per-client rate limits and the concurrency cap")
+    upload_rate_per_minute: float = Field(default=10.0, description="Uploads per minute per session")
+    upload_burst: int = Field(default=3, description="Uploads allowed back to back per session")
+    analysis_rate_per_minute: float = Field(default=60.0, description="Re-analyses (adjustments, preset comparisons) per minute per session")
+    analysis_burst: int = Field(default=10, description="Re-analyses allowed back to back per session")
+    rate_limit_ip_multiplier: float = Field(default=4.0, description="Per-IP limits as a multiple of the per-session limits")
+    api_rate_per_minute: float = Field(default=30.0, description="Images analyzed per minute per IP through the JSON API")
+    api_burst: int = Field(default=20, description="Images per IP the JSON API accepts back to back")
+    max_concurrent_analyses: int = Field(default=0, description="Analysis requests in flight before new ones are rejected (0 = 4 per worker)")
+    rate_limit_trust_forwarded: bool = Field(default=False, description="Take the client IP from the proxy's Fly-Client-IP or X-Forwarded-For entry")
+    
+    # Tracing settings
+    trace_enabled: bool = Field(default=False, description="Record per-request trace timelines")
+    trace_sample_rate: float = Field(default=1.0, description="Fraction of requests traced when tracing is enabled")
+    trace_dir: str = Field(default="traces", description="Directory for Chrome/Perfetto trace JSON files")
+    
+    # Event-loop monitoring settings
+    loop_monitor_interval: float = Field(default=0.1, description="Seconds between event-loop lag samples")
+    loop_stall_threshold_ms: float = Field(default=250.0, description="Log the blocking stack when the loop stalls this long")
+    loop_debug: bool = Field(default=False, description="Flag awaited service calls that hold the event loop")
+    loop_blocking_threshold_ms: float = Field(default=50.0, description="Loop hold time flagged in loop debug mode")
+    
+    # Memory settings
+    memory_tracking: Optional[bool] = Field(default=None, description="Record per-stage peak allocations (defaults to debug)")
+    memory_budget_mb: int = Field(default=0, description="Projected peak memory allowed for in-flight analyses (0 = unlimited)")
+    memory_min_scale: float = Field(default=0.25, description="Smallest downsampling factor before work is refused")
+    
+    # Startup settings
+    warmup_enabled: bool = Field(default=True, description="Preload models and lookup tables in the background after startup")
+    
+    # Profiling settings
+    admin_token: str = Field(default="", description="Token for admin endpoints (empty = admin endpoints disabled)")
+    profile_next_analyses: int = Field(default=0, description="Profile this many analyses after startup")
+    profile_mode: str = Field(default="sampling", description="Profiler used for analyses: sampling or cprofile")
+    profile_interval_ms: float = Field(default=5.0, description="Stack sampling interval of the sampling profiler")
+    profile_dir: str = Field(default="profiles", description="Directory for profiler output")
     
     # Security settings
     cors_origins: List[str] = Field(default=["*"], description="CORS allowed origins")
@@ -42,6 +124,13 @@ class Settings(BaseSettings):
         else:
             return [".jpg", ".jpeg", ".png", ".webp"]
     
+    @validator('video_extensions', pre=True)
+    def parse_video_extensions(cls, v):
+        """Parse video extensions from a comma-separated string or list."""
+        if isinstance(v, str):
+            return [ext.strip() for ext in v.split(',') if ext.strip()]
+        return v
+    
     @validator('cors_origins', pre=True)
     def parse_cors_origins(cls, v):
         """Parse CORS origins from string or list."""
@@ -52,13 +141,11 @@ class Settings(BaseSettings):
         else:
             return ["*"]
     
-    def __init__(self, **kwargs):
-        """Initialize settings and create upload directory."""
-        super().__init__(**kwargs)
-        
-        # Create upload directory if it doesn't exist
-        if not os.path.exists(self.upload_dir):
+    def ensure_upload_dir(self) -> str:
+        """Create the upload directory on first use (not at import time) and return it."""
+        if not os.path.isdir(self.upload_dir):
             os.makedirs(self.upload_dir, exist_ok=True)
+        return self.upload_dir
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # only gzip variants are built without it
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parents[2] / 'static'
+ASSET_PREFIX = '/assets'
+
+# Fingerprinted URLs change with the content, so a response never goes stale
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Preferred first when the client accepts several
+ENCODINGS = ('br', 'gzip')
+
+
+@dataclass(frozen=True)
+class Asset:
+    """A static file under its content-hashed name, with its precompressed bodies."""
+    path: str
+    name: str
+    media_type: str
+    etag: str
+    # Encoding ('identity', 'gzip', 'br') -> body; compressed variants only when smaller
+    bodies: Dict[str, bytes]
+
+
+def _accepted(accept_encoding: str) -> set:
+    """Content codings of an Accept-Encoding header, without the ones refused with q=0."""
+    codings = set()
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip().partition('q=')[2]
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        codings.add(coding.strip())
+    return codings
+
+
+class AssetRegistry:
+    """Static files served under fingerprinted URLs with immutable caching.
+
+    Files are read once, when registered at startup: each is served as
+    `<stem>.<hash>.<suffix>` under ASSET_PREFIX, with gzip and (when the
+    brotli package is installed) brotli variants compressed ahead of time at
+    the highest levels, so requests never compress. Browsers keep the files
+    for a year without revalidating; a changed file gets a new URL, which the
+    page links to on its next load.
+    """
+
+    def __init__(self, root: Path = STATIC_DIR, prefix: str = ASSET_PREFIX):
+        self.root = root
+        self.prefix = prefix
+        self._by_path: Dict[str, Asset] = {}
+        self._by_name: Dict[str, Asset] = {}
+
+    def register(self, path: str) -> Asset:
+        """Read, fingerprint and compress the file at path (relative to the static root)."""
+        asset = self._by_path.get(path)
+        if asset is not None:
+            return asset
+
+        content = (self.root / path).read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        stem, dot, suffix = Path(path).name.rpartition('.')
+        bodies = {'identity': content, 'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            bodies['br'] = brotli.compress(content, quality=11)
+        bodies = {encoding: body for encoding, body in bodies.items()
+                  if encoding == 'identity' or len(body) < len(content)}
+
+        asset = Asset(
+            path=path,
+            name=f'{stem}.{digest[:12]}{dot}{suffix}',
+            media_type=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            etag=f'"{digest[:32]}"',
+            bodies=bodies,
+        )
+        self._by_path[path] = self._by_name[asset.name] = asset
+        return asset
+
+    def url(self, path: str) -> str:
+        return f'{self.prefix}/{self.register(path).name}'
+
+    def stylesheet(self, path: str) -> str:
+        """<link> tag for a registered stylesheet."""
+        return f'<link rel="stylesheet" href="{self.url(path)}">'
+
+    def response(self, name: str, accept_encoding: str = '', if_none_match: Optional[str] = None) -> Response:
+        """The asset under its fingerprinted name, in the best encoding the client accepts."""
+        asset = self._by_name.get(name)
+        if asset is None:
+            return Response(status_code=404)
+
+        headers = {'Cache-Control': IMMUTABLE, 'ETag': asset.etag, 'Vary': 'Accept-Encoding'}
+        if if_none_match and asset.etag in (tag.strip() for tag in if_none_match.split(',')):
+            return Response(status_code=304, headers=headers)
+
+        accepted = _accepted(accept_encoding)
+        encoding = next((encoding for encoding in ENCODINGS if encoding in accepted and encoding in asset.bodies),
+                        'identity')
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(asset.bodies[encoding], media_type=asset.media_type, headers=headers)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Body sizes per registered asset and encoding."""
+        return {asset.name: {encoding: len(body) for encoding, body in asset.bodies.items()}
+                for asset in self._by_name.values()}
+
+
+assets = AssetRegistry()
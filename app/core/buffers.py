@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.core.metrics import CACHE_REQUESTS
+
+BufferKey = Tuple[Tuple[int, ...], str]
+
+
+class BufferPool:
+    """Reusable full-frame arrays, keyed by shape and dtype.
+
+    Adjustments of one session run again and again on the same image, so the
+    arrays they need (the output, the HSV planes, the skin mask) have the same
+    shapes every time. Callers take() an array, write into it with the `dst=`
+    / `out=` parameters of OpenCV and NumPy, and give() it back when it is no
+    longer referenced; the next call of the same shape gets it back instead of
+    allocating. Taken arrays are uninitialized. Idle arrays are bounded by
+    BUFFER_POOL_MAX_MB, least recently used shapes are dropped first.
+    Thread-safe: concurrent adjustments simply take different arrays.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.buffer_pool_max_mb * 1024 * 1024
+        self._free: "OrderedDict[BufferKey, List[np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def take(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """An array of this shape and dtype, reused when one is idle."""
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                array = free.pop()
+                self.nbytes -= array.nbytes
+                self._free.move_to_end(key)
+                self.hits += 1
+                CACHE_REQUESTS.inc(cache='buffers', result='hit')
+                return array
+            self.misses += 1
+        CACHE_REQUESTS.inc(cache='buffers', result='miss')
+        return np.empty(shape, dtype)
+
+    def give(self, array: np.ndarray) -> None:
+        """Return an array taken from the pool; it must not be used afterwards."""
+        # Views (slices, reshapes) would hand out memory still owned elsewhere
+        if array.base is not None or not array.flags.c_contiguous or array.nbytes > self.max_bytes:
+            return
+        key = (array.shape, array.dtype.str)
+        with self._lock:
+            self._free.setdefault(key, []).append(array)
+            self._free.move_to_end(key)
+            self.nbytes += array.nbytes
+            while self.nbytes > self.max_bytes:
+                oldest = next(iter(self._free))
+                self.nbytes -= self._free[oldest].pop().nbytes
+                if not self._free[oldest]:
+                    del self._free[oldest]
+
+    @contextmanager
+    def borrow(self, shape: Tuple[int, ...], dtype=np.uint8) -> Iterator[np.ndarray]:
+        """take() for the duration of a block."""
+        array = self.take(shape, dtype)
+        try:
+            yield array
+        finally:
+            self.give(array)
+
+    def clear(self) -> None:
+        """Drop all idle arrays (e.g. after a new upload changed the image size)."""
+        with self._lock:
+            self._free.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            arrays = sum(len(free) for free in self._free.values())
+        return {'hits': self.hits, 'misses': self.misses, 'idle_arrays': arrays, 'idle_bytes': self.nbytes}
+
+
+@contextmanager
+def borrowed(buffers: Optional[BufferPool], shape: Tuple[int, ...], dtype=np.uint8) -> Iterator[np.ndarray]:
+    """A pooled array when a pool is given, a fresh one otherwise."""
+    if buffers is None:
+        yield np.empty(shape, dtype)
+    else:
+        with buffers.borrow(shape, dtype) as array:
+            yield array
@@ -0,0 +1,116 @@
+import os
+import sys
+from typing import Optional, Tuple
+from app.config import settings
+
+# Read by OpenMP (scikit-learn's KMeans) and the BLAS builds NumPy may use
+# when their thread pools start, so they must be set before those load.
+NATIVE_THREAD_ENV = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+)
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_cpus() -> Optional[float]:
+    """CPU quota of this container in cores, or None when unlimited/unknown."""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+
+    # cgroup v1: quota of -1 means unlimited
+    quota = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') or _read('/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_quota_us')
+    period = _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us') or _read('/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def detect_cpus() -> Tuple[int, str]:
+    """CPUs this process may actually use, and where that number came from.
+
+    os.cpu_count() reports the host's cores, which in a container can be far
+    more than the CPU quota or the cores the process is pinned to.
+    """
+    try:
+        cpus, source = len(os.sched_getaffinity(0)), 'affinity'
+    except (AttributeError, OSError):
+        cpus, source = os.cpu_count() or 1, 'cpu_count'
+
+    try:
+        quota = _cgroup_cpus()
+    except ValueError:
+        quota = None
+    if quota is not None and quota < cpus:
+        # A fractional quota (e.g. 1.5 cores) still leaves room for one more thread
+        cpus, source = max(1, int(quota + 0.5)), 'cgroup'
+    return max(1, cpus), source
+
+
+def limit_native_threads(threads: int):
+    """Cap the thread pools of OpenCV, OpenMP and BLAS at `threads` per caller.
+
+    Environment variables only take effect for libraries that have not
+    started yet; pools that are already running are resized with
+    threadpoolctl when it is installed (it comes with scikit-learn).
+    """
+    for name in NATIVE_THREAD_ENV:
+        os.environ[name] = str(threads)
+
+    import cv2
+    cv2.setNumThreads(threads)
+
+    if 'numpy' in sys.modules or 'sklearn' in sys.modules:
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            return
+        threadpool_limits(limits=threads)
+
+
+class ConcurrencyConfig:
+    """Central thread budget for the analysis worker pool and native libraries.
+
+    Analyses run on worker_threads pool threads and every OpenCV, OpenMP or
+    BLAS call inside them may fan out to native_threads more, so their
+    product is kept at the number of usable CPUs. Left alone, each library
+    sizes its own pool from the host's core count, which on a shared
+    1-2 vCPU machine oversubscribes the cores several times over.
+    """
+
+    def __init__(self, cpus: Optional[int] = None, worker_threads: Optional[int] = None,
+                 native_threads: Optional[int] = None):
+        if cpus or settings.cpu_limit:
+            self.cpus, self.cpu_source = cpus or settings.cpu_limit, 'configured'
+        else:
+            self.cpus, self.cpu_source = detect_cpus()
+        self.worker_threads = worker_threads or settings.worker_pool_size or min(4, self.cpus)
+        self.native_threads = native_threads or settings.native_threads or max(1, self.cpus // self.worker_threads)
+        self.configured = False
+
+    def configure(self):
+        """Apply the thread limits once; call before NumPy and OpenCV are busy."""
+        if self.configured:
+            return
+        self.configured = True
+        limit_native_threads(self.native_threads)
+        print(f"Concurrency: {self.cpus} CPU(s) ({self.cpu_source}), {self.worker_threads} analysis worker(s), "
+              f"{self.native_threads} native thread(s) per worker (OpenCV/OpenMP/BLAS)")
+
+
+concurrency = ConcurrencyConfig()
@@ -0,0 +1,116 @@
+"""OpenCV/NumPy versions of PIL's ImageEnhance operations on RGB uint8 arrays.
+
+Each function returns exactly what the PIL enhancer returns for the same
+image and factor, bit for bit: PIL blends a degenerate image towards the
+input as trunc(clip(degenerate + factor * (image - degenerate))) in float32,
+which is reproduced here in the same order of operations. Where the
+degenerate image is a constant (brightness, contrast) the blend is a 256-entry
+lookup table applied with cv2.LUT; otherwise it runs on a float32 plane.
+Results are written into `out` (which may be the input itself) and
+full-frame temporaries come from `buffers` when given, so nothing is copied
+to or from PIL. benchmarks/bench_enhance.py checks the parity.
+"""
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+import cv2
+import numpy as np
+from app.core.buffers import BufferPool, borrowed
+
+# ImageFilter.SMOOTH, the degenerate image of ImageEnhance.Sharpness
+SMOOTH_KERNEL = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13
+
+# ITU-R 601-2 luma weights of PIL's RGB -> L conversion, in 16-bit fixed point
+LUMA_WEIGHTS = (19595, 38470, 7471)
+
+
+@lru_cache(maxsize=256)
+def _blend_lut(base: int, factor: float) -> np.ndarray:
+    """Blend of the constant `base` towards every uint8 value, as PIL computes it."""
+    values = np.arange(256, dtype=np.float32)
+    blended = np.float32(base) + np.float32(factor) * (values - np.float32(base))
+    return np.clip(blended, 0, 255).astype(np.uint8)
+
+
+def _blend(degenerate: np.ndarray, image: np.ndarray, factor: float, out: np.ndarray,
+           buffers: Optional[BufferPool]) -> np.ndarray:
+    """PIL's Image.blend(degenerate, image, factor) of two same-shaped uint8 arrays."""
+    with borrowed(buffers, image.shape, np.float32) as blended:
+        np.subtract(image, degenerate, out=blended, dtype=np.float32)
+        np.multiply(blended, np.float32(factor), out=blended)
+        np.add(blended, degenerate, out=blended)
+        np.maximum(blended, 0, out=blended)
+        np.minimum(blended, 255, out=blended)
+        # The float -> uint8 cast truncates like PIL's
+        np.copyto(out, blended, casting='unsafe')
+    return out
+
+
+def luma(image: np.ndarray, out: Optional[np.ndarray] = None, buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """PIL's RGB -> L conversion: (19595 R + 38470 G + 7471 B + 0x8000) >> 16."""
+    if out is None:
+        out = np.empty(image.shape[:2], np.uint8)
+    plane = image.shape[:2]
+    with borrowed(buffers, plane) as r, borrowed(buffers, plane) as g, borrowed(buffers, plane) as b, \
+            borrowed(buffers, plane, np.uint32) as total, borrowed(buffers, plane, np.uint32) as term:
+        cv2.split(image, [r, g, b])
+        np.multiply(r, LUMA_WEIGHTS[0], out=total, dtype=np.uint32)
+        np.multiply(g, LUMA_WEIGHTS[1], out=term, dtype=np.uint32)
+        np.add(total, term, out=total)
+        np.multiply(b, LUMA_WEIGHTS[2], out=term, dtype=np.uint32)
+        np.add(total, term, out=total)
+        np.add(total, 0x8000, out=total)
+        np.right_shift(total, 16, out=total)
+        np.copyto(out, total, casting='unsafe')
+    return out
+
+
+def brightness(image: np.ndarray, factor: float, out: Optional[np.ndarray] = None,
+               buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """ImageEnhance.Brightness: blend from black."""
+    return cv2.LUT(image, _blend_lut(0, factor), dst=out)
+
+
+def contrast(image: np.ndarray, factor: float, out: Optional[np.ndarray] = None,
+             buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """ImageEnhance.Contrast: blend from the mean gray level."""
+    with borrowed(buffers, image.shape[:2]) as gray:
+        luma(image, gray, buffers)
+        # Same float division and rounding as ImageStat's mean
+        mean = int(int(gray.sum(dtype=np.int64)) / gray.size + 0.5)
+    return cv2.LUT(image, _blend_lut(mean, factor), dst=out)
+
+
+def color(image: np.ndarray, factor: float, out: Optional[np.ndarray] = None,
+          buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """ImageEnhance.Color: blend from the grayscale image."""
+    if out is None:
+        out = np.empty_like(image)
+    with borrowed(buffers, image.shape[:2]) as gray, borrowed(buffers, image.shape) as degenerate:
+        luma(image, gray, buffers)
+        cv2.merge([gray, gray, gray], degenerate)
+        return _blend(degenerate, image, factor, out, buffers)
+
+
+def sharpness(image: np.ndarray, factor: float, out: Optional[np.ndarray] = None,
+              buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """ImageEnhance.Sharpness: blend from the smoothed image."""
+    if out is None:
+        out = np.empty_like(image)
+    with borrowed(buffers, image.shape) as smoothed:
+        if min(image.shape[:2]) < 3:
+            np.copyto(smoothed, image)
+        else:
+            # The kernel sums are multiples of 1/13, far from the rounding ties
+            cv2.filter2D(image, -1, SMOOTH_KERNEL, dst=smoothed, borderType=cv2.BORDER_REPLICATE)
+            # PIL leaves the outermost rows and columns unfiltered
+            smoothed[0], smoothed[-1] = image[0], image[-1]
+            smoothed[:, 0], smoothed[:, -1] = image[:, 0], image[:, -1]
+        return _blend(smoothed, image, factor, out, buffers)
+
+
+ENHANCERS: Dict[str, Callable[..., np.ndarray]] = {
+    'brightness': brightness,
+    'color': color,
+    'contrast': contrast,
+    'sharpness': sharpness,
+}
@@ -0,0 +1,258 @@
+"""Pre-decode admission: read an image's container header, never its pixels.
+
+The real format is taken from the magic bytes, and dimensions, bit depth and
+frame count from the header alone, walking at most MAX_SEGMENTS segment
+headers. The cost of rejecting an image is therefore constant, however many
+pixels it declares. Oversized JPEGs are routed to a reduced decode (libjpeg
+DCT scaling, cv2.IMREAD_REDUCED_COLOR_*), which never materializes the full
+resolution; other formats must fit the decode limit as they are. Images above
+the tiled analysis threshold (print-resolution photos) are planned as tiled:
+decoded at the highest resolution the decode limit allows, for a
+strip-by-strip analysis, instead of at the display size.
+"""
+import io
+import struct
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Union
+import cv2
+from app.config import settings
+from app.core import metrics
+from core.utils import FileUploadError
+
+# Segments/chunks inspected before giving up on finding the dimensions
+MAX_SEGMENTS = 64
+
+# Formats we can decode and their extensions (uploads are stored under the first)
+FORMAT_EXTENSIONS = {'jpeg': ('.jpg', '.jpeg'), 'png': ('.png',), 'webp': ('.webp',)}
+
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Start-of-frame markers carrying the JPEG dimensions (not DHT/JPG/DAC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Samples per pixel by PNG color type (palette images decode to RGB)
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+
+
+class ImageRejected(FileUploadError):
+    """Raised when an image is refused from its header, before any decode."""
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class ImageHeader:
+    format: str
+    width: int
+    height: int
+    bit_depth: int
+    channels: int
+    frames: int = 1
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+
+@dataclass(frozen=True, slots=True)
+class DecodePlan:
+    header: ImageHeader
+    reduction: int = 1
+    # Analyzed strip by strip at the decoded resolution rather than resized first
+    tiled: bool = False
+
+    @property
+    def flags(self) -> int:
+        """cv2.imread/imdecode flags for this plan."""
+        return REDUCED_FLAGS[self.reduction]
+
+    @property
+    def decoded_pixels(self) -> int:
+        return -(-self.header.width // self.reduction) * -(-self.header.height // self.reduction)
+
+    @property
+    def route(self) -> str:
+        return 'reduced' if self.reduction > 1 else 'full'
+
+
+def _read_exact(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) < size:
+        raise ImageRejected('Image file is truncated or corrupt')
+    return data
+
+
+def _read_jpeg(f: BinaryIO) -> ImageHeader:
+    f.seek(2)
+    for _ in range(MAX_SEGMENTS):
+        # Markers may be preceded by any number of 0xFF fill bytes
+        byte = _read_exact(f, 1)[0]
+        if byte != 0xFF:
+            raise ImageRejected('Image file is corrupt')
+        marker = 0xFF
+        while marker == 0xFF:
+            marker = _read_exact(f, 1)[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue  # standalone markers carry no length
+        if marker in (0xD9, 0xDA):
+            break  # end of image / start of scan before any frame header
+
+        length = struct.unpack('>H', _read_exact(f, 2))[0]
+        if marker in _JPEG_SOF:
+            precision, height, width, components = struct.unpack('>BHHB', _read_exact(f, 6))
+            return ImageHeader('jpeg', width, height, precision, components)
+        f.seek(length - 2, io.SEEK_CUR)
+    raise ImageRejected('Could not read the image dimensions')
+
+
+def _read_png(f: BinaryIO) -> ImageHeader:
+    f.seek(8)
+    length, chunk = struct.unpack('>I4s', _read_exact(f, 8))
+    if chunk != b'IHDR' or length < 13:
+        raise ImageRejected('Image file is corrupt')
+    width, height, bit_depth, color_type = struct.unpack('>IIBB', _read_exact(f, 10))
+    f.seek(length - 10 + 4, io.SEEK_CUR)  # rest of IHDR + CRC
+
+    # An animation control chunk, if any, comes before the first image data
+    frames = 1
+    for _ in range(MAX_SEGMENTS):
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, chunk = struct.unpack('>I4s', header)
+        if chunk == b'acTL':
+            frames = struct.unpack('>I', _read_exact(f, 4))[0]
+            break
+        if chunk in (b'IDAT', b'IEND'):
+            break
+        f.seek(length + 4, io.SEEK_CUR)
+    return ImageHeader('png', width, height, bit_depth, _PNG_CHANNELS.get(color_type, 3), frames)
+
+
+def _read_webp(f: BinaryIO) -> ImageHeader:
+    f.seek(12)
+    chunk, length = struct.unpack('<4sI', _read_exact(f, 8))
+    if chunk == b'VP8 ':
+        data = _read_exact(f, 10)
+        if data[3:6] != b'\x9d\x01\x2a':
+            raise ImageRejected('Image file is corrupt')
+        width, height = struct.unpack('<HH', data[6:10])
+        return ImageHeader('webp', width & 0x3FFF, height & 0x3FFF, 8, 3)
+    if chunk == b'VP8L':
+        data = _read_exact(f, 5)
+        if data[0] != 0x2F:
+            raise ImageRejected('Image file is corrupt')
+        bits = struct.unpack('<I', data[1:5])[0]
+        return ImageHeader('webp', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 8, 4 if bits >> 28 & 1 else 3)
+    if chunk == b'VP8X':
+        data = _read_exact(f, 10)
+        flags = data[0]
+        width = int.from_bytes(data[4:7], 'little') + 1
+        height = int.from_bytes(data[7:10], 'little') + 1
+        frames = 1
+        if flags & 0x02:
+            # Animated: count frame chunks (bounded, so this stays constant-time)
+            f.seek(length - 10 + (length & 1), io.SEEK_CUR)
+            frames = 0
+            for _ in range(MAX_SEGMENTS):
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                chunk, length = struct.unpack('<4sI', header)
+                frames += chunk == b'ANMF'
+                f.seek(length + (length & 1), io.SEEK_CUR)
+        return ImageHeader('webp', width, height, 8, 4 if flags & 0x10 else 3, max(frames, 1))
+    raise ImageRejected('Unsupported WebP encoding')
+
+
+def read_header(f: BinaryIO) -> ImageHeader:
+    """Identify the format from magic bytes and read the header fields."""
+    magic = f.read(12)
+    if magic[:3] == b'\xff\xd8\xff':
+        return _read_jpeg(f)
+    if magic[:8] == b'\x89PNG\r\n\x1a\n':
+        return _read_png(f)
+    if magic[:4] == b'RIFF' and magic[8:12] == b'WEBP':
+        return _read_webp(f)
+    raise ImageRejected('Unsupported image format. Please upload a JPG, PNG or WebP image.')
+
+
+def plan_decode(header: ImageHeader) -> DecodePlan:
+    """Admit a header for decoding, choosing the cheapest decode that still feeds the pipeline."""
+    if not any(ext in settings.allowed_extensions for ext in FORMAT_EXTENSIONS[header.format]):
+        raise ImageRejected(f'{header.format.upper()} images are not accepted')
+    if header.width <= 0 or header.height <= 0:
+        raise ImageRejected('Image file is corrupt')
+    if header.frames > 1:
+        raise ImageRejected('Animated images are not supported, please upload a still photo')
+    if header.pixels > settings.max_image_megapixels * 1_000_000:
+        raise ImageRejected(f'Image is too large ({header.width}x{header.height}); '
+                            f'please upload a photo under {settings.max_image_megapixels:g} megapixels')
+
+    # Images are resized to fit max_image_width/height after decoding anyway, so a
+    # JPEG can be decoded at 1/2, 1/4 or 1/8 scale as long as it stays above that
+    reduction = 1
+    if header.format == 'jpeg':
+        scale = min(settings.max_image_width / header.width, settings.max_image_height / header.height)
+        for factor in (8, 4, 2):
+            if scale * factor <= 1:
+                reduction = factor
+                break
+    plan = DecodePlan(header, reduction)
+
+    # Print-resolution images are analyzed in strips at the highest resolution the
+    # decode limit allows (JPEGs reduced no further than for display); everything
+    # else keeps the display-size decode above
+    if header.pixels > settings.tiled_analysis_megapixels * 1_000_000:
+        plan = next((DecodePlan(header, factor, tiled=True) for factor in (1, 2, 4, 8)
+                     if factor <= reduction and _within_decode_limit(DecodePlan(header, factor))), plan)
+
+    if not _within_decode_limit(plan):
+        raise ImageRejected(f'Image is too large to process ({header.width}x{header.height}); '
+                            f'please upload a smaller photo')
+    return plan
+
+
+def _within_decode_limit(plan: DecodePlan) -> bool:
+    # 16-bit samples take twice the memory
+    pixels = plan.decoded_pixels * (2 if plan.header.bit_depth > 8 else 1)
+    return pixels <= settings.max_decode_megapixels * 1_000_000
+
+
+@contextmanager
+def _open(source: Union[bytes, str, BinaryIO]) -> Iterator[BinaryIO]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    elif isinstance(source, str):
+        with open(source, 'rb') as f:
+            yield f
+    else:
+        position = source.tell()
+        try:
+            yield source
+        finally:
+            source.seek(position)
+
+
+def inspect_image(source: Union[bytes, str, BinaryIO]) -> DecodePlan:
+    """Read the header of encoded bytes, a file path or a binary file and plan its decode.
+
+    File objects are rewound to where they were. Raises ImageRejected.
+    """
+    header = None
+    try:
+        with _open(source) as f:
+            try:
+                header = read_header(f)
+            except (OSError, ValueError):
+                # Segment lengths pointing outside the file
+                raise ImageRejected('Image file is corrupt')
+        return plan_decode(header)
+    except ImageRejected:
+        metrics.DECODE_ADMISSIONS.inc(format=header.format if header else 'unknown', route='rejected')
+        raise
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Coroutine, Deque, Dict, Generator, Optional
+from app.config import settings
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _StepTimer:
+    """Awaitable that drives a coroutine and times each step between suspensions.
+
+    A step is the time the coroutine runs on the loop before yielding, i.e.
+    how long it keeps every other callback waiting.
+    """
+
+    def __init__(self, coro: Coroutine):
+        self.coro = coro
+        self.longest_step = 0.0
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        value, error = None, None
+        while True:
+            start = time.perf_counter()
+            try:
+                if error is not None:
+                    yielded = self.coro.throw(error)
+                else:
+                    yielded = self.coro.send(value)
+            except StopIteration as stop:
+                self._step(start)
+                return stop.value
+            except BaseException:
+                self._step(start)
+                raise
+            self._step(start)
+
+            try:
+                value, error = (yield yielded), None
+            except GeneratorExit:
+                self.coro.close()
+                raise
+            except BaseException as e:
+                value, error = None, e
+
+    def _step(self, start: float):
+        self.longest_step = max(self.longest_step, time.perf_counter() - start)
+
+
+class LoopMonitor:
+    """Continuously samples event-loop lag and reports what blocks the loop.
+
+    A monitor task sleeps for a fixed interval and records how late it wakes
+    up. A watchdog thread watches the task's heartbeat; when the loop stalls
+    past the threshold it logs the loop thread's stack and the running task,
+    which names the coroutine that is blocking. In debug mode every timed()
+    stage awaited on the loop thread is also checked for how long it held
+    the loop without yielding.
+    """
+
+    def __init__(self, interval: Optional[float] = None, stall_threshold_ms: Optional[float] = None,
+                 window: int = 600):
+        self.interval = interval if interval is not None else settings.loop_monitor_interval
+        self.stall_threshold = (stall_threshold_ms if stall_threshold_ms is not None
+                                else settings.loop_stall_threshold_ms) / 1000
+        self.blocking_threshold = settings.loop_blocking_threshold_ms / 1000
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+        for quantile in (0.5, 0.95, 0.99):
+            metrics.LOOP_LAG_QUANTILES.set_function(
+                lambda q=quantile: self.percentile(q * 100), quantile=str(quantile))
+
+    async def start(self):
+        """Start sampling on the running loop (idempotent)."""
+        if self._task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+        self.set_debug(settings.loop_debug)
+
+    def set_debug(self, enabled: bool):
+        """Turn the blocking-call detector for timed() stages on or off."""
+        if enabled:
+            metrics.blocking_detector = self.check_blocking
+        elif metrics.blocking_detector == self.check_blocking:
+            metrics.blocking_detector = None
+
+    async def stop(self):
+        """Stop sampling and detach the blocking-call detector."""
+        self._stopped.set()
+        self.set_debug(False)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def percentile(self, pct: float) -> float:
+        """Lag percentile in seconds over the recent sample window."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+    def snapshot(self) -> Dict[str, float]:
+        """Recent lag percentiles in milliseconds."""
+        return {
+            'samples': len(self.samples),
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': max(self.samples, default=0.0) * 1000,
+        }
+
+    async def _sample(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self._heartbeat = time.monotonic()
+            self.samples.append(lag)
+            metrics.LOOP_LAG.observe(lag)
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.stall_threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.stall_threshold or reported == heartbeat:
+                continue
+
+            # Report each stall once, with what the loop thread is doing right now
+            reported = heartbeat
+            metrics.LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self.loop_thread_id)
+            task = asyncio.current_task(self.loop) if self.loop is not None else None
+            stack = ''.join(traceback.format_stack(frame, limit=12)) if frame is not None else ''
+            logger.warning('Event loop blocked for %.0f ms in %s\n%s',
+                           stalled * 1000, _describe_task(task), stack)
+
+    async def check_blocking(self, stage: str, coro: Coroutine) -> Any:
+        """Await a stage coroutine, flagging it when it holds the loop too long."""
+        if threading.get_ident() != self.loop_thread_id:
+            # Worker threads run their own loops; holding those is intended
+            return await coro
+
+        timer = _StepTimer(coro)
+        try:
+            return await timer
+        finally:
+            if timer.longest_step >= self.blocking_threshold:
+                metrics.BLOCKING_CALLS.inc(stage=stage)
+                logger.warning('%s held the event loop for %.0f ms without yielding',
+                               stage, timer.longest_step * 1000)
+
+
+def _describe_task(task: Optional[asyncio.Task]) -> str:
+    if task is None:
+        return 'a loop callback'
+    coro = task.get_coro()
+    return f"task {task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,197 @@
+import contextvars
+import itertools
+import math
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import cv2
+import numpy as np
+from app.config import settings
+from app.core import metrics
+from core.utils import ImageProcessingError
+
+# Peak bytes allocated per input pixel, measured with tracemalloc on HD
+# portraits. Adjustment with IMAGE_BACKEND=pil also round-trips through
+# PIL, whose buffers tracemalloc cannot see, so its factor includes those
+# copies.
+DEFAULT_BYTES_PER_PIXEL = {
+    'decode': 6.0,
+    'analysis': 16.0,
+    'adjustment': 44.0,
+}
+
+_stage_peaks: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar('stage_peaks', default=None)
+
+
+class MemoryBudgetExceeded(ImageProcessingError):
+    """Raised when work cannot fit the memory budget even after downsampling."""
+    pass
+
+
+class StageMemoryTracker:
+    """Per-stage peak allocations measured with tracemalloc.
+
+    Every timed() stage records the peak bytes allocated above its starting
+    point. tracemalloc keeps a single process-wide peak, so it is never reset
+    on behalf of one stage alone: whenever any stage starts or ends (under a
+    lock), the peak reached since the last such moment is folded into every
+    stage still open, on any thread or task, and only then reset. Nested
+    stages therefore still see their children's peaks, and a stage never
+    loses a peak to another one's reset. With concurrent analyses a stage's
+    peak includes what the others allocated meanwhile, so those numbers are
+    upper bounds. Enabled in debug mode (or with MEMORY_TRACKING) since
+    tracing allocations slows everything down.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        # [start, peak] of every open stage, by token
+        self._open: Dict[int, List[int]] = {}
+        self._tokens = itertools.count()
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+        metrics.stage_memory = self.stage
+
+    def disable(self):
+        self.enabled = False
+        if metrics.stage_memory == self.stage:
+            metrics.stage_memory = None
+        tracemalloc.stop()
+
+    def _fold(self) -> int:
+        """Credit the peak since the last fold to every open stage and restart it; returns current bytes."""
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in self._open.values():
+            frame[1] = max(frame[1], peak)
+        tracemalloc.reset_peak()
+        return current
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with self._lock:
+            current = self._fold()
+            token = next(self._tokens)
+            frame = self._open[token] = [current, current]
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._fold()
+                del self._open[token]
+            used = max(0, frame[1] - frame[0])
+            metrics.STAGE_PEAK_BYTES.observe(used, stage=name)
+            peaks = _stage_peaks.get()
+            if peaks is not None:
+                peaks[name] = max(peaks.get(name, 0), used)
+
+    @contextmanager
+    def collect(self) -> Iterator[Optional[Dict[str, int]]]:
+        """Collect the stage peaks of one analysis (None when tracking is off)."""
+        if not self.enabled:
+            yield None
+            return
+        peaks: Dict[str, int] = {}
+        token = _stage_peaks.set(peaks)
+        try:
+            yield peaks
+        finally:
+            _stage_peaks.reset(token)
+
+
+class MemoryBudget:
+    """Admission control on the projected peak memory of in-flight work.
+
+    The projection is pixels x bytes-per-pixel for the operation. Work that
+    would push the reserved total over the budget is downsampled just enough
+    to fit; if that needs a scale below memory_min_scale it is refused.
+    """
+
+    def __init__(self, budget_mb: Optional[int] = None, min_scale: Optional[float] = None):
+        budget_mb = budget_mb if budget_mb is not None else settings.memory_budget_mb
+        self.budget = max(0, budget_mb) * 1024 * 1024
+        self.min_scale = min_scale if min_scale is not None else settings.memory_min_scale
+        self.bytes_per_pixel = dict(DEFAULT_BYTES_PER_PIXEL)
+        self.reserved = 0
+        self._lock = threading.Lock()
+
+    def project(self, pixels: int, operation: str) -> int:
+        """Projected peak bytes for running `operation` on `pixels` pixels."""
+        return int(pixels * self.bytes_per_pixel[operation])
+
+    def observe(self, operation: str, pixels: int, peak: int):
+        """Raise the per-pixel factor when a measured peak exceeds the projection."""
+        if pixels > 0:
+            with self._lock:
+                self.bytes_per_pixel[operation] = max(self.bytes_per_pixel[operation], peak / pixels)
+
+    @contextmanager
+    def admit(self, image: np.ndarray, operation: str) -> Iterator[np.ndarray]:
+        """Reserve memory for processing image, yielding it (possibly downsampled)."""
+        if self.budget <= 0:
+            yield image
+            return
+
+        height, width = image.shape[:2]
+        projected = self.project(height * width, operation)
+        with self._lock:
+            available = self.budget - self.reserved
+            scale = 1.0 if projected <= available else math.sqrt(max(0, available) / projected)
+            if scale < self.min_scale:
+                self._refuse(operation, available)
+            if scale < 1.0:
+                width, height = max(1, int(width * scale)), max(1, int(height * scale))
+                projected = self.project(height * width, operation)
+            self._add(projected)
+
+        try:
+            if scale < 1.0:
+                metrics.MEMORY_ADMISSIONS.inc(operation=operation, result='downsampled')
+                image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+            else:
+                metrics.MEMORY_ADMISSIONS.inc(operation=operation, result='admitted')
+            yield image
+        finally:
+            with self._lock:
+                self._add(-projected)
+
+    @contextmanager
+    def reserve(self, pixels: int, operation: str) -> Iterator[None]:
+        """Reserve memory for work that cannot be downsampled (e.g. decoding at a fixed size)."""
+        if self.budget <= 0:
+            yield
+            return
+
+        projected = self.project(pixels, operation)
+        with self._lock:
+            available = self.budget - self.reserved
+            if projected > available:
+                self._refuse(operation, available)
+            self._add(projected)
+        metrics.MEMORY_ADMISSIONS.inc(operation=operation, result='admitted')
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._add(-projected)
+
+    def _refuse(self, operation: str, available: int):
+        metrics.MEMORY_ADMISSIONS.inc(operation=operation, result='refused')
+        raise MemoryBudgetExceeded(
+            'The server is busy processing other images, please try again in a moment'
+            if available < self.budget else 'Image is too large to process'
+        )
+
+    def _add(self, nbytes: int):
+        self.reserved += nbytes
+        metrics.MEMORY_RESERVED.set(self.reserved)
+
+memory_tracker = StageMemoryTracker()
+memory_budget = MemoryBudget()
+
+if settings.memory_tracking if settings.memory_tracking is not None else settings.debug:
+    memory_tracker.enable()
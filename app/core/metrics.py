@@ -0,0 +1,322 @@
+import asyncio
+import bisect
+import functools
+import math
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, ContextManager, Coroutine, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.core.tracing import current_trace
+
+# Latency buckets in seconds, from fast helper calls up to a large-image KMeans run
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """Base class: a named metric family with optional labels.
+
+    Updates take a per-metric lock, so instrumented code may run on worker
+    threads as well as on the UI event loop.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed when scraped."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Compute the value at scrape time instead of tracking it."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        function = self._functions.get(key)
+        if function is not None:
+            return float(function())
+        return self._values.get(key, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            items[key] = float(function())
+        for key, value in sorted(items.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations (e.g. latencies in seconds)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [non-cumulative bucket counts (+Inf last), sum]
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(series[0]), series[1])) for key, series in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric already registered: {metric.name}')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Exposition text for every registered metric."""
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+registry = MetricsRegistry()
+
+STAGE_LATENCY = registry.histogram(
+    'color_harmony_stage_duration_seconds', 'Latency of service calls, handlers and UI updates.', ['stage'])
+STAGE_ERRORS = registry.counter(
+    'color_harmony_stage_errors_total', 'Stage calls that raised an exception.', ['stage'])
+ANALYSES = registry.counter(
+    'color_harmony_analyses_total', 'Skin tone analyses computed (cache misses).', ['source'])
+CACHE_REQUESTS = registry.counter(
+    'color_harmony_cache_requests_total', 'Cache lookups by cache and result.', ['cache', 'result'])
+ACTIVE_SESSIONS = registry.gauge(
+    'color_harmony_active_sessions', 'Browser sessions currently connected.')
+QUEUED_JOBS = registry.gauge(
+    'color_harmony_worker_queued_jobs', 'Jobs waiting for a free worker thread.')
+RUNNING_JOBS = registry.gauge(
+    'color_harmony_worker_running_jobs', 'Jobs currently running on worker threads.')
+RESIDENT_IMAGE_BYTES = registry.gauge(
+    'color_harmony_resident_image_bytes', 'Bytes of decoded images held by sessions and caches.')
+LOOP_LAG = registry.histogram(
+    'color_harmony_event_loop_lag_seconds', 'Delay between a scheduled loop wake-up and when it ran.',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+LOOP_LAG_QUANTILES = registry.gauge(
+    'color_harmony_event_loop_lag_recent_seconds', 'Event-loop lag percentiles over the recent window.', ['quantile'])
+LOOP_STALLS = registry.counter(
+    'color_harmony_event_loop_stalls_total', 'Times the loop was blocked longer than the warning threshold.')
+STAGE_PEAK_BYTES = registry.histogram(
+    'color_harmony_stage_peak_bytes', 'Peak bytes allocated per stage (memory tracking mode).', ['stage'],
+    buckets=tuple(2 ** power for power in range(16, 32, 2)))
+MEMORY_RESERVED = registry.gauge(
+    'color_harmony_memory_reserved_bytes', 'Projected peak memory reserved by in-flight analyses.')
+MEMORY_ADMISSIONS = registry.counter(
+    'color_harmony_memory_admissions_total', 'Memory budget decisions by operation and result.',
+    ['operation', 'result'])
+RATE_LIMIT_REJECTIONS = registry.counter(
+    'color_harmony_rate_limit_rejections_total', 'Requests turned away by rate limits or the concurrency cap.',
+    ['action', 'reason'])
+ANALYSES_IN_FLIGHT = registry.gauge(
+    'color_harmony_analyses_in_flight', 'Analysis requests holding a slot under the global concurrency cap.')
+DECODE_ADMISSIONS = registry.counter(
+    'color_harmony_decode_admissions_total', 'Images admitted for decoding (full or reduced) or rejected from their header.',
+    ['format', 'route'])
+VIDEO_FRAMES = registry.counter(
+    'color_harmony_video_frames_total', 'Video frames read, analyzed (sampled) and face-detected (keyframes).',
+    ['kind'])
+LIVE_FRAMES = registry.counter(
+    'color_harmony_live_frames_total', 'Live camera frames by outcome (changed, unchanged, dropped, over_budget, ...).',
+    ['result'])
+STARTUP_SECONDS = registry.gauge(
+    'color_harmony_startup_seconds', 'Seconds from process start to each startup milestone.', ['phase'])
+BLOCKING_CALLS = registry.counter(
+    'color_harmony_blocking_calls_total', 'Awaited stages that held the event loop past the threshold (debug mode).',
+    ['stage'])
+WEBSOCKET_BYTES = registry.counter(
+    'color_harmony_websocket_bytes_total', 'Outbound websocket payload bytes by UI component.', ['component'])
+WEBSOCKET_MESSAGES = registry.counter(
+    'color_harmony_websocket_messages_total', 'Outbound websocket messages carrying data of each UI component.',
+    ['component'])
+WEBSOCKET_ELEMENTS = registry.counter(
+    'color_harmony_websocket_elements_total', 'Elements sent (update) or removed (delete) over the websocket.',
+    ['component', 'operation'])
+SESSION_WEBSOCKET_BYTES = registry.histogram(
+    'color_harmony_session_websocket_bytes', 'Outbound websocket payload bytes per browser session.',
+    buckets=tuple(4 ** power for power in range(6, 15)))
+SESSION_WEBSOCKET_MESSAGES = registry.histogram(
+    'color_harmony_session_websocket_messages', 'Outbound websocket messages per browser session.',
+    buckets=(10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000))
+
+
+# Installed by the loop monitor in debug mode: awaits a stage coroutine and
+# reports how long it held the event loop without yielding
+blocking_detector: Optional[Callable[[str, Coroutine], Awaitable[Any]]] = None
+
+# Installed by the memory tracker: context manager measuring a stage's peak allocations
+stage_memory: Optional[Callable[[str], ContextManager]] = None
+
+
+def _record(stage: str, start: float, histogram: Histogram):
+    end = time.perf_counter()
+    histogram.observe(end - start, stage=stage)
+    trace = current_trace()
+    if trace is not None:
+        trace.add_span(stage, start, end)
+
+
+def timed(stage: str, histogram: Histogram = STAGE_LATENCY, errors: Counter = STAGE_ERRORS):
+    """Decorator recording the latency (and failures) of a sync or async callable.
+
+    When the current request is being traced, the call is also recorded as a
+    span in the trace timeline.
+    """
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    with stage_memory(stage) if stage_memory is not None else nullcontext():
+                        if blocking_detector is not None:
+                            return await blocking_detector(stage, func(*args, **kwargs))
+                        return await func(*args, **kwargs)
+                except Exception:
+                    errors.inc(stage=stage)
+                    raise
+                finally:
+                    _record(stage, start, histogram)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with stage_memory(stage) if stage_memory is not None else nullcontext():
+                    return func(*args, **kwargs)
+            except Exception:
+                errors.inc(stage=stage)
+                raise
+            finally:
+                _record(stage, start, histogram)
+        return wrapper
+
+    return decorator
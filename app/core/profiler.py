@@ -0,0 +1,165 @@
+import contextvars
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+from app.core.tracing import current_trace
+
+PROFILE_MODES = ('sampling', 'cprofile')
+
+_profiling: contextvars.ContextVar[bool] = contextvars.ContextVar('profiling', default=False)
+
+
+class StackSampler:
+    """Low-overhead sampling profiler for a single thread.
+
+    A background thread snapshots the target thread's stack every interval
+    and counts identical stacks, producing folded output ("a;b;c 42") that
+    flamegraph.pl, speedscope and Perfetto read directly.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_fold(frame)] += 1
+
+    def folded(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Profiler:
+    """Profiles the next N analyses on demand.
+
+    Armed at startup through settings.profile_next_analyses or at runtime
+    through the admin endpoint. Output goes to settings.profile_dir, named
+    after the request id (shared with the trace when tracing is on):
+    ``<id>.folded`` for the sampling profiler, ``<id>.prof`` (pstats) for
+    cProfile.
+    """
+
+    def __init__(self):
+        self.remaining = max(0, settings.profile_next_analyses)
+        self.mode = settings.profile_mode if settings.profile_mode in PROFILE_MODES else 'sampling'
+        self.interval = settings.profile_interval_ms / 1000
+        self.outputs: List[str] = []
+        self._lock = threading.Lock()
+
+    def arm(self, count: int, mode: Optional[str] = None, interval_ms: Optional[float] = None):
+        """Profile the next `count` analyses."""
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode} (expected one of {', '.join(PROFILE_MODES)})")
+        with self._lock:
+            self.remaining = max(0, count)
+            if mode is not None:
+                self.mode = mode
+            if interval_ms is not None:
+                self.interval = max(0.001, interval_ms / 1000)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'remaining': self.remaining,
+            'mode': self.mode,
+            'interval_ms': self.interval * 1000,
+            'outputs': self.outputs[-20:],
+        }
+
+    def _claim(self) -> bool:
+        if self.remaining <= 0 or _profiling.get():
+            return False
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    async def run(self, coro_func: Callable, *args, **kwargs) -> Any:
+        """Await coro_func(*args, **kwargs), profiling it if a slot is claimed."""
+        if not self._claim():
+            return await coro_func(*args, **kwargs)
+
+        trace = current_trace()
+        request_id = trace.request_id if trace is not None else uuid.uuid4().hex[:12]
+        token = _profiling.set(True)
+        start = time.perf_counter()
+
+        profile = cProfile.Profile() if self.mode == 'cprofile' else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile at a time; sample this analysis instead
+                profile = None
+
+        if profile is not None:
+            try:
+                return await coro_func(*args, **kwargs)
+            finally:
+                profile.disable()
+                _profiling.reset(token)
+                self._save(request_id, '.prof', lambda path: profile.dump_stats(path), start)
+
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        try:
+            return await coro_func(*args, **kwargs)
+        finally:
+            sampler.stop()
+            _profiling.reset(token)
+            self._save(request_id, '.folded', lambda path: _write_text(path, sampler.folded()), start)
+
+    def _save(self, request_id: str, extension: str, write: Callable[[str], None], start: float):
+        try:
+            os.makedirs(settings.profile_dir, exist_ok=True)
+            path = os.path.join(settings.profile_dir, f'{request_id}{extension}')
+            write(path)
+            with self._lock:
+                self.outputs.append(path)
+            print(f"Profiled analysis {request_id} ({(time.perf_counter() - start) * 1000:.0f} ms) -> {path}")
+        except OSError as e:
+            print(f"Error saving profile {request_id}: {e}")
+
+
+def _write_text(path: str, text: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def profiled(func: Callable) -> Callable:
+    """Decorator routing an async analysis entry point through the profiler."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await profiler.run(func, *args, **kwargs)
+    return wrapper
+
+
+profiler = Profiler()
@@ -0,0 +1,171 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+from app.config import settings
+from app.core import metrics
+from app.core.concurrency import concurrency
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a client, or the server as a whole, is over its analysis limits."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Allows `burst` operations at once, refilled at `rate` per second."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def wait_time(self, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available (0 when they are now)."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # Requests costing more than the burst are allowed from a full bucket
+        missing = min(cost, self.burst) - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, cost: float):
+        self.tokens -= cost
+
+
+def _default_limits() -> Dict[Tuple[str, str], Tuple[float, float]]:
+    """(action, scope) -> (operations per minute, burst) from settings."""
+    ip = settings.rate_limit_ip_multiplier
+    return {
+        ('upload', 'session'): (settings.upload_rate_per_minute, settings.upload_burst),
+        ('upload', 'ip'): (settings.upload_rate_per_minute * ip, settings.upload_burst * ip),
+        ('analysis', 'session'): (settings.analysis_rate_per_minute, settings.analysis_burst),
+        ('analysis', 'ip'): (settings.analysis_rate_per_minute * ip, settings.analysis_burst * ip),
+        ('api', 'ip'): (settings.api_rate_per_minute, settings.api_burst),
+    }
+
+
+class RateLimiter:
+    """Token buckets per action and client (browser session and IP address).
+
+    A request is charged against every bucket it maps to, and only when all
+    of them have room, so a rejected request does not use up any quota. The
+    per-IP limits cover clients that reload the page for a fresh session.
+    Idle buckets are forgotten least-recently-used first beyond max_keys.
+    """
+
+    def __init__(self, limits: Optional[Dict[Tuple[str, str], Tuple[float, float]]] = None,
+                 enabled: Optional[bool] = None, max_keys: int = 10000):
+        self.limits = limits if limits is not None else _default_limits()
+        self.enabled = enabled if enabled is not None else settings.rate_limit_enabled
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Tuple[str, str, str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, action: str, cost: float = 1, **keys: Optional[str]):
+        """Charge `cost` operations of `action` to each client key, or raise RateLimitExceeded."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            buckets = []
+            for scope, key in keys.items():
+                limit = self.limits.get((action, scope))
+                if key is None or limit is None:
+                    continue
+                bucket = self._bucket(action, scope, key, limit, now)
+                wait = bucket.wait_time(cost, now)
+                if wait > 0:
+                    metrics.RATE_LIMIT_REJECTIONS.inc(action=action, reason=scope)
+                    raise RateLimitExceeded(
+                        f'You are going a bit fast, please try again in {math.ceil(wait)} s', retry_after=wait)
+                buckets.append(bucket)
+            for bucket in buckets:
+                bucket.take(cost)
+
+    def _bucket(self, action: str, scope: str, key: str, limit: Tuple[float, float], now: float) -> TokenBucket:
+        name = (action, scope, key)
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            per_minute, burst = limit
+            bucket = self._buckets[name] = TokenBucket(per_minute / 60.0, burst, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(name)
+        return bucket
+
+
+class ConcurrencyLimiter:
+    """Global cap on analyses in flight, rejecting instead of queueing.
+
+    Work past the cap would only wait in the worker pool queue while every
+    session's latency grows, so it is turned away straight away instead.
+    A single request larger than the cap is still admitted when idle.
+    """
+
+    def __init__(self, limit: Optional[int] = None, enabled: Optional[bool] = None):
+        if limit is None:
+            limit = settings.max_concurrent_analyses or 4 * concurrency.worker_threads
+        self.limit = limit
+        self.enabled = enabled if enabled is not None else settings.rate_limit_enabled
+        self.active = 0
+        self._lock = threading.Lock()
+        metrics.ANALYSES_IN_FLIGHT.set_function(lambda: self.active)
+
+    def reserve(self, action: str, count: int = 1) -> Callable[[], None]:
+        """Reserve `count` slots or raise RateLimitExceeded; returns an idempotent release."""
+        with self._lock:
+            if self.enabled and self.active and self.active + count > self.limit:
+                metrics.RATE_LIMIT_REJECTIONS.inc(action=action, reason='busy')
+                raise RateLimitExceeded('The server is busy right now, please try again in a few seconds')
+            self.active += count
+
+        released = False
+
+        def release():
+            nonlocal released
+            with self._lock:
+                if not released:
+                    released = True
+                    self.active -= count
+        return release
+
+    @contextmanager
+    def slot(self, action: str, count: int = 1) -> Iterator[None]:
+        release = self.reserve(action, count)
+        try:
+            yield
+        finally:
+            release()
+
+
+def client_ip(scope: Mapping[str, Any]) -> Optional[str]:
+    """Client address of an ASGI scope, as reported by a trusted proxy when enabled.
+
+    Clients can send X-Forwarded-For themselves, so only the proxy's own
+    Fly-Client-IP header or the rightmost X-Forwarded-For entry (the one the
+    proxy appended) is trusted.
+    """
+    if settings.rate_limit_trust_forwarded:
+        forwarded = None
+        for name, value in scope.get('headers') or []:
+            if name == b'fly-client-ip':
+                return value.decode('latin-1').strip()
+            if name == b'x-forwarded-for':
+                forwarded = value
+        if forwarded is not None:
+            return forwarded.decode('latin-1').rsplit(',', 1)[-1].strip()
+    client = scope.get('client')
+    return client[0] if client else None
+
+
+rate_limiter = RateLimiter()
+analysis_slots = ConcurrencyLimiter()
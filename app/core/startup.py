@@ -0,0 +1,44 @@
+import os
+import time
+from typing import Callable, Dict
+from app.core import metrics
+
+# Fallback reference when the process start time cannot be read
+_imported_at = time.monotonic()
+
+_milestones: Dict[str, float] = {}
+
+
+def process_uptime() -> float:
+    """Seconds since this process started (from /proc on Linux)."""
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            # Field 22 is the start time in clock ticks since boot; the command name may contain spaces
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - _imported_at
+
+
+def mark(phase: str) -> None:
+    """Record the first time a startup milestone is reached."""
+    if phase in _milestones:
+        return
+    elapsed = process_uptime()
+    _milestones[phase] = elapsed
+    metrics.STARTUP_SECONDS.set(elapsed, phase=phase)
+    print(f"Startup: {phase} after {elapsed:.2f}s")
+
+
+def milestones() -> Dict[str, float]:
+    return dict(_milestones)
+
+
+async def first_byte_middleware(request, call_next: Callable):
+    """HTTP middleware marking when the first response is sent."""
+    response = await call_next(request)
+    if 'first_byte' not in _milestones:
+        mark('first_byte')
+    return response
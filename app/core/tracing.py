@@ -0,0 +1,135 @@
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from app.config import settings
+
+_current_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('current_trace', default=None)
+
+
+class Trace:
+    """Timeline of nested spans recorded for one request.
+
+    Spans are stored as Chrome "complete" events (ph='X'); nesting is implied
+    by time containment on the same thread, which is how Chrome's
+    about:tracing and Perfetto render them. Worker threads get their own
+    track, so time spent queued for the pool is visible as a gap.
+    """
+
+    def __init__(self, name: str, request_id: Optional[str] = None):
+        self.name = name
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, end: float, args: Optional[Dict[str, Any]] = None):
+        """Record a span from perf_counter() timestamps."""
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'cat': name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': round((start - self._origin) * 1e6, 3),
+            'dur': round((end - start) * 1e6, 3),
+            'pid': os.getpid(),
+            'tid': thread.ident,
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Trace Event Format document (JSON object form)."""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+            for tid, name in threads.items()
+        ]
+        return {
+            'traceEvents': metadata + sorted(events, key=lambda event: event['ts']),
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'request_id': self.request_id,
+                'request': self.name,
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            },
+        }
+
+    def save(self, directory: Optional[str] = None) -> str:
+        """Write the trace as JSON and return its path."""
+        directory = directory or settings.trace_dir
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started_at))
+        path = os.path.join(directory, f'{stamp}_{self.name}_{self.request_id}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome(), f)
+        return path
+
+
+def current_trace() -> Optional[Trace]:
+    """The trace being recorded for the current request, if any."""
+    return _current_trace.get()
+
+
+def should_trace() -> bool:
+    """Apply the enabled flag and sampling rate."""
+    return settings.trace_enabled and random.random() < settings.trace_sample_rate
+
+
+@contextmanager
+def span(name: str, **args) -> Iterator[None]:
+    """Record a nested span when the current request is traced (no-op otherwise)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter(), args or None)
+
+
+def traced_request(name: str):
+    """Decorator starting a (sampled) trace around an async request handler.
+
+    The trace is saved under settings.trace_dir when the handler finishes.
+    Spans from timed() stages and span() blocks, including those running on
+    the worker pool, are collected into it.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _current_trace.get() is not None or not should_trace():
+                return await func(*args, **kwargs)
+
+            trace = Trace(name)
+            token = _current_trace.set(trace)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                trace.add_span(name, start, time.perf_counter(), {'request_id': trace.request_id})
+                _current_trace.reset(token)
+                try:
+                    trace.save()
+                except OSError as e:
+                    print(f"Error saving trace {trace.request_id}: {e}")
+        return wrapper
+
+    return decorator
@@ -0,0 +1,124 @@
+import inspect
+from typing import Any, Dict
+from nicegui import Client, json
+from nicegui.element import Element
+from nicegui.outbox import Outbox
+from app.core.metrics import (SESSION_WEBSOCKET_BYTES, SESSION_WEBSOCKET_MESSAGES, WEBSOCKET_BYTES, WEBSOCKET_ELEMENTS,
+                              WEBSOCKET_MESSAGES)
+
+# Component of elements outside every tagged subtree, and of messages other than element updates
+PAGE = 'page'
+
+# Outbox methods SessionTraffic wraps, with their parameters (NiceGUI 1.4, pinned in requirements.txt)
+OUTBOX_HOOKS = {
+    'enqueue_delete': ('element',),
+    '_emit': ('message_type', 'data', 'target_id'),
+}
+
+
+def _check_outbox_hooks():
+    """Fail at import rather than silently stop metering when NiceGUI changes its outbox."""
+    for name, parameters in OUTBOX_HOOKS.items():
+        method = getattr(Outbox, name, None)
+        if not callable(method) or tuple(inspect.signature(method).parameters)[1:] != parameters:
+            raise RuntimeError(f'Websocket metering needs Outbox.{name}{parameters} of NiceGUI 1.4; '
+                               f'this NiceGUI version does not provide it')
+
+
+_check_outbox_hooks()
+
+
+def _size(data: Any) -> int:
+    """UTF-8 bytes of data as the websocket sends it."""
+    return len(json.dumps(data).encode())
+
+
+class SessionTraffic:
+    """Outbound websocket traffic of one browser session, attributed to UI components.
+
+    NiceGUI batches pending element changes into one 'update' message per
+    outbox cycle, mapping element ids to their full serialized state (None
+    for a deletion). This wraps the client's outbox: every element is
+    attributed to the nearest ancestor tagged with tag(), each entry's
+    serialized size counts as that component's bytes, and each message counts
+    once for every component it carries data of. Other messages (notifications,
+    JavaScript calls) are attributed to 'page'. Totals are kept per session and
+    exported as counters; when the session ends its totals are observed in the
+    per-session histograms.
+    """
+
+    def __init__(self, client: Client):
+        self.client = client
+        self.bytes: Dict[str, int] = {}
+        self.messages: Dict[str, int] = {}
+        self.elements: Dict[str, int] = {}
+        # Messages actually sent (one message may count for several components)
+        self.sent = 0
+        self._roots: Dict[int, str] = {}
+        # Component of elements deleted since the last send, resolved while they are still attached
+        self._deleted: Dict[int, str] = {}
+        self._closed = False
+
+        outbox = client.outbox
+        self._enqueue_delete, self._emit = outbox.enqueue_delete, outbox._emit
+        outbox.enqueue_delete = self._count_delete
+        outbox._emit = self._count_emit
+        client.on_disconnect(self.close)
+
+    def tag(self, element: Element, component: str) -> Element:
+        """Attribute element and its descendants to component (the nearest tag wins)."""
+        self._roots[element.id] = component
+        return element
+
+    def totals(self) -> Dict[str, Any]:
+        return {'bytes': dict(self.bytes), 'messages': dict(self.messages), 'elements': dict(self.elements),
+                'sent': self.sent}
+
+    def close(self):
+        """Report the session's totals; called when the client disconnects for good."""
+        if self._closed:
+            return
+        self._closed = True
+        SESSION_WEBSOCKET_BYTES.observe(sum(self.bytes.values()))
+        SESSION_WEBSOCKET_MESSAGES.observe(self.sent)
+
+    def _component(self, element: Element) -> str:
+        for ancestor in element.ancestors(include_self=True):
+            component = self._roots.get(ancestor.id)
+            if component is not None:
+                return component
+        return PAGE
+
+    def _count_delete(self, element: Element) -> None:
+        if not self._closed:
+            self._deleted[element.id] = self._component(element)
+            self._roots.pop(element.id, None)
+        self._enqueue_delete(element)
+
+    async def _count_emit(self, message_type: str, data: Any, target_id: str) -> None:
+        if not self._closed:
+            self.sent += 1
+            if message_type == 'update':
+                sizes: Dict[str, int] = {}
+                for element_id, element in data.items():
+                    if element is None:
+                        component = self._deleted.pop(element_id, PAGE)
+                    else:
+                        component = self._component(self.client.elements[element_id])
+                    sizes[component] = sizes.get(component, 0) + _size({element_id: element})
+                    operation = 'delete' if element is None else 'update'
+                    self._add(self.elements, f'{component}.{operation}', 1)
+                    WEBSOCKET_ELEMENTS.inc(component=component, operation=operation)
+            else:
+                sizes = {PAGE: _size(data)}
+            for component, size in sizes.items():
+                self._add(self.bytes, component, size)
+                self._add(self.messages, component, 1)
+                WEBSOCKET_BYTES.inc(size, component=component)
+                WEBSOCKET_MESSAGES.inc(component=component)
+        await self._emit(message_type, data, target_id)
+
+    @staticmethod
+    def _add(totals: Dict[str, int], key: str, amount: int):
+        totals[key] = totals.get(key, 0) + amount
+
@@ -1,143 +1,150 @@
 import asyncio
 import os
 import uuid
-from typing import Optional, Dict, Any
+import weakref
+from typing import Optional, Dict, Any, List
 from nicegui import ui, app, events
 import numpy as np
 
 from app.config import settings
+from app.core.assets import assets
+from app.core.buffers import BufferPool
+from app.core.concurrency import concurrency
+from app.core.metrics import ACTIVE_SESSIONS, QUEUED_JOBS, RESIDENT_IMAGE_BYTES, RUNNING_JOBS, STAGE_ERRORS, timed
+from app.core.rate_limit import RateLimitExceeded, analysis_slots, client_ip, rate_limiter
+from app.core.tracing import traced_request
+from app.core.traffic import SessionTraffic
+from app.core.loop_monitor import loop_monitor
+from app.core import startup
 from app.components.image_upload import ImageUploadComponent
 from app.components.skin_tone_analysis import SkinToneAnalysisComponent
 from app.components.color_recommendations import ColorRecommendationsComponent
 from app.components.skin_tone_adjuster import SkinToneAdjusterComponent
-from app.services.color_service import ColorService
-from app.services.image_service import ImageService
+from app.components.live_camera import LiveCameraComponent
+from app.services.image_service import image_service
+from app.services.color_service import color_service
+from app.services.analysis_service import analysis_service
+from app.services.adjustment_cache import AdjustmentCache
+from app.services.live_service import LiveSession
+from app.services.worker_pool import worker_pool
+from app.api.analysis import router as analysis_router
+from app.api.metrics import router as metrics_router
+from app.api.admin import router as admin_router
+from app.api.assets import router as assets_router
 
-# Initialize services
-color_service = ColorService()
-image_service = ImageService()
+# No-op when main.py already configured threads; resizes running pools otherwise
+concurrency.configure()
 
-# Global state for the application
+# JSON API routes share the services, caches and worker pool with the UI
+app.include_router(analysis_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
+app.include_router(assets_router)
+
+# Page styles: fingerprinted and precompressed once, linked from every page
+ui.add_head_html(assets.stylesheet('css/app.css'), shared=True)
+
+# State of one browser session (the page's images and results)
 class AppState:
     def __init__(self):
         self.current_image: Optional[np.ndarray] = None
         self.original_image: Optional[np.ndarray] = None
+        self.preview_image: Optional[np.ndarray] = None
         self.analysis_results: Optional[Dict[str, Any]] = None
         self.color_recommendations: Optional[Dict[str, Any]] = None
         self.uploaded_filename: Optional[str] = None
         self.processing: bool = False
 
-app_state = AppState()
+# State, adjustment caches and buffer pools of open sessions, for the resident image bytes gauge
+session_states: "weakref.WeakSet[AppState]" = weakref.WeakSet()
+session_caches: "weakref.WeakSet[AdjustmentCache]" = weakref.WeakSet()
+session_buffers: "weakref.WeakSet[BufferPool]" = weakref.WeakSet()
+
+def resident_image_bytes() -> int:
+    """Bytes of decoded images currently held by session states, session caches and buffer pools."""
+    images = {id(image): image for state in list(session_states)
+              for image in (state.current_image, state.original_image, state.preview_image) if image is not None}
+    held = sum(image.nbytes for image in images.values())
+    return held + sum(cache.nbytes for cache in list(session_caches)) + sum(pool.nbytes for pool in list(session_buffers))
+
+RESIDENT_IMAGE_BYTES.set_function(resident_image_bytes)
+QUEUED_JOBS.set_function(lambda: worker_pool.queued)
+RUNNING_JOBS.set_function(lambda: worker_pool.running)
+app.on_connect(lambda: ACTIVE_SESSIONS.inc())
+app.on_disconnect(lambda: ACTIVE_SESSIONS.dec())
+
+# Sample event-loop lag for the lifetime of the server
+app.on_startup(loop_monitor.start)
+app.on_shutdown(loop_monitor.stop)
+
+# Startup milestones: first response served, first analysis, warm-up done
+app.middleware('http')(startup.first_byte_middleware)
+
+async def warm_up():
+    """Preload sklearn, the face cascade and the color name tables off the event loop."""
+    if not settings.warmup_enabled:
+        return
+    # Let the server finish binding before competing for the CPU
+    await asyncio.sleep(0.5)
+    try:
+        await worker_pool.run(color_service.warm_up)
+        await worker_pool.run(image_service.warm_up)
+        startup.mark('warmup')
+    except Exception as e:
+        print(f"Error during warm-up: {e}")
+
+# Async startup handlers run as background tasks, so this does not delay binding
+app.on_startup(warm_up)
+
+async def compare_presets(image: np.ndarray, presets: List[Dict[str, Any]],
+                          buffers: Optional[BufferPool] = None) -> List[Dict[str, Any]]:
+    """Adjust, analyze and build recommendations for every preset in one worker pool job."""
+    results = await analysis_service.analyze_presets(image, [preset['adjustments'] for preset in presets], buffers)
+    comparison = []
+    for preset, (adjusted, analysis, recommendations) in zip(presets, results):
+        thumbnail = await image_service.create_thumbnail(adjusted)
+        if buffers is not None:
+            buffers.give(adjusted)
+        comparison.append({
+            'preset': preset,
+            'preview': thumbnail,
+            'analysis': analysis,
+            'recommendations': recommendations
+        })
+    return comparison
 
 @ui.page('/')
 async def main_page():
     """Main application page."""
     
-    # Custom CSS for the application
-    ui.add_head_html('''
-    <style>
-        .main-container {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-        
-        .content-card {
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(10px);
-            border-radius: 20px;
-            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
-            padding: 30px;
-            margin: 20px auto;
-            max-width: 1200px;
-        }
-        
-        .header-title {
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            font-size: 2.5rem;
-            font-weight: bold;
-            text-align: center;
-            margin-bottom: 10px;
-        }
-        
-        .header-subtitle {
-            color: #666;
-            text-align: center;
-            font-size: 1.1rem;
-            margin-bottom: 30px;
-        }
-        
-        .section-card {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            margin: 20px 0;
-            box-shadow: 0 5px 15px rgba(0, 0, 0, 0.08);
-            border: 1px solid rgba(0, 0, 0, 0.05);
-        }
-        
-        .section-title {
-            color: #333;
-            font-size: 1.4rem;
-            font-weight: 600;
-            margin-bottom: 15px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
-        
-        .loading-overlay {
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            background: rgba(0, 0, 0, 0.7);
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            z-index: 1000;
-        }
-        
-        .loading-content {
-            background: white;
-            padding: 30px;
-            border-radius: 15px;
-            text-align: center;
-            box-shadow: 0 10px 30px rgba(0, 0, 0, 0.3);
-        }
-        
-        .error-message {
-            background: #fee;
-            border: 1px solid #fcc;
-            color: #c33;
-            padding: 15px;
-            border-radius: 10px;
-            margin: 10px 0;
-        }
-        
-        .success-message {
-            background: #efe;
-            border: 1px solid #cfc;
-            color: #3c3;
-            padding: 15px;
-            border-radius: 10px;
-            margin: 10px 0;
-        }
-    </style>
-    ''')
+    # This session's images and results; never shared with other sessions
+    app_state = AppState()
+    session_states.add(app_state)
+    
+    # Per-session memo of adjustment results, also backing undo/redo
+    adjustment_cache = AdjustmentCache()
+    session_caches.add(adjustment_cache)
+    
+    # Per-session arrays reused by every adjustment of the uploaded image
+    buffer_pool = BufferPool()
+    session_buffers.add(buffer_pool)
+    
+    # Rate limit keys; the IP is only known once the websocket has connected
+    client = ui.context.client
+    def client_keys() -> Dict[str, Optional[str]]:
+        return {'session': client.id, 'ip': client_ip(client.environ['asgi.scope']) if client.environ else None}
+    
+    # Outbound websocket bytes and messages of this session, by section
+    traffic = SessionTraffic(client)
     
     # Loading overlay
-    loading_overlay = ui.element('div').classes('loading-overlay').style('display: none;')
+    loading_overlay = traffic.tag(ui.element('div').classes('loading-overlay').style('display: none;'), 'loading')
     with loading_overlay:
         with ui.element('div').classes('loading-content'):
             ui.spinner(size='lg')
             ui.label('Analyzing your image...').classes('text-lg mt-4')
     
-    # Main container
+    # Main container (handlers are bound lazily since they are defined below)
     with ui.element('div').classes('main-container'):
         with ui.element('div').classes('content-card'):
             # Header
@@ -145,25 +152,45 @@ async def main_page():
             ui.html('<p class="header-subtitle">Discover your perfect colors with AI-powered skin tone analysis</p>')
             
             # Image Upload Section
-            with ui.element('div').classes('section-card'):
+            with traffic.tag(ui.element('div').classes('section-card'), 'upload'):
                 ui.html('<h2 class="section-title">📸 Upload Your Photo</h2>')
-                upload_component = ImageUploadComponent(on_upload=handle_image_upload)
+                upload_component = ImageUploadComponent(
+                    on_upload=lambda file_path, filename: handle_image_upload(file_path, filename),
+                    admit=lambda: rate_limiter.check('upload', **client_keys())
+                )
+            
+            # Live Camera Section (frames over the websocket, analyzed under a per-frame budget)
+            if settings.live_enabled:
+                live_session = LiveSession(image_service, color_service, worker_pool)
+                with traffic.tag(ui.element('div').classes('section-card'), 'live'):
+                    ui.html('<h2 class="section-title">📹 Live Camera</h2>')
+                    LiveCameraComponent(
+                        on_frame=live_session.submit,
+                        on_stop=live_session.reset,
+                        stats=lambda: live_session.counts
+                    )
             
             # Analysis Results Section
             analysis_container = ui.element('div').style('display: none;')
             with analysis_container:
-                with ui.element('div').classes('section-card'):
+                with traffic.tag(ui.element('div').classes('section-card'), 'analysis'):
                     ui.html('<h2 class="section-title">🔍 Skin Tone Analysis</h2>')
                     analysis_component = SkinToneAnalysisComponent()
                 
-                with ui.element('div').classes('section-card'):
+                with traffic.tag(ui.element('div').classes('section-card'), 'recommendations'):
                     ui.html('<h2 class="section-title">🎨 Color Recommendations</h2>')
                     recommendations_component = ColorRecommendationsComponent()
                 
-                with ui.element('div').classes('section-card'):
+                with traffic.tag(ui.element('div').classes('section-card'), 'adjuster'):
                     ui.html('<h2 class="section-title">🎛️ Adjust Skin Tone</h2>')
-                    adjuster_component = SkinToneAdjusterComponent(on_adjust=handle_skin_tone_adjustment)
+                    adjuster_component = SkinToneAdjusterComponent(
+                        on_adjust=lambda adjustments: handle_skin_tone_adjustment(adjustments),
+                        on_history=lambda direction: handle_adjustment_history(direction),
+                        on_compare=lambda presets: handle_preset_comparison(presets)
+                    )
     
+    @traced_request('upload')
+    @timed('ui.handle_image_upload')
     async def handle_image_upload(file_path: str, filename: str):
         """Handle image upload and analysis."""
         try:
@@ -171,19 +198,26 @@ async def main_page():
             loading_overlay.style('display: flex;')
             app_state.processing = True
             
-            # Load and process image
-            app_state.original_image = await image_service.load_image(file_path)
-            app_state.current_image = app_state.original_image.copy()
+            # Load the image and run skin tone analysis plus recommendations
+            with analysis_slots.slot('upload'):
+                result = await analysis_service.analyze_file(file_path)
+            app_state.original_image = result['image']
+            # Adjustments never write into their input, so no copy is needed
+            app_state.current_image = app_state.original_image
             app_state.uploaded_filename = filename
+            app_state.analysis_results = result['analysis']
+            app_state.color_recommendations = result['recommendations']
             
-            # Perform skin tone analysis
-            app_state.analysis_results = await color_service.analyze_skin_tone(app_state.current_image)
-            
-            # Get color recommendations
-            app_state.color_recommendations = await color_service.get_color_recommendations(app_state.analysis_results)
+            # Seed the adjustment cache with the unadjusted result so undo can return to it
+            adjustment_cache.clear()
+            buffer_pool.clear()
+            preview = await image_service.create_preview(app_state.current_image)
+            app_state.preview_image = preview
+            adjustment_cache.put({}, app_state.analysis_results, app_state.color_recommendations, preview)
+            adjustment_cache.record({})
             
             # Update UI components
-            await analysis_component.update_analysis(app_state.analysis_results, app_state.current_image)
+            await analysis_component.update_analysis(app_state.analysis_results, preview)
             await recommendations_component.update_recommendations(app_state.color_recommendations)
             await adjuster_component.update_image(app_state.current_image)
             
@@ -196,36 +230,91 @@ async def main_page():
             
             ui.notify('✅ Analysis complete! Scroll down to see your results.', type='positive')
             
+        except RateLimitExceeded as e:
+            loading_overlay.style('display: none;')
+            app_state.processing = False
+            ui.notify(f'⏳ {str(e)}', type='warning')
         except Exception as e:
+            STAGE_ERRORS.inc(stage='ui.handle_image_upload')
             loading_overlay.style('display: none;')
             app_state.processing = False
             ui.notify(f'❌ Error analyzing image: {str(e)}', type='negative')
             print(f"Error in image analysis: {e}")
     
+    async def apply_adjustments(adjustments: Dict[str, Any]):
+        """Apply adjustments, reusing the session cache when the tuple was seen before."""
+        adjustments = adjustment_cache.quantize(adjustments)
+        cached = adjustment_cache.get(adjustments)
+        
+        if cached is None:
+            # Apply adjustments to original image and re-analyze (cache hits are not rate limited)
+            rate_limiter.check('analysis', **client_keys())
+            with analysis_slots.slot('analysis'):
+                adjusted, analysis_results, color_recommendations = await analysis_service.analyze_adjusted(
+                    app_state.original_image, adjustments, buffer_pool
+                )
+                preview = await image_service.create_preview(adjusted)
+            # Only the preview outlives this adjustment (unless the image is already preview-sized)
+            if preview is not adjusted:
+                buffer_pool.give(adjusted)
+            app_state.current_image = preview
+            cached = adjustment_cache.put(adjustments, analysis_results, color_recommendations, preview)
+        else:
+            # Only the preview render is kept for cached tuples
+            app_state.current_image = cached.preview
+        
+        app_state.analysis_results = cached.analysis
+        app_state.color_recommendations = cached.recommendations
+        
+        # Update UI components
+        await analysis_component.update_analysis(cached.analysis, cached.preview)
+        await recommendations_component.update_recommendations(cached.recommendations)
+        return cached
+    
+    @traced_request('adjustment')
+    @timed('ui.handle_skin_tone_adjustment')
     async def handle_skin_tone_adjustment(adjustments: Dict[str, Any]):
         """Handle skin tone adjustments."""
         try:
             if app_state.original_image is None:
                 return
             
-            # Apply adjustments to original image
-            app_state.current_image = await image_service.adjust_skin_tone(
-                app_state.original_image, adjustments
-            )
-            
-            # Re-analyze with adjusted image
-            app_state.analysis_results = await color_service.analyze_skin_tone(app_state.current_image)
-            app_state.color_recommendations = await color_service.get_color_recommendations(app_state.analysis_results)
-            
-            # Update UI components
-            await analysis_component.update_analysis(app_state.analysis_results, app_state.current_image)
-            await recommendations_component.update_recommendations(app_state.color_recommendations)
+            cached = await apply_adjustments(adjustments)
+            adjustment_cache.record(cached.adjustments)
             
             ui.notify('🎨 Skin tone adjusted successfully!', type='positive')
             
+        except RateLimitExceeded:
+            # Reported by the adjuster, which would otherwise announce success
+            raise
         except Exception as e:
+            STAGE_ERRORS.inc(stage='ui.handle_skin_tone_adjustment')
             ui.notify(f'❌ Error adjusting skin tone: {str(e)}', type='negative')
             print(f"Error in skin tone adjustment: {e}")
+    
+    async def handle_adjustment_history(direction: int) -> Optional[Dict[str, int]]:
+        """Undo (direction < 0) or redo (direction > 0) an applied adjustment."""
+        if app_state.original_image is None:
+            return None
+        
+        adjustments = adjustment_cache.peek(direction)
+        if adjustments is None:
+            return None
+        
+        # Entries evicted from the LRU are recomputed transparently; the cursor
+        # only moves once they are shown, so a failed apply leaves history as is
+        await apply_adjustments(adjustments)
+        adjustment_cache.advance(direction, adjustments)
+        return adjustments
+    
+    async def handle_preset_comparison(presets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Evaluate all presets at once on the preview-resolution image."""
+        if app_state.preview_image is None:
+            return []
+        
+        rate_limiter.check('analysis', cost=len(presets), **client_keys())
+        with analysis_slots.slot('analysis'):
+            return await compare_presets(app_state.preview_image, presets, buffer_pool)
 
 @ui.page('/health')
 async def health_check():
@@ -233,4 +322,5 @@ async def health_check():
     return {'status': 'healthy', 'service': 'Color Harmony API'}
 
 # Error handling for the application
-app.on_exception(lambda e: ui.notify(f'Application error: {str(e)}', type='negative'))
\ No newline at end of file
+app.on_exception(lambda e: ui.notify(f'Application error: {str(e)}', type='negative'))
+startup.mark('import')
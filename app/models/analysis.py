@@ -0,0 +1,388 @@
+"""Typed analysis result models.
+
+The services produce plain dicts. These frozen, slotted dataclasses mirror
+those dicts exactly (``from_dict``/``to_dict`` round-trip) and add:
+
+* ``to_json``/``from_json`` for the HTTP API
+* ``to_bytes``/``from_bytes``, a compact struct-packed encoding for caches and
+  inter-process transfer
+
+The binary layout is a version byte and a byte flagging the parts present,
+then one segment per part, each packed and unpacked with a single struct
+call. The analysis segment is its numbers plus its few strings. The
+recommendations segment holds a string table (every distinct string, stored
+once), a catalog body of counts and string references in a struct
+precompiled per layout, and the color confidences. The catalog (names,
+usage texts, palette, outfits) only varies with the skin tone, so its bytes
+repeat across results and decode once; the confidences vary per result
+(ColorService adds random variation) and are decoded every time.
+"""
+import json
+import struct
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+FORMAT_VERSION = 3
+
+_SEPARATOR = '\x1f'
+
+_HEADER = struct.Struct('<BB')
+
+# Parts flags
+_ANALYSIS = 1
+_RECOMMENDATIONS = 2
+_EXTRA_METADATA = 4
+
+# confidence, rgb, pixels analyzed, color variance, string table length
+_ANALYSIS_SEGMENT = struct.Struct('<d3BI3dI')
+# string table length, string references, best/avoid/outfit counts, palette colors
+_RECOMMENDATIONS_HEADER = struct.Struct('<HHBBBB')
+
+# Decoded recommendation catalogs, by their encoded bytes
+_CATALOG_LIMIT = 256
+_catalogs: Dict[bytes, tuple] = {}
+
+
+@lru_cache(maxsize=256)
+def _catalog_body(outfits: int, references: int) -> struct.Struct:
+    """Recommendations catalog layout: outfit color counts, then string references."""
+    return struct.Struct(f'<{outfits}B{references}H')
+
+
+@lru_cache(maxsize=64)
+def _confidences(colors: int) -> struct.Struct:
+    """Layout of the color confidences following the catalog."""
+    return struct.Struct(f'<{colors}d')
+
+
+def _join(strings: List[str]) -> bytes:
+    table = _SEPARATOR.join(strings)
+    if table.count(_SEPARATOR) != len(strings) - 1:
+        raise ValueError("Strings may not contain the table separator character")
+    return table.encode('utf-8')
+
+
+def _encode_analysis(analysis: 'SkinToneAnalysis') -> Tuple[int, bytes]:
+    strings = [analysis.primary_color, analysis.category, analysis.undertone]
+    parts = _ANALYSIS
+    if analysis.extra_metadata:
+        parts |= _EXTRA_METADATA
+        strings.append(json.dumps(analysis.extra_metadata, separators=(',', ':')))
+    table = _join(strings)
+    numbers = _ANALYSIS_SEGMENT.pack(analysis.confidence, *analysis.rgb_values, analysis.pixels_analyzed,
+                                     *analysis.color_variance, len(table))
+    return parts, numbers + table
+
+
+def _encode_recommendations(recommendations: 'Recommendations') -> bytes:
+    colors = recommendations.best_colors + recommendations.avoid_colors
+    palette = recommendations.seasonal_palette
+    outfits = recommendations.outfit_suggestions
+    # Color fields column by column, so decoding builds the colors with one map()
+    strings = [recommendations.undertone, recommendations.category, palette.season, palette.description]
+    strings += [color.hex for color in colors]
+    strings += [color.name for color in colors]
+    strings += [color.usage for color in colors]
+    strings += [color.undertone_match for color in colors]
+    strings += palette.colors
+    for outfit in outfits:
+        strings += (outfit.name, outfit.description, outfit.occasion)
+        strings += outfit.colors
+
+    distinct = list(dict.fromkeys(strings))
+    if len(distinct) > 0xFFFF:
+        raise ValueError("Too many distinct strings in one result")
+    table = _join(distinct)
+    index = dict(zip(distinct, range(len(distinct))))
+    header = _RECOMMENDATIONS_HEADER.pack(len(table), len(strings), len(recommendations.best_colors),
+                                          len(recommendations.avoid_colors), len(outfits), len(palette.colors))
+    catalog = _catalog_body(len(outfits), len(strings)).pack(
+        *[len(outfit.colors) for outfit in outfits], *map(index.__getitem__, strings))
+    return header + table + catalog + _confidences(len(colors)).pack(*[color.confidence for color in colors])
+
+
+def _encode(analysis: Optional['SkinToneAnalysis'], recommendations: Optional['Recommendations']) -> bytes:
+    parts, segments = 0, []
+    if analysis is not None:
+        parts, segment = _encode_analysis(analysis)
+        segments.append(segment)
+    if recommendations is not None:
+        parts |= _RECOMMENDATIONS
+        segments.append(_encode_recommendations(recommendations))
+    return _HEADER.pack(FORMAT_VERSION, parts) + b''.join(segments)
+
+
+def _decode_catalog(catalog: bytes, table_length: int, reference_count: int, colors: int, outfits: int,
+                    palette_size: int) -> tuple:
+    """Everything of a recommendations segment but the confidences, as Recommendations arguments."""
+    offset = _RECOMMENDATIONS_HEADER.size + table_length
+    table = catalog[_RECOMMENDATIONS_HEADER.size:offset].decode('utf-8').split(_SEPARATOR)
+    values = _catalog_body(outfits, reference_count).unpack_from(catalog, offset)
+    strings = list(map(table.__getitem__, values[outfits:]))
+
+    undertone, category, season, description = strings[:4]
+    columns = tuple(tuple(strings[4 + column * colors:4 + (column + 1) * colors]) for column in range(4))
+    position = 4 + 4 * colors
+    palette = SeasonalPalette(season, tuple(strings[position:position + palette_size]), description)
+    position += palette_size
+    outfit_suggestions = []
+    for size in values[:outfits]:
+        name, outfit_description, occasion = strings[position:position + 3]
+        outfit_suggestions.append(OutfitSuggestion(name, tuple(strings[position + 3:position + 3 + size]),
+                                                   outfit_description, occasion))
+        position += 3 + size
+    return undertone, category, columns, palette, tuple(outfit_suggestions)
+
+
+def _decode_recommendations(segment: bytes) -> 'Recommendations':
+    table_length, reference_count, best, avoid, outfits, palette_size = _RECOMMENDATIONS_HEADER.unpack_from(segment)
+    catalog_end = _RECOMMENDATIONS_HEADER.size + table_length + _catalog_body(outfits, reference_count).size
+    catalog = segment[:catalog_end]
+    decoded = _catalogs.get(catalog)
+    if decoded is None:
+        decoded = _decode_catalog(catalog, table_length, reference_count, best + avoid, outfits, palette_size)
+        if len(_catalogs) < _CATALOG_LIMIT:
+            _catalogs[catalog] = decoded
+    undertone, category, (hexes, names, usages, matches), palette, outfit_suggestions = decoded
+    confidences = _confidences(best + avoid).unpack_from(segment, catalog_end)
+    colors = tuple(map(_color_info, hexes, names, confidences, usages, matches))
+    return Recommendations(colors[:best], colors[best:], palette, outfit_suggestions, undertone, category)
+
+
+def _decode(data: bytes, required: int) -> Tuple[Optional['SkinToneAnalysis'], Optional['Recommendations']]:
+    """Decode the parts of a result; required are the parts flags the caller needs."""
+    version, parts = _HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported result encoding version: {version}")
+    if parts & required != required:
+        raise ValueError("Encoded result does not hold the requested parts")
+
+    offset = _HEADER.size
+    analysis = None
+    if parts & _ANALYSIS:
+        confidence, r, g, b, pixels, var_r, var_g, var_b, table_length = _ANALYSIS_SEGMENT.unpack_from(data, offset)
+        offset += _ANALYSIS_SEGMENT.size + table_length
+        strings = bytes(data[offset - table_length:offset]).decode('utf-8').split(_SEPARATOR)
+        extra = json.loads(strings[3]) if parts & _EXTRA_METADATA else None
+        analysis = SkinToneAnalysis(sys.intern(strings[0]), sys.intern(strings[1]), sys.intern(strings[2]),
+                                    confidence, (r, g, b), pixels, (var_r, var_g, var_b), extra)
+
+    recommendations = None
+    if parts & _RECOMMENDATIONS:
+        recommendations = _decode_recommendations(bytes(data[offset:]))
+    return analysis, recommendations
+
+
+@dataclass(frozen=True, slots=True)
+class SkinToneAnalysis:
+    """Result of ColorService.analyze_skin_tone."""
+    primary_color: str
+    category: str
+    undertone: str
+    confidence: float
+    rgb_values: Tuple[int, int, int]
+    pixels_analyzed: int
+    color_variance: Tuple[float, float, float]
+    # Any additional analysis_metadata entries (e.g. debug measurements)
+    extra_metadata: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SkinToneAnalysis':
+        metadata = dict(data.get('analysis_metadata', {}))
+        pixels_analyzed = int(metadata.pop('pixels_analyzed', 0))
+        color_variance = tuple(float(v) for v in metadata.pop('color_variance', (0.0, 0.0, 0.0)))
+        return cls(
+            primary_color=data['primary_color'],
+            category=data['category'],
+            undertone=data['undertone'],
+            confidence=float(data['confidence']),
+            rgb_values=tuple(int(v) for v in data['rgb_values']),
+            pixels_analyzed=pixels_analyzed,
+            color_variance=color_variance,
+            extra_metadata=metadata or None
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        metadata = {
+            'pixels_analyzed': self.pixels_analyzed,
+            'color_variance': list(self.color_variance)
+        }
+        if self.extra_metadata:
+            metadata.update(self.extra_metadata)
+        return {
+            'primary_color': self.primary_color,
+            'category': self.category,
+            'undertone': self.undertone,
+            'confidence': self.confidence,
+            'rgb_values': list(self.rgb_values),
+            'analysis_metadata': metadata
+        }
+
+    def to_bytes(self) -> bytes:
+        return _encode(self, None)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'SkinToneAnalysis':
+        return _decode(data, _ANALYSIS)[0]
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'SkinToneAnalysis':
+        return cls.from_dict(json.loads(text))
+
+
+@dataclass(frozen=True, slots=True)
+class ColorInfo:
+    """A recommended (or discouraged) color."""
+    hex: str
+    name: str
+    confidence: float
+    usage: str
+    undertone_match: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ColorInfo':
+        return cls(data['hex'], data['name'], float(data['confidence']), data['usage'], data['undertone_match'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'hex': self.hex,
+            'name': self.name,
+            'confidence': self.confidence,
+            'usage': self.usage,
+            'undertone_match': self.undertone_match
+        }
+
+
+def _slot_setter(cls, *names: str):
+    return tuple(getattr(cls, name).__set__ for name in names)
+
+
+_SET_HEX, _SET_NAME, _SET_CONFIDENCE, _SET_USAGE, _SET_UNDERTONE_MATCH = _slot_setter(
+    ColorInfo, 'hex', 'name', 'confidence', 'usage', 'undertone_match')
+
+
+def _color_info(hex_color: str, name: str, confidence: float, usage: str, undertone_match: str) -> ColorInfo:
+    """ColorInfo(...) for decoding, through the slots rather than the frozen __init__ (about twice as fast)."""
+    color = object.__new__(ColorInfo)
+    _SET_HEX(color, hex_color)
+    _SET_NAME(color, name)
+    _SET_CONFIDENCE(color, confidence)
+    _SET_USAGE(color, usage)
+    _SET_UNDERTONE_MATCH(color, undertone_match)
+    return color
+
+
+@dataclass(frozen=True, slots=True)
+class OutfitSuggestion:
+    """A three-color outfit combination."""
+    name: str
+    colors: Tuple[str, ...]
+    description: str
+    occasion: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'OutfitSuggestion':
+        return cls(data['name'], tuple(data['colors']), data['description'], data['occasion'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'colors': list(self.colors),
+            'description': self.description,
+            'occasion': self.occasion
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class SeasonalPalette:
+    """Seasonal palette assigned to an undertone/category."""
+    season: str
+    colors: Tuple[str, ...]
+    description: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SeasonalPalette':
+        return cls(data['season'], tuple(data['colors']), data['description'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'season': self.season, 'colors': list(self.colors), 'description': self.description}
+
+
+@dataclass(frozen=True, slots=True)
+class Recommendations:
+    """Result of ColorService.get_color_recommendations."""
+    best_colors: Tuple[ColorInfo, ...]
+    avoid_colors: Tuple[ColorInfo, ...]
+    seasonal_palette: SeasonalPalette
+    outfit_suggestions: Tuple[OutfitSuggestion, ...]
+    undertone: str
+    category: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Recommendations':
+        return cls(
+            best_colors=tuple(ColorInfo.from_dict(c) for c in data.get('best_colors', [])),
+            avoid_colors=tuple(ColorInfo.from_dict(c) for c in data.get('avoid_colors', [])),
+            seasonal_palette=SeasonalPalette.from_dict(data['seasonal_palette']),
+            outfit_suggestions=tuple(OutfitSuggestion.from_dict(o) for o in data.get('outfit_suggestions', [])),
+            undertone=data['undertone'],
+            category=data['category']
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'best_colors': [c.to_dict() for c in self.best_colors],
+            'avoid_colors': [c.to_dict() for c in self.avoid_colors],
+            'seasonal_palette': self.seasonal_palette.to_dict(),
+            'outfit_suggestions': [o.to_dict() for o in self.outfit_suggestions],
+            'undertone': self.undertone,
+            'category': self.category
+        }
+
+    def to_bytes(self) -> bytes:
+        return _encode(None, self)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Recommendations':
+        return _decode(data, _RECOMMENDATIONS)[1]
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'Recommendations':
+        return cls.from_dict(json.loads(text))
+
+
+@dataclass(frozen=True, slots=True)
+class AnalysisResult:
+    """Skin tone analysis together with its recommendations."""
+    analysis: SkinToneAnalysis
+    recommendations: Recommendations
+
+    @classmethod
+    def from_dicts(cls, analysis: Dict[str, Any], recommendations: Dict[str, Any]) -> 'AnalysisResult':
+        return cls(SkinToneAnalysis.from_dict(analysis), Recommendations.from_dict(recommendations))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'analysis': self.analysis.to_dict(), 'recommendations': self.recommendations.to_dict()}
+
+    def to_bytes(self) -> bytes:
+        return _encode(self.analysis, self.recommendations)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'AnalysisResult':
+        return cls(*_decode(data, _ANALYSIS | _RECOMMENDATIONS))
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'AnalysisResult':
+        data = json.loads(text)
+        return cls.from_dicts(data['analysis'], data['recommendations'])
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.core.metrics import CACHE_REQUESTS
+
+ADJUSTMENT_KEYS = ('brightness', 'warmth', 'saturation', 'hue_shift')
+
+AdjustmentKey = Tuple[int, int, int, int]
+
+
+@dataclass
+class CachedAdjustment:
+    """Analysis output memoized for one quantized adjustment tuple."""
+    key: AdjustmentKey
+    analysis: Dict[str, Any]
+    recommendations: Dict[str, Any]
+    preview: np.ndarray
+
+    @property
+    def adjustments(self) -> Dict[str, int]:
+        return dict(zip(ADJUSTMENT_KEYS, self.key))
+
+
+class AdjustmentCache:
+    """Bounded per-session LRU of adjustment results with undo/redo history."""
+
+    def __init__(self, max_entries: Optional[int] = None, step: Optional[int] = None, max_history: int = 50):
+        self.max_entries = max(1, max_entries if max_entries is not None else settings.adjustment_cache_size)
+        self.step = max(1, step if step is not None else settings.adjustment_quantization_step)
+        self.max_history = max_history
+        self._entries: "OrderedDict[AdjustmentKey, CachedAdjustment]" = OrderedDict()
+        self._history: List[AdjustmentKey] = []
+        self._cursor = -1
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, adjustments: Dict[str, Any]) -> Dict[str, int]:
+        """Snap adjustment values onto the quantization grid."""
+        return {
+            name: int(round(float(adjustments.get(name, 0) or 0) / self.step)) * self.step
+            for name in ADJUSTMENT_KEYS
+        }
+
+    def key_for(self, adjustments: Dict[str, Any]) -> AdjustmentKey:
+        """Build the cache key for a set of adjustments."""
+        quantized = self.quantize(adjustments)
+        return tuple(quantized[name] for name in ADJUSTMENT_KEYS)
+
+    def get(self, adjustments: Dict[str, Any]) -> Optional[CachedAdjustment]:
+        """Return the cached result for these adjustments, if present."""
+        key = self.key_for(adjustments)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache='adjustment', result='miss')
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        CACHE_REQUESTS.inc(cache='adjustment', result='hit')
+        return entry
+
+    def put(self, adjustments: Dict[str, Any], analysis: Dict[str, Any],
+            recommendations: Dict[str, Any], preview: np.ndarray) -> CachedAdjustment:
+        """Store a result, evicting the least recently used entry when full."""
+        key = self.key_for(adjustments)
+        entry = CachedAdjustment(key=key, analysis=analysis, recommendations=recommendations, preview=preview)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return entry
+
+    def record(self, adjustments: Dict[str, Any]):
+        """Append adjustments to the undo history, discarding any redo branch."""
+        key = self.key_for(adjustments)
+        if self._cursor >= 0 and self._history[self._cursor] == key:
+            return
+
+        del self._history[self._cursor + 1:]
+        self._history.append(key)
+
+        if len(self._history) > self.max_history:
+            del self._history[:len(self._history) - self.max_history]
+
+        self._cursor = len(self._history) - 1
+
+    def can_undo(self) -> bool:
+        return self._cursor > 0
+
+    def can_redo(self) -> bool:
+        return self._cursor < len(self._history) - 1
+
+    def peek(self, direction: int) -> Optional[Dict[str, int]]:
+        """Adjustments one step back (direction < 0) or forward in history, without moving there."""
+        if not (self.can_undo() if direction < 0 else self.can_redo()):
+            return None
+        return dict(zip(ADJUSTMENT_KEYS, self._history[self._cursor + (-1 if direction < 0 else 1)]))
+
+    def advance(self, direction: int, adjustments: Dict[str, Any]) -> bool:
+        """Move the cursor one step, once the adjustments from peek() have been applied.
+
+        Returns False (and stays put) when the history changed in the meantime
+        and that step no longer leads to these adjustments.
+        """
+        target = self.peek(direction)
+        if target is None or self.key_for(target) != self.key_for(adjustments):
+            return False
+        self._cursor += -1 if direction < 0 else 1
+        return True
+
+    def undo(self) -> Optional[Dict[str, int]]:
+        """Step back in history and return the adjustments to restore."""
+        adjustments = self.peek(-1)
+        if adjustments is not None:
+            self.advance(-1, adjustments)
+        return adjustments
+
+    def redo(self) -> Optional[Dict[str, int]]:
+        """Step forward in history and return the adjustments to restore."""
+        adjustments = self.peek(1)
+        if adjustments is not None:
+            self.advance(1, adjustments)
+        return adjustments
+
+    def clear(self):
+        """Drop all cached results and history (e.g. after a new upload)."""
+        self._entries.clear()
+        self._history.clear()
+        self._cursor = -1
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by cached preview images."""
+        return sum(entry.preview.nbytes for entry in self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
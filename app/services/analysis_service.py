@@ -0,0 +1,283 @@
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from app.config import settings
+from app.core.buffers import BufferPool
+from app.core.image_header import inspect_image
+from app.core.metrics import ANALYSES, CACHE_REQUESTS
+from app.core.memory import memory_budget, memory_tracker
+from app.core.profiler import profiled
+from app.core.startup import mark
+from app.models.analysis import AnalysisResult, SkinToneAnalysis
+from app.services.color_service import ColorService, color_service
+from app.services.image_service import ImageService, image_service
+from app.services.worker_pool import WorkerPool, worker_pool
+
+Box = Tuple[int, int, int, int]
+
+
+class AnalysisService:
+    """End-to-end analysis pipeline shared by the UI and the JSON API.
+
+    Every request goes through the same services and worker pool, and results
+    are memoized by the SHA-256 of the encoded image so the same photo is
+    never analyzed twice, whichever entry point it arrives through. Cached
+    results are held in their compact binary encoding (see app.models).
+    Multi-face results are memoized per face, by content hash and face box.
+    """
+
+    def __init__(self, images: ImageService, colors: ColorService, pool: WorkerPool,
+                 cache_size: Optional[int] = None):
+        self.images = images
+        self.colors = colors
+        self.pool = pool
+        self.cache_size = cache_size if cache_size is not None else settings.analysis_cache_size
+        self._results: "OrderedDict[str, bytes]" = OrderedDict()
+        self.face_cache_size = settings.face_cache_size
+        # Content hash -> ((width, height), detected face boxes); (hash, box) -> encoded face result
+        self._face_images: "OrderedDict[str, Tuple[Tuple[int, int], Optional[List[Box]]]]" = OrderedDict()
+        self._face_results: "OrderedDict[Tuple[str, Box], bytes]" = OrderedDict()
+
+    async def analyze_bytes(self, data: bytes) -> Dict[str, Any]:
+        """Analyze an encoded image; the pixels are only decoded on a cache miss."""
+        digest = hashlib.sha256(data).hexdigest()
+        cached = self._get_cached(digest)
+        if cached is not None:
+            return {'analysis': cached[0], 'recommendations': cached[1], 'cached': True}
+
+        analysis, recommendations = await self.pool.run_coroutine(self._decode_and_analyze, data)
+        ANALYSES.inc(source='api')
+        mark('first_analysis')
+        self._store(digest, analysis, recommendations)
+        return {'analysis': analysis, 'recommendations': recommendations, 'cached': False}
+
+    async def analyze_file(self, file_path: str) -> Dict[str, Any]:
+        """Load an uploaded file and analyze it, returning the decoded image (at display size) as well."""
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        cached = self._get_cached(digest)
+        if cached is not None:
+            image = await self.pool.run_coroutine(self.images.load_image, file_path)
+            return {'image': image, 'analysis': cached[0], 'recommendations': cached[1], 'cached': True}
+
+        image, analysis, recommendations = await self.pool.run_coroutine(self._load_and_analyze, file_path)
+        ANALYSES.inc(source='upload')
+        mark('first_analysis')
+        self._store(digest, analysis, recommendations)
+        return {'image': image, 'analysis': analysis, 'recommendations': recommendations, 'cached': False}
+
+    async def analyze_image(self, image: np.ndarray) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Analyze already decoded pixels on the worker pool."""
+        result = await self.pool.run_coroutine(self._analyze_image, image)
+        ANALYSES.inc(source='image')
+        mark('first_analysis')
+        return result
+
+    async def analyze_adjusted(self, image: np.ndarray, adjustments: Dict[str, Any],
+                               buffers: Optional[BufferPool] = None) -> Tuple[np.ndarray, Dict[str, Any], Dict[str, Any]]:
+        """Apply adjustments and analyze the result on the worker pool.
+
+        With a session's buffer pool, the adjusted image is taken from it;
+        give() it back once nothing references it any more.
+        """
+        result = await self.pool.run_coroutine(self._adjust_and_analyze, image, adjustments, buffers)
+        ANALYSES.inc(source='adjustment')
+        mark('first_analysis')
+        return result
+
+    async def analyze_presets(self, image: np.ndarray, presets: List[Dict[str, Any]],
+                              buffers: Optional[BufferPool] = None) -> List[Tuple[np.ndarray, Dict[str, Any], Dict[str, Any]]]:
+        """Apply several sets of adjustments to one image and analyze each, as one job on the worker pool.
+
+        The image's skin pixels are clustered once; each adjusted copy's
+        KMeans then starts from those cluster centers put through the same
+        adjustments, a single run instead of ten k-means++ restarts. All of
+        them together cost about two analyses, however many workers there
+        are. The warm-started dominant color can settle on a slightly
+        different cluster than a separate analysis would (a few RGB units), so
+        a tone on a category boundary may be classified differently.
+        Adjusted images are taken from buffers as in analyze_adjusted.
+        """
+        results = await self.pool.run_coroutine(self._adjust_and_analyze_presets, image, presets, buffers)
+        ANALYSES.inc(len(results), source='adjustment')
+        mark('first_analysis')
+        return results
+
+    async def analyze_faces_bytes(self, data: bytes, boxes: Optional[List[Box]] = None) -> Dict[str, Any]:
+        """Per-face analysis of an encoded image, of the given (x, y, w, h) boxes or of every detected face.
+
+        The image is only decoded when some face has no cached result, and then
+        only those faces are analyzed.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        size, detected = self._face_images.get(digest, (None, None))
+        requested = boxes
+        if boxes is None:
+            boxes = detected
+        encoded = {} if boxes is None else self._get_faces(digest, boxes)
+        cached = size is not None and boxes is not None and len(encoded) == len(boxes)
+
+        if not cached:
+            size, boxes, computed = await self.pool.run_coroutine(self._decode_and_analyze_faces, data, boxes, set(encoded))
+            ANALYSES.inc(source='faces')
+            mark('first_analysis')
+            self._remember_faces(digest, size, boxes if requested is None else detected)
+            for box, analysis in computed.items():
+                encoded[box] = self._store_face(digest, box, analysis)
+
+        return {
+            'image_size': list(size),
+            'faces': [self._face_dict(box, encoded[box]) for box in boxes],
+            'cached': cached
+        }
+
+    @profiled
+    async def _decode_and_analyze_faces(self, data: bytes, boxes: Optional[List[Box]],
+                                        known: Set[Box]) -> Tuple[Tuple[int, int], List[Box], Dict[Box, Optional[Dict[str, Any]]]]:
+        image = await self.images.decode_image(data)
+        # Reserved rather than admitted: downsampling would move the face boxes
+        with memory_budget.reserve(image.shape[0] * image.shape[1], 'analysis'):
+            if boxes is None:
+                boxes = await self.images.find_faces(image)
+            missing = [box for box in boxes if box not in known]
+            results = await self.colors.analyze_faces(image, missing) if missing else []
+        return (image.shape[1], image.shape[0]), boxes, dict(zip(missing, results))
+
+    @profiled
+    async def _decode_and_analyze(self, data: bytes) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        # Print-resolution images (tiled in their header's plan) are analyzed at their decoded resolution
+        tiled = inspect_image(data).tiled
+        image = await self.images.decode_image(data, full_resolution=True)
+        return await self._analyze_image(image, tiled)
+
+    @profiled
+    async def _load_and_analyze(self, file_path: str) -> Tuple[np.ndarray, Dict[str, Any], Dict[str, Any]]:
+        """Analyze a file as _decode_and_analyze does, returning the image resized for display."""
+        tiled = inspect_image(file_path).tiled
+        image = await self.images.load_image(file_path, full_resolution=True)
+        analysis, recommendations = await self._analyze_image(image, tiled)
+        return await self.images.resize_image(image), analysis, recommendations
+
+    @profiled
+    async def _analyze_image(self, image: np.ndarray, tiled: bool = False) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        with self._admit_analysis(image, tiled) as admitted, memory_tracker.collect() as peaks:
+            analysis = await self._analyze_pixels(admitted, tiled=tiled)
+            recommendations = await self.colors.get_color_recommendations(analysis)
+        self._annotate(analysis, 'analysis', image, admitted, peaks)
+        return analysis, recommendations
+
+    @profiled
+    async def _adjust_and_analyze(self, image: np.ndarray, adjustments: Dict[str, Any],
+                                  buffers: Optional[BufferPool] = None) -> Tuple[np.ndarray, Dict[str, Any], Dict[str, Any]]:
+        with memory_budget.admit(image, 'adjustment') as admitted, memory_tracker.collect() as peaks:
+            out = buffers.take(admitted.shape, admitted.dtype) if buffers is not None else None
+            adjusted = await self.images.adjust_skin_tone(admitted, adjustments, out=out, buffers=buffers)
+            analysis = await self._analyze_pixels(adjusted, buffers)
+            recommendations = await self.colors.get_color_recommendations(analysis)
+        self._annotate(analysis, 'adjustment', image, admitted, peaks)
+        return adjusted, analysis, recommendations
+
+    @profiled
+    async def _adjust_and_analyze_presets(self, image: np.ndarray, presets: List[Dict[str, Any]],
+                                          buffers: Optional[BufferPool] = None) -> List[Tuple[np.ndarray, Dict[str, Any], Dict[str, Any]]]:
+        results = []
+        with memory_budget.admit(image, 'adjustment') as admitted, memory_tracker.collect() as peaks:
+            centers = await self.colors.skin_cluster_centers(admitted, buffers)
+            for adjustments in presets:
+                out = buffers.take(admitted.shape, admitted.dtype) if buffers is not None else None
+                adjusted = await self.images.adjust_skin_tone(admitted, adjustments, out=out, buffers=buffers)
+                seeds = await self.images.adjust_colors(centers, adjustments) if centers is not None else None
+                analysis = await self._analyze_pixels(adjusted, buffers, centers=seeds)
+                recommendations = await self.colors.get_color_recommendations(analysis)
+                results.append((adjusted, analysis, recommendations))
+        for _, analysis, _ in results:
+            self._annotate(analysis, 'adjustment', image, admitted, peaks)
+        return results
+
+    @contextmanager
+    def _admit_analysis(self, image: np.ndarray, tiled: bool = False) -> Iterator[np.ndarray]:
+        """Admit an analysis: tiled analyses only reserve a strip's worth of working memory.
+
+        The image itself is already decoded by then; its memory was reserved by the decode.
+        """
+        if tiled or self.colors.should_tile(image):
+            strip_pixels = self.colors.strip_rows(image.shape[1]) * image.shape[1]
+            with memory_budget.reserve(strip_pixels, 'analysis'):
+                yield image
+        else:
+            with memory_budget.admit(image, 'analysis') as admitted:
+                yield admitted
+
+    async def _analyze_pixels(self, image: np.ndarray, buffers: Optional[BufferPool] = None,
+                              tiled: bool = False, centers: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Skin tone analysis, strip by strip for print-resolution images (which ignore warm-start centers)."""
+        if tiled or self.colors.should_tile(image):
+            return await self.colors.analyze_skin_tone_tiled(image)
+        return await self.colors.analyze_skin_tone(image, buffers, centers)
+
+    def _annotate(self, analysis: Dict[str, Any], operation: str, image: np.ndarray, admitted: np.ndarray,
+                  peaks: Optional[Dict[str, int]]):
+        """Record downsampling and (in memory tracking mode) stage peaks in analysis_metadata."""
+        metadata = analysis.setdefault('analysis_metadata', {})
+        if admitted.shape != image.shape:
+            metadata['downsampled_from'] = list(image.shape[:2])
+        if peaks:
+            metadata['memory_peaks'] = peaks
+            memory_budget.observe(operation, admitted.shape[0] * admitted.shape[1], max(peaks.values()))
+
+    def _get_cached(self, digest: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        encoded = self._results.get(digest)
+        if encoded is None:
+            CACHE_REQUESTS.inc(cache='analysis', result='miss')
+            return None
+        CACHE_REQUESTS.inc(cache='analysis', result='hit')
+        self._results.move_to_end(digest)
+        result = AnalysisResult.from_bytes(encoded)
+        return result.analysis.to_dict(), result.recommendations.to_dict()
+
+    def _store(self, digest: str, analysis: Dict[str, Any], recommendations: Dict[str, Any]):
+        if self.cache_size <= 0:
+            return
+        self._results[digest] = AnalysisResult.from_dicts(analysis, recommendations).to_bytes()
+        self._results.move_to_end(digest)
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+
+    def _get_faces(self, digest: str, boxes: List[Box]) -> Dict[Box, bytes]:
+        found = {}
+        for box in boxes:
+            encoded = self._face_results.get((digest, box))
+            CACHE_REQUESTS.inc(cache='faces', result='miss' if encoded is None else 'hit')
+            if encoded is not None:
+                self._face_results.move_to_end((digest, box))
+                found[box] = encoded
+        return found
+
+    def _store_face(self, digest: str, box: Box, analysis: Optional[Dict[str, Any]]) -> bytes:
+        # Faces without skin pixels are remembered too, as an empty entry
+        encoded = SkinToneAnalysis.from_dict(analysis).to_bytes() if analysis is not None else b''
+        if self.face_cache_size > 0:
+            self._face_results[(digest, box)] = encoded
+            self._face_results.move_to_end((digest, box))
+            while len(self._face_results) > self.face_cache_size:
+                self._face_results.popitem(last=False)
+        return encoded
+
+    def _remember_faces(self, digest: str, size: Tuple[int, int], detected: Optional[List[Box]]):
+        if self.face_cache_size > 0:
+            self._face_images[digest] = (size, detected)
+            self._face_images.move_to_end(digest)
+            while len(self._face_images) > self.face_cache_size:
+                self._face_images.popitem(last=False)
+
+    def _face_dict(self, box: Box, encoded: bytes) -> Dict[str, Any]:
+        if not encoded:
+            return {'box': list(box), 'error': 'No skin pixels detected in this face'}
+        return {'box': list(box), **SkinToneAnalysis.from_bytes(encoded).to_dict()}
+
+
+analysis_service = AnalysisService(image_service, color_service, worker_pool)
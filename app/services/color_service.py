@@ -1,15 +1,103 @@
 import cv2
 import numpy as np
-from sklearn.cluster import KMeans
-from scipy.spatial.distance import euclidean
-import webcolors
 from typing import Dict, List, Any, Tuple, Optional
 import asyncio
+import threading
+from app.config import settings
+from app.core.buffers import BufferPool, borrowed
+from app.core.metrics import timed
+
+# Rows of context around a strip so its cleaned-up skin mask matches the
+# full-image mask exactly: the 3x3 open and close are four 1-pixel passes
+STRIP_HALO = 4
+
+# Skin colors are binned at 5 bits per channel for the tiled dominant color
+HISTOGRAM_BITS = 5
+
+# Warm-started KMeans runs to convergence (scikit-learn's default cap), as
+# the restarts it replaces do
+KMEANS_MAX_ITER = 300
+
+# Skin color range in YCrCb and the kernel cleaning up its mask
+SKIN_LOWER_YCRCB = np.array([0, 133, 77], dtype=np.uint8)
+SKIN_UPPER_YCRCB = np.array([255, 173, 127], dtype=np.uint8)
+MORPH_KERNEL = np.ones((3, 3), np.uint8)
+
+
+class SkinStatistics:
+    """Skin pixel statistics accumulated strip by strip.
+
+    Holds the count and first/second moments of the skin pixels plus a color
+    histogram with per-bin sums (so bin centroids are exact means) and
+    per-bin spread. Its size is fixed (about 1.3 MB) whatever the image size.
+    """
+
+    def __init__(self):
+        bins = 1 << (3 * HISTOGRAM_BITS)
+        self.count = 0
+        self.sum = np.zeros(3, dtype=np.float64)
+        self.sum_squares = np.zeros(3, dtype=np.float64)
+        self.bin_counts = np.zeros(bins, dtype=np.int64)
+        self.bin_sums = np.zeros((bins, 3), dtype=np.float64)
+        self.bin_square_norms = np.zeros(bins, dtype=np.float64)
+
+    def add(self, pixels: np.ndarray):
+        """Accumulate an (N, 3) array of RGB skin pixels."""
+        if len(pixels) == 0:
+            return
+        values = pixels.astype(np.float64)
+        self.count += len(pixels)
+        self.sum += values.sum(axis=0)
+        squares = np.square(values)
+        self.sum_squares += squares.sum(axis=0)
+
+        shift = 8 - HISTOGRAM_BITS
+        quantized = pixels >> shift
+        index = ((quantized[:, 0].astype(np.int64) << (2 * HISTOGRAM_BITS))
+                 | (quantized[:, 1].astype(np.int64) << HISTOGRAM_BITS) | quantized[:, 2])
+        bins = len(self.bin_counts)
+        self.bin_counts += np.bincount(index, minlength=bins)
+        for channel in range(3):
+            self.bin_sums[:, channel] += np.bincount(index, weights=values[:, channel], minlength=bins)
+        self.bin_square_norms += np.bincount(index, weights=squares.sum(axis=1), minlength=bins)
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.sum / max(self.count, 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(np.maximum(self.sum_squares / max(self.count, 1) - np.square(self.mean), 0.0))
+
+    def centroids(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean color and pixel count of every non-empty histogram bin."""
+        occupied = np.nonzero(self.bin_counts)[0]
+        counts = self.bin_counts[occupied]
+        return self.bin_sums[occupied] / counts[:, None], counts
+    
+    def mean_distance(self, color: np.ndarray) -> float:
+        """Approximate mean distance of the skin pixels to `color`.
+        
+        Exact per bin in squared distance (centroid offset plus spread), so
+        only the square root is taken per bin instead of per pixel.
+        """
+        occupied = np.nonzero(self.bin_counts)[0]
+        counts = self.bin_counts[occupied]
+        centroids = self.bin_sums[occupied] / counts[:, None]
+        spread = np.maximum(self.bin_square_norms[occupied] / counts - np.square(centroids).sum(axis=1), 0.0)
+        offsets = np.square(centroids - color).sum(axis=1)
+        return float(np.average(np.sqrt(offsets + spread), weights=counts))
+
 
 class ColorService:
     """Service for color analysis and skin tone detection."""
     
     def __init__(self):
+        # Closest CSS3 name per hex value, and the (names, RGB array) index they come from
+        self._color_names: Dict[str, str] = {}
+        self._name_index: Optional[Tuple[List[str], np.ndarray]] = None
+        self._index_lock = threading.Lock()
+        
         # Define skin tone reference colors (RGB)
         self.skin_tone_references = {
             'very_light': (255, 219, 172),
@@ -67,17 +155,26 @@ class ColorService:
                       '#8B008B', '#FF1493', '#DC143C', '#B22222', '#8B0000']
         }
     
-    async def analyze_skin_tone(self, image: np.ndarray) -> Dict[str, Any]:
-        """Analyze skin tone from an image."""
+    @timed('color.analyze_skin_tone')
+    async def analyze_skin_tone(self, image: np.ndarray, buffers: Optional[BufferPool] = None,
+                                centers: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Analyze skin tone from an image (full-frame masks drawn from buffers when given).
+        
+        With cluster centers (see skin_cluster_centers), KMeans is one run
+        warm-started from them instead of ten k-means++ restarts.
+        """
         try:
             # Extract skin pixels
-            skin_pixels = await self._extract_skin_pixels(image)
+            skin_pixels = await self._extract_skin_pixels(image, buffers)
             
             if len(skin_pixels) == 0:
                 raise ValueError("No skin pixels detected in image")
             
             # Get dominant skin color
-            dominant_color = await self._get_dominant_color(skin_pixels)
+            if centers is not None:
+                dominant_color, _ = self._warm_dominant_color(skin_pixels, centers, max_iter=KMEANS_MAX_ITER)
+            else:
+                dominant_color = await self._get_dominant_color(skin_pixels)
             
             # Classify skin tone
             skin_tone_category = await self._classify_skin_tone(dominant_color)
@@ -103,27 +200,188 @@ class ColorService:
         except Exception as e:
             raise Exception(f"Error analyzing skin tone: {str(e)}")
     
-    async def _extract_skin_pixels(self, image: np.ndarray) -> np.ndarray:
-        """Extract skin-colored pixels from an image."""
-        # Convert RGB to YCrCb color space (better for skin detection)
-        ycrcb = cv2.cvtColor(image, cv2.COLOR_RGB2YCrCb)
-        
-        # Define skin color range in YCrCb
-        lower_skin = np.array([0, 133, 77], dtype=np.uint8)
-        upper_skin = np.array([255, 173, 127], dtype=np.uint8)
+    @timed('color.analyze_skin_tone_tiled')
+    async def analyze_skin_tone_tiled(self, image: np.ndarray, strip_rows: Optional[int] = None) -> Dict[str, Any]:
+        """Analyze skin tone strip by strip, with working memory bounded by the strip size.
+
+        Only the analysis is strip-wise: the image is already decoded in
+        full, so peak memory still grows with the image.
+
+        An approximation of analyze_skin_tone. The skin mask and pixel filters
+        match exactly, and so do pixels_analyzed, color_variance and the
+        undertone (all from exact moments). The dominant color comes from a
+        weighted KMeans over the centroids of a 15-bit color histogram instead
+        of clustering every skin pixel, which can settle on a different
+        cluster, and the confidence from per-bin distance statistics. On the
+        bench_tiled portraits the dominant color stays within 20 RGB units
+        (Euclidean) of the whole-image one and the confidence within 0.07, so
+        the category can differ when that color is near the boundary between
+        two reference tones.
+        """
+        try:
+            height, width = image.shape[:2]
+            if strip_rows is None:
+                strip_rows = self.strip_rows(width)
+            
+            stats = SkinStatistics()
+            strips = 0
+            for top in range(0, height, strip_rows):
+                bottom = min(height, top + strip_rows)
+                stats.add(self._extract_strip_skin_pixels(image, top, bottom))
+                strips += 1
+            
+            if stats.count == 0:
+                raise ValueError("No skin pixels detected in image")
+            
+            result = await self.analyze_statistics(stats)
+            result['analysis_metadata']['tiled'] = {'strips': strips, 'strip_rows': strip_rows}
+            return result
+            
+        except Exception as e:
+            raise Exception(f"Error analyzing skin tone: {str(e)}")
+    
+    async def analyze_statistics(self, stats: SkinStatistics) -> Dict[str, Any]:
+        """Skin tone analysis from accumulated skin pixel statistics (strips or video frames)."""
+        colors, weights = stats.centroids()
+        dominant_color = await self._get_weighted_dominant_color(colors, weights)
+        skin_tone_category = await self._classify_skin_tone(dominant_color)
+        undertone = self._undertone_from_mean(stats.mean)
+        confidence = self.confidence(stats, dominant_color)
         
-        # Create mask for skin pixels
-        skin_mask = cv2.inRange(ycrcb, lower_skin, upper_skin)
+        return {
+            'primary_color': self._rgb_to_hex(dominant_color),
+            'category': skin_tone_category,
+            'undertone': undertone,
+            'confidence': confidence,
+            'rgb_values': dominant_color.tolist(),
+            'analysis_metadata': {
+                'pixels_analyzed': stats.count,
+                'color_variance': stats.std.tolist()
+            }
+        }
+    
+    def confidence(self, stats: SkinStatistics, color: np.ndarray) -> float:
+        """Confidence of `color` as the skin tone of the accumulated skin pixels."""
+        return self._confidence_from_distance(stats.mean_distance(color), stats.count)
+    
+    def skin_pixels(self, image: np.ndarray) -> np.ndarray:
+        """Filtered skin pixels of an RGB image, without stage instrumentation (for per-frame loops)."""
+        return self._filter_skin_pixels(image[self._skin_mask(image) > 0])
+    
+    @timed('color.analyze_faces')
+    async def analyze_faces(self, image: np.ndarray, boxes: List[Tuple[int, int, int, int]]) -> List[Optional[Dict[str, Any]]]:
+        """Skin tone analysis of every (x, y, w, h) face box in one pass.
+        
+        The color conversion, skin mask and pixel filters run once over the
+        whole image; each face then only slices its region of that shared
+        plane and accumulates histogram statistics (as the tiled analysis
+        does). Returns one analysis per box, None where no skin was found.
+        """
+        try:
+            skin = self._skin_plane(image)
+            results = []
+            for x, y, w, h in boxes:
+                # Same padding as ImageService.extract_face_region
+                padding = int(min(w, h) * 0.1)
+                region = (slice(max(0, y - padding), max(0, y + h + padding)),
+                          slice(max(0, x - padding), max(0, x + w + padding)))
+                stats = SkinStatistics()
+                stats.add(image[region][skin[region]])
+                results.append(await self.analyze_statistics(stats) if stats.count else None)
+            return results
+            
+        except Exception as e:
+            raise Exception(f"Error analyzing faces: {str(e)}")
+    
+    def _skin_plane(self, image: np.ndarray) -> np.ndarray:
+        """Boolean plane of the pixels _extract_skin_pixels keeps (mask plus brightness and ratio filters)."""
+        r, g, b = (image[:, :, channel].astype(np.int16) for channel in range(3))
+        # Integer forms of 50 < mean < 220, r >= 0.8 g and g >= 0.8 b (identical for uint8 values)
+        total = r + g + b
+        return ((self._skin_mask(image) > 0) & (total > 150) & (total < 660)
+                & (5 * r >= 4 * g) & (5 * g >= 4 * b))
+    
+    @timed('color.analyze_frame_pixels')
+    async def analyze_frame_pixels(self, skin_pixels: np.ndarray, centers: Optional[np.ndarray] = None) -> Tuple[Dict[str, Any], np.ndarray]:
+        """Skin tone analysis of one live frame's skin pixels.
+        
+        KMeans starts from the previous frame's cluster centers (a single run of
+        a few iterations instead of ten k-means++ restarts); the new centers are
+        returned for the next frame.
+        """
+        dominant_color, centers = self._warm_dominant_color(skin_pixels, centers)
+        skin_tone_category = await self._classify_skin_tone(dominant_color)
+        undertone = self._undertone_from_mean(np.mean(skin_pixels, axis=0))
+        distances = np.linalg.norm(skin_pixels.astype(np.float64) - dominant_color, axis=1)
+        confidence = self._confidence_from_distance(float(np.mean(distances)), len(skin_pixels))
         
-        # Apply morphological operations to clean up the mask
-        kernel = np.ones((3, 3), np.uint8)
-        skin_mask = cv2.morphologyEx(skin_mask, cv2.MORPH_OPEN, kernel)
-        skin_mask = cv2.morphologyEx(skin_mask, cv2.MORPH_CLOSE, kernel)
+        return {
+            'primary_color': self._rgb_to_hex(dominant_color),
+            'category': skin_tone_category,
+            'undertone': undertone,
+            'confidence': confidence,
+            'rgb_values': dominant_color.tolist(),
+            'analysis_metadata': {
+                'pixels_analyzed': len(skin_pixels),
+                'color_variance': np.std(skin_pixels, axis=0).tolist()
+            }
+        }, centers
+    
+    def _warm_dominant_color(self, pixels: np.ndarray, centers: Optional[np.ndarray], n_colors: int = 5,
+                             max_iter: Optional[int] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Dominant color by KMeans warm-started from `centers` (k-means++ when there are none yet)."""
+        if len(pixels) < n_colors:
+            return np.mean(pixels, axis=0).astype(int), centers
         
-        # Extract skin pixels
-        skin_pixels = image[skin_mask > 0]
+        from sklearn.cluster import KMeans
         
-        # Additional filtering based on RGB values
+        warm = centers is not None and centers.shape == (n_colors, 3)
+        kmeans = KMeans(n_clusters=n_colors, init=centers if warm else 'k-means++', n_init=1,
+                        max_iter=max_iter or settings.live_kmeans_iterations, random_state=42)
+        kmeans.fit(pixels.astype(np.float64))
+        label_counts = np.bincount(kmeans.labels_, minlength=n_colors)
+        return kmeans.cluster_centers_[np.argmax(label_counts)].astype(int), kmeans.cluster_centers_
+    
+    def strip_rows(self, width: int) -> int:
+        """Rows per strip so that a strip holds about tile_megapixels pixels."""
+        return max(4 * STRIP_HALO, int(settings.tile_megapixels * 1_000_000) // max(width, 1))
+    
+    def should_tile(self, image: np.ndarray) -> bool:
+        """Whether decoded pixels are large enough to be analyzed in strips (uploads are planned from their header)."""
+        return image.shape[0] * image.shape[1] > settings.tiled_analysis_megapixels * 1_000_000
+    
+    @timed('color.extract_skin_pixels')
+    async def _extract_skin_pixels(self, image: np.ndarray, buffers: Optional[BufferPool] = None) -> np.ndarray:
+        """Extract skin-colored pixels from an image."""
+        with borrowed(buffers, image.shape[:2]) as skin_mask, borrowed(buffers, image.shape[:2], bool) as keep:
+            self._skin_mask(image, skin_mask, buffers)
+            
+            # Extract skin pixels
+            return self._filter_skin_pixels(image[np.greater(skin_mask, 0, out=keep)])
+    
+    def _extract_strip_skin_pixels(self, image: np.ndarray, top: int, bottom: int) -> np.ndarray:
+        """Skin pixels of rows top:bottom, masked with enough context rows to match the full image."""
+        context_top = max(0, top - STRIP_HALO)
+        context_bottom = min(image.shape[0], bottom + STRIP_HALO)
+        skin_mask = self._skin_mask(image[context_top:context_bottom])[top - context_top:bottom - context_top]
+        return self._filter_skin_pixels(image[top:bottom][skin_mask > 0])
+    
+    def _skin_mask(self, image: np.ndarray, out: Optional[np.ndarray] = None,
+                   buffers: Optional[BufferPool] = None) -> np.ndarray:
+        """Cleaned-up mask of skin-colored pixels (written into out when given)."""
+        with borrowed(buffers, image.shape) as ycrcb, borrowed(buffers, image.shape[:2]) as opened:
+            # Convert RGB to YCrCb color space (better for skin detection)
+            cv2.cvtColor(image, cv2.COLOR_RGB2YCrCb, dst=ycrcb)
+            
+            # Create mask for skin pixels
+            skin_mask = cv2.inRange(ycrcb, SKIN_LOWER_YCRCB, SKIN_UPPER_YCRCB, dst=out)
+            
+            # Apply morphological operations to clean up the mask
+            cv2.morphologyEx(skin_mask, cv2.MORPH_OPEN, MORPH_KERNEL, dst=opened)
+            return cv2.morphologyEx(opened, cv2.MORPH_CLOSE, MORPH_KERNEL, dst=skin_mask)
+    
+    def _filter_skin_pixels(self, skin_pixels: np.ndarray) -> np.ndarray:
+        """Drop masked pixels whose brightness or channel ratios are unlike skin."""
         if len(skin_pixels) > 0:
             # Remove pixels that are too dark or too light
             brightness = np.mean(skin_pixels, axis=1)
@@ -139,11 +397,27 @@ class ColorService:
         
         return skin_pixels
     
+    @timed('color.skin_cluster_centers')
+    async def skin_cluster_centers(self, image: np.ndarray, buffers: Optional[BufferPool] = None,
+                                   n_colors: int = 5) -> Optional[np.ndarray]:
+        """KMeans cluster centers of an image's skin pixels, to warm-start analyses of adjusted copies of it."""
+        skin_pixels = await self._extract_skin_pixels(image, buffers)
+        if len(skin_pixels) < n_colors:
+            return None
+        
+        from sklearn.cluster import KMeans
+        
+        return KMeans(n_clusters=n_colors, random_state=42, n_init=10).fit(skin_pixels).cluster_centers_
+    
+    @timed('color.get_dominant_color')
     async def _get_dominant_color(self, pixels: np.ndarray, n_colors: int = 5) -> np.ndarray:
         """Get the dominant color from a set of pixels using K-means clustering."""
         if len(pixels) < n_colors:
             return np.mean(pixels, axis=0).astype(int)
         
+        # sklearn is imported on first use; it dominates import time otherwise
+        from sklearn.cluster import KMeans
+        
         # Perform K-means clustering
         kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
         kmeans.fit(pixels)
@@ -158,13 +432,29 @@ class ColorService:
         
         return colors[dominant_color_index].astype(int)
     
+    @timed('color.get_weighted_dominant_color')
+    async def _get_weighted_dominant_color(self, colors: np.ndarray, weights: np.ndarray, n_colors: int = 5) -> np.ndarray:
+        """Dominant color of a weighted set of colors (e.g. histogram bin centroids)."""
+        if len(colors) < n_colors:
+            return np.average(colors, axis=0, weights=weights).astype(int)
+        
+        from sklearn.cluster import KMeans
+        
+        kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
+        kmeans.fit(colors, sample_weight=weights)
+        
+        # The dominant cluster is the one holding the most pixels, not the most bins
+        cluster_weights = np.bincount(kmeans.labels_, weights=weights, minlength=n_colors)
+        return kmeans.cluster_centers_[np.argmax(cluster_weights)].astype(int)
+    
+    @timed('color.classify_skin_tone')
     async def _classify_skin_tone(self, color: np.ndarray) -> str:
         """Classify skin tone based on color values."""
         min_distance = float('inf')
         closest_tone = 'medium'
         
         for tone_name, reference_color in self.skin_tone_references.items():
-            distance = euclidean(color, reference_color)
+            distance = float(np.linalg.norm(np.asarray(color, dtype=np.float64) - reference_color))
             if distance < min_distance:
                 min_distance = distance
                 closest_tone = tone_name
@@ -182,13 +472,16 @@ class ColorService:
         
         return tone_mapping.get(closest_tone, 'Medium')
     
+    @timed('color.determine_undertone')
     async def _determine_undertone(self, skin_pixels: np.ndarray) -> str:
         """Determine skin undertone (warm, cool, or neutral)."""
         if len(skin_pixels) == 0:
             return 'neutral'
         
-        # Calculate average color values
-        avg_color = np.mean(skin_pixels, axis=0)
+        return self._undertone_from_mean(np.mean(skin_pixels, axis=0))
+    
+    def _undertone_from_mean(self, avg_color: np.ndarray) -> str:
+        """Classify the undertone from the average skin color."""
         r, g, b = avg_color
         
         # Calculate color ratios and differences
@@ -203,25 +496,30 @@ class ColorService:
         else:
             return 'neutral'
     
+    @timed('color.calculate_confidence')
     async def _calculate_confidence(self, skin_pixels: np.ndarray, dominant_color: np.ndarray) -> float:
         """Calculate confidence score for the skin tone analysis."""
         if len(skin_pixels) == 0:
             return 0.0
         
         # Calculate how consistent the skin pixels are
-        distances = [euclidean(pixel, dominant_color) for pixel in skin_pixels]
-        avg_distance = np.mean(distances)
-        
+        # (vectorized so the work releases the GIL when run on the worker pool)
+        distances = np.linalg.norm(skin_pixels.astype(np.float64) - dominant_color, axis=1)
+        return self._confidence_from_distance(np.mean(distances), len(skin_pixels))
+    
+    def _confidence_from_distance(self, avg_distance: float, pixel_count: int) -> float:
+        """Confidence from the mean distance of skin pixels to the dominant color."""
         # Convert distance to confidence (lower distance = higher confidence)
         max_expected_distance = 50  # Empirically determined
         confidence = max(0.0, 1.0 - (avg_distance / max_expected_distance))
         
         # Boost confidence if we have many skin pixels
-        pixel_count_factor = min(1.0, len(skin_pixels) / 1000)
+        pixel_count_factor = min(1.0, pixel_count / 1000)
         confidence = confidence * (0.7 + 0.3 * pixel_count_factor)
         
         return min(1.0, confidence)
     
+    @timed('color.get_color_recommendations')
     async def get_color_recommendations(self, skin_tone_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate color recommendations based on skin tone analysis."""
         try:
@@ -293,27 +591,47 @@ class ColorService:
     async def _get_color_name(self, color_hex: str) -> str:
         """Get the name of a color from its hex value."""
         try:
-            # Convert hex to RGB
-            rgb = tuple(int(color_hex[i:i+2], 16) for i in (1, 3, 5))
-            
-            # Try to get exact match
-            try:
-                return webcolors.rgb_to_name(rgb)
-            except ValueError:
-                # Find closest named color
-                min_colors = {}
-                for key, name in webcolors.CSS3_HEX_TO_NAMES.items():
-                    r_c, g_c, b_c = webcolors.hex_to_rgb(key)
-                    rd = (r_c - rgb[0]) ** 2
-                    gd = (g_c - rgb[1]) ** 2
-                    bd = (b_c - rgb[2]) ** 2
-                    min_colors[(rd + gd + bd)] = name
-                
-                return min_colors[min(min_colors.keys())]
-                
+            return self._lookup_color_name(color_hex)
         except Exception:
             return "Custom Color"
     
+    def _lookup_color_name(self, color_hex: str) -> str:
+        """Closest named CSS3 color, memoized per hex value."""
+        name = self._color_names.get(color_hex)
+        if name is None:
+            rgb = np.array([int(color_hex[i:i+2], 16) for i in (1, 3, 5)])
+            names, values = self._get_name_index()
+            distances = ((values - rgb) ** 2).sum(axis=1)
+            # On ties the last name wins, as in the original dict-based lookup
+            name = names[np.flatnonzero(distances == distances.min())[-1]]
+            self._color_names[color_hex] = name
+        return name
+    
+    def _get_name_index(self) -> Tuple[List[str], np.ndarray]:
+        """CSS3 color names and their RGB values, built on first use."""
+        if self._name_index is None:
+            with self._index_lock:
+                if self._name_index is None:
+                    import webcolors
+                    names = list(webcolors.CSS3_HEX_TO_NAMES.values())
+                    values = np.array([tuple(webcolors.hex_to_rgb(key)) for key in webcolors.CSS3_HEX_TO_NAMES],
+                                      dtype=np.int64)
+                    self._name_index = (names, values)
+        return self._name_index
+    
+    def warm_up(self):
+        """Import sklearn and precompute the name index and names used by the recommendation tables."""
+        from sklearn.cluster import KMeans
+        
+        self._get_name_index()
+        palettes = [harmony[key] for harmony in self.color_harmonies.values() for key in ('best_colors', 'avoid_colors')]
+        palettes += list(self.seasonal_palettes.values())
+        for color_hex in {color for palette in palettes for color in palette}:
+            self._lookup_color_name(color_hex)
+        
+        # A tiny fit loads the compiled KMeans code paths
+        KMeans(n_clusters=2, random_state=42, n_init=1).fit(np.array([[0, 0, 0], [255, 255, 255], [10, 10, 10]]))
+    
     async def _calculate_color_confidence(self, color_hex: str, undertone: str, is_avoid: bool) -> float:
         """Calculate confidence score for a color recommendation."""
         if is_avoid:
@@ -348,6 +666,7 @@ class ColorService:
         else:
             return "Excellent for formal wear, outerwear, and evening attire"
     
+    @timed('color.get_seasonal_palette')
     async def _get_seasonal_palette(self, undertone: str, category: str) -> Dict[str, Any]:
         """Determine seasonal color palette."""
         # Map undertone to season
@@ -366,6 +685,7 @@ class ColorService:
             'description': f'Your {season.lower()} palette complements your {undertone} undertones beautifully'
         }
     
+    @timed('color.generate_outfit_suggestions')
     async def _generate_outfit_suggestions(self, undertone: str, best_colors: List[Dict]) -> List[Dict[str, Any]]:
         """Generate outfit color combination suggestions."""
         if len(best_colors) < 3:
@@ -396,4 +716,7 @@ class ColorService:
     def _hex_to_rgb(self, hex_color: str) -> Tuple[int, int, int]:
         """Convert hex color code to RGB values."""
         hex_color = hex_color.lstrip('#')
-        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
\ No newline at end of file
+        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+
+color_service = ColorService()
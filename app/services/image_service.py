@@ -3,24 +3,85 @@ import numpy as np
 from PIL import Image, ImageEnhance, ImageFilter
 import os
 import asyncio
-from typing import Dict, Any, Tuple, Optional
+import threading
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Optional
 from app.config import settings
+from app.core import enhance
+from app.core.buffers import BufferPool, borrowed
+from app.core.image_header import DecodePlan, inspect_image
+from app.core.memory import memory_budget
+from app.core.metrics import DECODE_ADMISSIONS, timed
+
+
+# Reference implementations of the app.core.enhance operations (IMAGE_BACKEND=pil)
+PIL_ENHANCERS = {
+    'brightness': ImageEnhance.Brightness,
+    'color': ImageEnhance.Color,
+    'contrast': ImageEnhance.Contrast,
+    'sharpness': ImageEnhance.Sharpness,
+}
+
+
+@lru_cache(maxsize=256)
+def _temperature_lut(warmth: int) -> np.ndarray:
+    """Per-channel lookup table of a warmth adjustment (float32 math, truncated to uint8)."""
+    values = np.arange(256, dtype=np.float32) / 255.0
+    if warmth > 0:  # Warmer (more red/yellow)
+        factor = warmth / 50.0
+        scales = (1 + factor * 0.3, 1 + factor * 0.2, 1 - factor * 0.1)
+    else:  # Cooler (more blue)
+        factor = abs(warmth) / 50.0
+        scales = (1 - factor * 0.2, 1 - factor * 0.1, 1 + factor * 0.3)
+    lut = np.stack([np.clip(values * scale, 0, 1) for scale in scales], axis=-1)
+    return (lut * 255).astype(np.uint8).reshape(1, 256, 3)
+
+
+@lru_cache(maxsize=256)
+def _hue_lut(hue_shift: int) -> np.ndarray:
+    """Lookup table shifting the OpenCV hue channel (0-179), leaving saturation and value alone."""
+    hue_adjustment = (hue_shift / 30.0) * 180  # Convert to OpenCV hue range
+    values = np.arange(256, dtype=np.uint8)
+    hue = ((values + hue_adjustment) % 180).astype(np.uint8)
+    return np.stack([hue, values, values], axis=-1).reshape(1, 256, 3)
+
 
 class ImageService:
     """Service for image processing and manipulation operations."""
     
     def __init__(self):
         self.supported_formats = ['.jpg', '.jpeg', '.png', '.webp']
+        # Cascade classifiers are not thread-safe, so each worker thread loads its own once
+        self._local = threading.local()
+    
+    def _get_face_cascade(self) -> cv2.CascadeClassifier:
+        """Face cascade classifier for the current thread, loaded on first use."""
+        cascade = getattr(self._local, 'face_cascade', None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self._local.face_cascade = cascade
+        return cascade
+    
+    def warm_up(self):
+        """Load the face cascade ahead of the first request."""
+        self._get_face_cascade()
     
-    async def load_image(self, file_path: str) -> np.ndarray:
-        """Load and preprocess an image from file path."""
+    @timed('image.load_image')
+    async def load_image(self, file_path: str, full_resolution: bool = False) -> np.ndarray:
+        """Load and preprocess an image from file path.
+        
+        With full_resolution, images planned for tiled analysis keep their
+        decoded resolution instead of being resized to the display limits.
+        """
         try:
             # Validate file exists
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"Image file not found: {file_path}")
             
-            # Load image using OpenCV
-            image = cv2.imread(file_path)
+            # Check the header first, then decode (JPEGs at reduced scale when oversized)
+            plan = inspect_image(file_path)
+            with self._decoding(plan):
+                image = cv2.imread(file_path, plan.flags)
             if image is None:
                 raise ValueError(f"Could not load image: {file_path}")
             
@@ -28,14 +89,42 @@ class ImageService:
             image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             
             # Resize if too large
-            image = await self._resize_image(image)
+            if not (full_resolution and plan.tiled):
+                image = await self.resize_image(image)
             
             return image
             
         except Exception as e:
             raise Exception(f"Error loading image: {str(e)}")
     
-    async def _resize_image(self, image: np.ndarray) -> np.ndarray:
+    @timed('image.decode_image')
+    async def decode_image(self, data: bytes, full_resolution: bool = False) -> np.ndarray:
+        """Decode and preprocess an image from encoded bytes (e.g. an API upload), as load_image does."""
+        try:
+            plan = inspect_image(data)
+            with self._decoding(plan):
+                image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), plan.flags)
+            if image is None:
+                raise ValueError("Could not decode image data")
+            
+            # Convert BGR to RGB
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            
+            # Resize if too large
+            if full_resolution and plan.tiled:
+                return image
+            return await self.resize_image(image)
+            
+        except Exception as e:
+            raise Exception(f"Error decoding image: {str(e)}")
+    
+    def _decoding(self, plan: DecodePlan):
+        """Reserve the decode's memory and count the decode route."""
+        DECODE_ADMISSIONS.inc(format=plan.header.format, route=plan.route)
+        return memory_budget.reserve(plan.decoded_pixels, 'decode')
+    
+    @timed('image.resize_image')
+    async def resize_image(self, image: np.ndarray) -> np.ndarray:
         """Resize image if it exceeds maximum dimensions."""
         height, width = image.shape[:2]
         
@@ -54,93 +143,112 @@ class ImageService:
         
         return image
     
-    async def adjust_skin_tone(self, image: np.ndarray, adjustments: Dict[str, Any]) -> np.ndarray:
-        """Apply skin tone adjustments to an image."""
+    @timed('image.adjust_skin_tone')
+    async def adjust_skin_tone(self, image: np.ndarray, adjustments: Dict[str, Any],
+                               out: Optional[np.ndarray] = None, buffers: Optional[BufferPool] = None) -> np.ndarray:
+        """Apply skin tone adjustments to an image.
+        
+        The result is written into `out` when given (an array shaped like the
+        image) and intermediate planes are drawn from `buffers`, so repeated
+        adjustments of the same image allocate no full-frame arrays (with the
+        default opencv backend; the pil backend copies through PIL images).
+        """
         try:
-            # Convert to PIL Image for easier manipulation
-            pil_image = Image.fromarray(image)
+            if out is None:
+                out = np.empty_like(image)
+            source = image
             
+            steps = []
             # Apply brightness adjustment
             if adjustments.get('brightness', 0) != 0:
-                brightness_factor = 1.0 + (adjustments['brightness'] / 100.0)
-                enhancer = ImageEnhance.Brightness(pil_image)
-                pil_image = enhancer.enhance(brightness_factor)
+                steps.append(('brightness', 1.0 + (adjustments['brightness'] / 100.0)))
             
             # Apply saturation adjustment
             if adjustments.get('saturation', 0) != 0:
-                saturation_factor = 1.0 + (adjustments['saturation'] / 100.0)
-                enhancer = ImageEnhance.Color(pil_image)
-                pil_image = enhancer.enhance(saturation_factor)
+                steps.append(('color', 1.0 + (adjustments['saturation'] / 100.0)))
             
-            # Convert back to numpy array for advanced adjustments
-            adjusted_image = np.array(pil_image)
+            if steps:
+                source = self._enhance(image, steps, out, buffers)
             
             # Apply warmth adjustment (color temperature)
             if adjustments.get('warmth', 0) != 0:
-                adjusted_image = await self._adjust_color_temperature(
-                    adjusted_image, adjustments['warmth']
-                )
+                source = await self._adjust_color_temperature(source, adjustments['warmth'], out=out)
             
             # Apply hue shift
             if adjustments.get('hue_shift', 0) != 0:
-                adjusted_image = await self._adjust_hue(
-                    adjusted_image, adjustments['hue_shift']
-                )
+                source = await self._adjust_hue(source, adjustments['hue_shift'], out=out, buffers=buffers)
             
-            return adjusted_image
+            if source is image:
+                np.copyto(out, image)
+            return out
             
         except Exception as e:
             raise Exception(f"Error adjusting skin tone: {str(e)}")
     
-    async def _adjust_color_temperature(self, image: np.ndarray, warmth: int) -> np.ndarray:
-        """Adjust the color temperature of an image."""
-        # Convert to float for calculations
-        image_float = image.astype(np.float32) / 255.0
-        
-        # Create temperature adjustment matrix
-        if warmth > 0:  # Warmer (more red/yellow)
-            factor = warmth / 50.0
-            # Increase red and yellow channels
-            image_float[:, :, 0] = np.clip(image_float[:, :, 0] * (1 + factor * 0.3), 0, 1)  # Red
-            image_float[:, :, 1] = np.clip(image_float[:, :, 1] * (1 + factor * 0.2), 0, 1)  # Green
-            image_float[:, :, 2] = np.clip(image_float[:, :, 2] * (1 - factor * 0.1), 0, 1)  # Blue
-        else:  # Cooler (more blue)
-            factor = abs(warmth) / 50.0
-            # Increase blue channel, decrease red/yellow
-            image_float[:, :, 0] = np.clip(image_float[:, :, 0] * (1 - factor * 0.2), 0, 1)  # Red
-            image_float[:, :, 1] = np.clip(image_float[:, :, 1] * (1 - factor * 0.1), 0, 1)  # Green
-            image_float[:, :, 2] = np.clip(image_float[:, :, 2] * (1 + factor * 0.3), 0, 1)  # Blue
-        
-        # Convert back to uint8
-        return (image_float * 255).astype(np.uint8)
+    async def adjust_colors(self, colors: np.ndarray, adjustments: Dict[str, Any]) -> np.ndarray:
+        """(n, 3) RGB colors as adjust_skin_tone renders them (its adjustments are all per pixel)."""
+        pixels = np.clip(np.rint(colors), 0, 255).astype(np.uint8)[np.newaxis]
+        return (await self.adjust_skin_tone(pixels, adjustments))[0].astype(np.float64)
     
-    async def _adjust_hue(self, image: np.ndarray, hue_shift: int) -> np.ndarray:
-        """Adjust the hue of an image."""
-        # Convert RGB to HSV
-        hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+    def _enhance(self, image: np.ndarray, steps: List[Tuple[str, float]], out: np.ndarray,
+                 buffers: Optional[BufferPool] = None) -> np.ndarray:
+        """Apply ImageEnhance operations, as (name, factor) steps in order, into out.
         
-        # Adjust hue channel
-        hue_adjustment = (hue_shift / 30.0) * 180  # Convert to OpenCV hue range
-        hsv[:, :, 0] = (hsv[:, :, 0] + hue_adjustment) % 180
+        The opencv backend works on the array itself; the pil backend (the
+        reference implementation) converts to a PIL image and back once.
+        """
+        if settings.image_backend == 'pil':
+            pil_image = Image.fromarray(image)
+            for name, factor in steps:
+                pil_image = PIL_ENHANCERS[name](pil_image).enhance(factor)
+            np.copyto(out, np.asarray(pil_image))
+            return out
         
-        # Convert back to RGB
-        return cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
+        source = image
+        for name, factor in steps:
+            source = enhance.ENHANCERS[name](source, factor, out=out, buffers=buffers)
+        return source
+    
+    @timed('image.adjust_color_temperature')
+    async def _adjust_color_temperature(self, image: np.ndarray, warmth: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Adjust the color temperature of an image (in place when out is image)."""
+        return cv2.LUT(image, _temperature_lut(warmth), dst=out)
+    
+    @timed('image.adjust_hue')
+    async def _adjust_hue(self, image: np.ndarray, hue_shift: int, out: Optional[np.ndarray] = None,
+                          buffers: Optional[BufferPool] = None) -> np.ndarray:
+        """Adjust the hue of an image (in place when out is image)."""
+        with borrowed(buffers, image.shape) as hsv:
+            # Convert RGB to HSV, shift the hue channel and convert back
+            cv2.cvtColor(image, cv2.COLOR_RGB2HSV, dst=hsv)
+            cv2.LUT(hsv, _hue_lut(hue_shift), dst=hsv)
+            return cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB, dst=out)
+    
+    def detect_faces(self, gray: np.ndarray, limit: Optional[int] = None) -> List[Tuple[int, int, int, int]]:
+        """(x, y, w, h) of the faces in a grayscale image, largest first."""
+        faces = self._get_face_cascade().detectMultiScale(gray, 1.1, 4)
+        boxes = sorted((tuple(int(v) for v in face) for face in faces), key=lambda box: box[2] * box[3], reverse=True)
+        return boxes[:limit] if limit is not None else boxes
     
+    def detect_face(self, gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """(x, y, w, h) of the largest face in a grayscale image, or None."""
+        faces = self.detect_faces(gray, limit=1)
+        return faces[0] if faces else None
+    
+    @timed('image.detect_faces')
+    async def find_faces(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """Face boxes of an RGB image, largest first, at most settings.max_faces."""
+        return self.detect_faces(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY), limit=settings.max_faces)
+    
+    @timed('image.extract_face_region')
     async def extract_face_region(self, image: np.ndarray) -> Optional[np.ndarray]:
         """Extract face region from image for more accurate skin tone analysis."""
         try:
-            # Load face cascade classifier
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            
             # Convert to grayscale for face detection
             gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
             
-            # Detect faces
-            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-            
-            if len(faces) > 0:
-                # Use the largest face
-                largest_face = max(faces, key=lambda x: x[2] * x[3])
+            largest_face = self.detect_face(gray)
+            if largest_face is not None:
                 x, y, w, h = largest_face
                 
                 # Extract face region with some padding
@@ -159,6 +267,7 @@ class ImageService:
             # If face detection fails, return None to use full image
             return None
     
+    @timed('image.create_thumbnail')
     async def create_thumbnail(self, image: np.ndarray, size: int = None) -> np.ndarray:
         """Create a thumbnail version of the image."""
         if size is None:
@@ -178,6 +287,17 @@ class ImageService:
         thumbnail = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
         return thumbnail
     
+    @timed('image.create_preview')
+    async def create_preview(self, image: np.ndarray, size: int = None) -> np.ndarray:
+        """Downscale an image to preview resolution (never upscales)."""
+        if size is None:
+            size = settings.preview_size
+        
+        if max(image.shape[:2]) <= size:
+            return image
+        
+        return await self.create_thumbnail(image, size)
+    
     async def save_processed_image(self, image: np.ndarray, filename: str) -> str:
         """Save processed image to uploads directory."""
         try:
@@ -185,7 +305,7 @@ class ImageService:
             if not any(filename.lower().endswith(ext) for ext in self.supported_formats):
                 filename += '.jpg'
             
-            file_path = os.path.join(settings.upload_dir, filename)
+            file_path = os.path.join(settings.ensure_upload_dir(), filename)
             
             # Convert RGB to BGR for OpenCV saving
             bgr_image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
@@ -213,22 +333,17 @@ class ImageService:
             'dtype': str(image.dtype)
         }
     
-    async def enhance_image_quality(self, image: np.ndarray) -> np.ndarray:
-        """Apply basic image enhancement for better analysis."""
+    async def enhance_image_quality(self, image: np.ndarray, out: Optional[np.ndarray] = None,
+                                    buffers: Optional[BufferPool] = None) -> np.ndarray:
+        """Apply basic image enhancement for better analysis (in place when out is image)."""
         try:
-            # Convert to PIL for enhancement
-            pil_image = Image.fromarray(image)
-            
-            # Slight sharpening
-            enhancer = ImageEnhance.Sharpness(pil_image)
-            pil_image = enhancer.enhance(1.1)
-            
-            # Slight contrast enhancement
-            enhancer = ImageEnhance.Contrast(pil_image)
-            pil_image = enhancer.enhance(1.05)
-            
-            return np.array(pil_image)
+            # Slight sharpening, then slight contrast enhancement
+            return self._enhance(image, [('sharpness', 1.1), ('contrast', 1.05)],
+                                 out if out is not None else np.empty_like(image), buffers)
             
         except Exception as e:
             # Return original image if enhancement fails
-            return image
\ No newline at end of file
+            return image
+
+
+image_service = ImageService()
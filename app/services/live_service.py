@@ -0,0 +1,156 @@
+import time
+from typing import Any, Dict, Optional, Tuple
+import cv2
+import numpy as np
+from app.config import settings
+from app.core.image_header import ImageRejected, inspect_image
+from app.core.metrics import LIVE_FRAMES, timed
+from app.core.rate_limit import RateLimitExceeded, analysis_slots
+from app.services.color_service import ColorService
+from app.services.image_service import ImageService
+from app.services.worker_pool import WorkerPool
+
+Box = Tuple[int, int, int, int]
+
+
+class FrameOverBudget(Exception):
+    """Raised inside a frame analysis once its deadline has passed."""
+    pass
+
+
+class LiveSession:
+    """Live camera analysis state of one browser session.
+
+    At most one frame is analyzed at a time: frames arriving meanwhile are
+    dropped, never queued, so the result always follows the newest frame.
+    Each frame has a hard budget (LIVE_FRAME_BUDGET_MS) from arrival, checked
+    between stages; a frame that runs over is abandoned and the previous
+    result stays on screen. Work is bounded to fit the budget: the face is
+    searched around the previous frame's box first, only LIVE_MAX_PIXELS skin
+    pixels are clustered, and KMeans is warm-started from the previous
+    frame's cluster centers. Recommendations are only recomputed (and pushed)
+    when the category or undertone changes, and only once the new values have
+    held for LIVE_CONFIRM_FRAMES frames, so a tone on a category boundary
+    does not flicker between palettes.
+    """
+
+    def __init__(self, images: ImageService, colors: ColorService, pool: WorkerPool,
+                 budget_ms: Optional[float] = None):
+        self.images = images
+        self.colors = colors
+        self.pool = pool
+        self.budget = (budget_ms if budget_ms is not None else settings.live_frame_budget_ms) / 1000
+        self.box: Optional[Box] = None
+        self.centers: Optional[np.ndarray] = None
+        self.key: Optional[Tuple[str, str]] = None
+        self.candidate: Optional[Tuple[str, str]] = None
+        self.candidate_frames = 0
+        self.busy = False
+        self.counts: Dict[str, int] = {}
+
+    async def submit(self, data: bytes) -> Optional[Dict[str, Any]]:
+        """Analyze a JPEG frame unless another one is still in progress.
+
+        Returns None when the frame was dropped or abandoned; otherwise the
+        analysis, the recommendations (None when category and undertone are
+        unchanged) and the frame time.
+        """
+        arrived = time.perf_counter()
+        if self.busy:
+            return self._count('dropped')
+        try:
+            release = analysis_slots.reserve('live')
+        except RateLimitExceeded:
+            return self._count('busy')
+
+        self.busy = True
+        try:
+            analysis = await self.pool.run_coroutine(self._analyze_frame, data, arrived + self.budget)
+            if analysis is None:
+                return None
+            recommendations = None
+            if self._confirm((analysis['category'], analysis['undertone'])):
+                recommendations = await self.pool.run_coroutine(self.colors.get_color_recommendations, analysis)
+            self._count('changed' if recommendations is not None else 'unchanged')
+            return {'analysis': analysis, 'recommendations': recommendations,
+                    'elapsed_ms': (time.perf_counter() - arrived) * 1000}
+        finally:
+            self.busy = False
+            release()
+
+    def reset(self):
+        """Forget the warm starts and the shown result (camera stopped or switched)."""
+        self.box = None
+        self.centers = None
+        self.key = None
+        self.candidate = None
+
+    def _confirm(self, key: Tuple[str, str]) -> bool:
+        """Whether this frame's (category, undertone) becomes the shown one."""
+        if key == self.key:
+            self.candidate = None
+            return False
+        if key != self.candidate:
+            self.candidate, self.candidate_frames = key, 0
+        self.candidate_frames += 1
+        # The first result is shown straight away
+        if self.key is not None and self.candidate_frames < settings.live_confirm_frames:
+            return False
+        self.key, self.candidate = key, None
+        return True
+
+    def _count(self, result: str) -> None:
+        self.counts[result] = self.counts.get(result, 0) + 1
+        LIVE_FRAMES.inc(result=result)
+
+    @timed('live.analyze_frame')
+    async def _analyze_frame(self, data: bytes, deadline: float) -> Optional[Dict[str, Any]]:
+        try:
+            image = self._decode(data)
+            self._check(deadline)
+            self.box = self._find_face(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY))
+            if self.box is not None:
+                x, y, w, h = self.box
+                padding = int(min(w, h) * 0.1)
+                image = image[max(0, y - padding):y + h + padding, max(0, x - padding):x + w + padding]
+            pixels = self.colors.skin_pixels(image)
+            if len(pixels) == 0:
+                return self._count('no_skin')
+            if len(pixels) > settings.live_max_pixels:
+                pixels = pixels[::-(-len(pixels) // settings.live_max_pixels)]
+            self._check(deadline)
+            analysis, self.centers = await self.colors.analyze_frame_pixels(pixels, self.centers)
+            self._check(deadline)
+            return analysis
+        except FrameOverBudget:
+            return self._count('over_budget')
+        except ImageRejected:
+            return self._count('invalid')
+
+    def _check(self, deadline: float):
+        if time.perf_counter() > deadline:
+            raise FrameOverBudget()
+
+    def _decode(self, data: bytes) -> np.ndarray:
+        """Decode a frame after checking its header against the live frame size."""
+        if len(data) > settings.live_max_frame_bytes:
+            raise ImageRejected('Live frame is too large')
+        header = inspect_image(data).header
+        if header.width > 2 * settings.live_frame_width or header.height > 2 * settings.live_frame_width:
+            raise ImageRejected('Live frame is too large')
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ImageRejected('Live frame is corrupt')
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    def _find_face(self, gray: np.ndarray) -> Optional[Box]:
+        """Face box, searched around the previous frame's box before the whole frame."""
+        if self.box is not None:
+            x, y, w, h = self.box
+            x1, y1 = max(0, x - w // 2), max(0, y - h // 2)
+            x2, y2 = min(gray.shape[1], x + w + w // 2), min(gray.shape[0], y + h + h // 2)
+            found = self.images.detect_face(gray[y1:y2, x1:x2])
+            if found is not None:
+                fx, fy, fw, fh = found
+                return x1 + fx, y1 + fy, fw, fh
+        return self.images.detect_face(gray)
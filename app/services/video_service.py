@@ -0,0 +1,204 @@
+import math
+import time
+from typing import Any, Dict, Optional, Tuple
+import cv2
+import numpy as np
+from app.config import settings
+from app.core.memory import memory_budget
+from app.core.metrics import ANALYSES, VIDEO_FRAMES, timed
+from app.services.color_service import ColorService, SkinStatistics, color_service
+from app.services.image_service import ImageService, image_service
+from app.services.worker_pool import WorkerPool, worker_pool
+from core.utils import FileUploadError
+
+# Frame rate assumed when the container does not report one
+DEFAULT_FPS = 25.0
+
+Box = Tuple[int, int, int, int]
+
+
+class FaceTracker:
+    """Face box from the cascade on keyframes, followed by template matching in between.
+
+    Detection runs every `keyframe_interval` sampled frames, or straight away
+    when the match score drops below `threshold` (the face moved too far or
+    left the frame). When a keyframe finds no face, the whole frame is used
+    until the next keyframe.
+    """
+
+    def __init__(self, images: ImageService, keyframe_interval: int, threshold: float):
+        self.images = images
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.threshold = threshold
+        self.box: Optional[Box] = None
+        self.template: Optional[np.ndarray] = None
+        self.since_keyframe = self.keyframe_interval
+        self.keyframes = 0
+        self.tracked = 0
+
+    def update(self, gray: np.ndarray) -> Optional[Box]:
+        """Face box in this (grayscale) frame, or None."""
+        if self.since_keyframe >= self.keyframe_interval or (self.box is not None and not self._track(gray)):
+            self._detect(gray)
+        self.since_keyframe += 1
+        return self.box
+
+    def _detect(self, gray: np.ndarray):
+        self.keyframes += 1
+        self.since_keyframe = 0
+        self.box = self.images.detect_face(gray)
+        if self.box is not None:
+            x, y, w, h = self.box
+            self.template = gray[y:y + h, x:x + w].copy()
+
+    def _track(self, gray: np.ndarray) -> bool:
+        """Search a window around the last box for the keyframe's face; False when it is lost."""
+        x, y, w, h = self.box
+        x1, y1 = max(0, x - w // 2), max(0, y - h // 2)
+        x2, y2 = min(gray.shape[1], x + w + w // 2), min(gray.shape[0], y + h + h // 2)
+        scores = cv2.matchTemplate(gray[y1:y2, x1:x2], self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if not score >= self.threshold:  # also catches NaN from a flat template
+            return False
+        self.box = (x1 + dx, y1 + dy, w, h)
+        self.tracked += 1
+        return True
+
+
+class VideoService:
+    """Skin tone analysis of video clips.
+
+    Frames are sampled every `stride` source frames, skipped ones are only
+    grabbed (demuxed and decoded, never converted or copied). The stride starts
+    at VIDEO_SAMPLE_FPS, doubles while the estimate holds steady and falls back
+    when it moves. The face is detected on keyframes and tracked in between,
+    and skin pixels of the face box are accumulated in SkinStatistics (the same
+    histogram the tiled analysis uses) while an exponential moving average of
+    the per-frame skin color serves as the running estimate. Sampling stops
+    early once that estimate is steady and confident enough.
+    """
+
+    def __init__(self, images: ImageService, colors: ColorService, pool: Optional[WorkerPool] = None):
+        self.images = images
+        self.colors = colors
+        self.pool = pool
+
+    async def analyze_file(self, file_path: str) -> Dict[str, Any]:
+        """Analyze a video file on the worker pool."""
+        result = await self.pool.run_coroutine(self.analyze_video, file_path)
+        ANALYSES.inc(source='video')
+        return result
+
+    @timed('video.analyze_video')
+    async def analyze_video(self, file_path: str) -> Dict[str, Any]:
+        """Analyze a clip; returns the analysis (with a 'video' metadata section) and recommendations."""
+        capture = cv2.VideoCapture(file_path)
+        try:
+            if not capture.isOpened():
+                raise FileUploadError('Could not read the video file')
+            width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if width <= 0 or height <= 0:
+                raise FileUploadError('Could not read the video dimensions')
+            if width * height > settings.max_decode_megapixels * 1_000_000:
+                raise FileUploadError(f'Video resolution is too large ({width}x{height})')
+
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            if not fps or math.isnan(fps) or fps <= 0:
+                fps = DEFAULT_FPS
+            scale = min(1.0, settings.video_frame_width / width)
+            frame_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+            # One source frame and one analysis frame are resident at a time
+            with memory_budget.reserve(width * height, 'decode'), \
+                    memory_budget.reserve(frame_size[0] * frame_size[1], 'analysis'):
+                stats, video = self._sample(capture, fps, frame_size)
+        finally:
+            capture.release()
+
+        if stats.count == 0:
+            raise ValueError('No skin pixels detected in the video')
+        analysis = await self.colors.analyze_statistics(stats)
+        video.update({'width': width, 'height': height, 'fps': fps})
+        analysis['analysis_metadata']['video'] = video
+        recommendations = await self.colors.get_color_recommendations(analysis)
+        return {'analysis': analysis, 'recommendations': recommendations}
+
+    def _sample(self, capture: cv2.VideoCapture, fps: float, frame_size: Tuple[int, int]) -> Tuple[SkinStatistics, Dict[str, Any]]:
+        """Run the sampling loop; returns the skin statistics and the 'video' metadata."""
+        tracker = FaceTracker(self.images, settings.video_keyframe_interval, settings.video_track_threshold)
+        stats = SkinStatistics()
+        base_stride = max(1, round(fps / settings.video_sample_fps))
+        min_stride, max_stride = max(1, base_stride // 2), max(base_stride, round(fps))
+        last_frame = int(fps * settings.video_max_seconds)
+
+        stride = 1  # the first frame is always analyzed
+        read = sampled = steady = 0
+        estimate: Optional[np.ndarray] = None
+        stopped_early = False
+        start = time.perf_counter()
+
+        while sampled < settings.video_max_samples and read + stride <= last_frame:
+            # Skipped frames are still decoded (inter-frame codecs need them) but never converted
+            skipped = 0
+            while skipped < stride - 1 and capture.grab():
+                skipped += 1
+            ok, frame = capture.read() if skipped == stride - 1 else (False, None)
+            read += skipped + ok
+            if not ok:
+                break
+            sampled += 1
+
+            if frame_size != (frame.shape[1], frame.shape[0]):
+                frame = cv2.resize(frame, frame_size, interpolation=cv2.INTER_AREA)
+            box = tracker.update(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            if box is not None:
+                # Same padding as ImageService.extract_face_region
+                x, y, w, h = box
+                padding = int(min(w, h) * 0.1)
+                frame = frame[max(0, y - padding):y + h + padding, max(0, x - padding):x + w + padding]
+            pixels = self.colors.skin_pixels(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if len(pixels) == 0:
+                steady, stride = 0, base_stride
+                continue
+            stats.add(pixels)
+
+            # Temporal smoothing: the running estimate moves a fraction of the way to each frame
+            frame_color = pixels.mean(axis=0)
+            previous = estimate
+            estimate = frame_color if previous is None else \
+                settings.video_smoothing * frame_color + (1 - settings.video_smoothing) * previous
+            change = math.inf if previous is None else float(np.linalg.norm(estimate - previous))
+
+            if change <= settings.video_stable_delta:
+                steady += 1
+                stride = min(max_stride, stride * 2)
+            else:
+                steady = 0
+                stride = min_stride if change > 4 * settings.video_stable_delta else base_stride
+
+            if steady >= settings.video_stable_samples:
+                confidence = self.colors.confidence(stats, estimate)
+                if confidence >= settings.confidence_threshold:
+                    stopped_early = True
+                    break
+
+        elapsed = time.perf_counter() - start
+        VIDEO_FRAMES.inc(read, kind='read')
+        VIDEO_FRAMES.inc(sampled, kind='sampled')
+        VIDEO_FRAMES.inc(tracker.keyframes, kind='keyframe')
+        return stats, {
+            'frames_read': read,
+            'frames_sampled': sampled,
+            'keyframes': tracker.keyframes,
+            'frames_tracked': tracker.tracked,
+            'seconds_covered': read / fps,
+            'stopped_early': stopped_early,
+            'estimate_rgb': [] if estimate is None else [round(float(c), 1) for c in estimate],
+            'elapsed_s': elapsed,
+            'frames_per_sec': read / elapsed if elapsed > 0 else 0.0,
+            'sampled_frames_per_sec': sampled / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+video_service = VideoService(image_service, color_service, worker_pool)
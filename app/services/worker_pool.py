@@ -0,0 +1,87 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+from app.core.concurrency import concurrency
+
+
+class WorkerPool:
+    """Shared thread pool for CPU-bound image and color work.
+
+    OpenCV, NumPy and scikit-learn release the GIL in their hot loops, so
+    running service calls here keeps the UI event loop responsive and lets
+    independent analyses overlap.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or concurrency.worker_threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pending = 0
+        self._running = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Create the executor on first use."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='analysis-worker'
+                    )
+        return self._executor
+
+    @property
+    def running(self) -> int:
+        """Jobs currently executing on a worker thread."""
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        """Jobs submitted but still waiting for a free worker."""
+        return max(0, self._pending - self._running)
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking function on the pool, carrying over the caller's context (e.g. the active trace)."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        with self._lock:
+            self._pending += 1
+        try:
+            return await loop.run_in_executor(self.executor, functools.partial(context.run, self._track, func, args, kwargs))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _track(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def run_coroutine(self, coro_func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Run a (CPU-bound) coroutine function to completion on a pool thread."""
+        return await self.run(self._run_in_thread_loop, coro_func, args, kwargs)
+
+    def _run_in_thread_loop(self, coro_func: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict) -> Any:
+        # Each worker thread keeps its own event loop instead of creating one per call
+        loop = getattr(self._local, 'loop', None)
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._local.loop = loop
+        return loop.run_until_complete(coro_func(*args, **kwargs))
+
+    def shutdown(self):
+        """Stop the pool (pending work is allowed to finish)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+worker_pool = WorkerPool()
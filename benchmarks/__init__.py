@@ -0,0 +1,2 @@
+# Performance benchmarks for the Color Harmony services.
+# Run individual suites with `python -m benchmarks.<module>`.
@@ -0,0 +1,134 @@
+"""First-load and repeat-load transfer sizes of the page and its own static assets.
+
+Spawns main.py and loads the page the way a browser with an empty cache
+would: the HTML, then every stylesheet and script it links under the asset
+prefix, recording the bytes on the wire (after content coding) and the cache
+headers. A repeat load fetches the HTML again and only the assets a browser
+would have to re-request: none when they are marked immutable. Conditional
+requests (If-None-Match, sent on a forced reload) are measured separately.
+NiceGUI's own framework scripts are not included. Exits with status 1 when
+an asset is not served immutable or not in the requested encoding.
+
+Usage:
+    python -m benchmarks.bench_assets
+    python -m benchmarks.bench_assets --encoding gzip --port 8766
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from app.core.assets import ASSET_PREFIX
+
+ASSET_LINK = re.compile(r'(?:href|src)="(%s/[^"]+)"' % re.escape(ASSET_PREFIX))
+
+
+def fetch(http: httpx.Client, url: str, **headers) -> Dict[str, Any]:
+    response = http.get(url, headers=headers)
+    return {
+        'status': response.status_code,
+        'wire_bytes': response.num_bytes_downloaded,
+        'bytes': len(response.content),
+        'encoding': response.headers.get('content-encoding', 'identity'),
+        'cache_control': response.headers.get('cache-control', ''),
+        'etag': response.headers.get('etag'),
+        'text': response.text if response.status_code == 200 else '',
+    }
+
+
+def load_page(http: httpx.Client, url: str, encoding: str, cached: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Load the page and the assets a browser holding `cached` would request."""
+    page = fetch(http, url + '/', **{'Accept-Encoding': encoding})
+    assets = {}
+    for path in ASSET_LINK.findall(page['text']):
+        previous = cached.get(path)
+        if previous is not None and 'immutable' in previous['cache_control']:
+            continue
+        assets[path] = cached[path] = fetch(http, url + path, **{'Accept-Encoding': encoding})
+    return {
+        'html_wire_bytes': page['wire_bytes'],
+        'asset_wire_bytes': sum(asset['wire_bytes'] for asset in assets.values()),
+        'total_wire_bytes': page['wire_bytes'] + sum(asset['wire_bytes'] for asset in assets.values()),
+        'requests': 1 + len(assets),
+        'assets': {path: {key: value for key, value in asset.items() if key != 'text'} for path, asset in assets.items()},
+    }
+
+
+def run(port: int, encoding: str, timeout: float) -> Dict[str, Any]:
+    url = f'http://127.0.0.1:{port}'
+    spawned = time.perf_counter()
+    server = subprocess.Popen([sys.executable, 'main.py'],
+                              env=dict(os.environ, PORT=str(port), HOST='127.0.0.1', WARMUP_ENABLED='false'),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=timeout) as http:
+            while True:
+                try:
+                    http.get(url + '/health')
+                    break
+                except httpx.TransportError:
+                    if time.perf_counter() - spawned > timeout:
+                        raise TimeoutError('server did not start')
+                    time.sleep(0.05)
+
+            cached: Dict[str, Dict[str, Any]] = {}
+            first = load_page(http, url, encoding, cached)
+            repeat = load_page(http, url, encoding, cached)
+            revalidated = {path: fetch(http, url + path, **{'Accept-Encoding': encoding, 'If-None-Match': asset['etag']})
+                           for path, asset in cached.items() if asset['etag']}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {
+        'accept_encoding': encoding,
+        'first_load': first,
+        'repeat_load': repeat,
+        'revalidation': {path: {'status': result['status'], 'wire_bytes': result['wire_bytes']}
+                         for path, result in revalidated.items()},
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--encoding', default='gzip, deflate, br', help='Accept-Encoding sent by the simulated browser')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    report = run(args.port, args.encoding, args.timeout)
+    for name in ('first_load', 'repeat_load'):
+        load = report[name]
+        print(f"{name:<12} {load['total_wire_bytes'] / 1024:>6.1f} KB in {load['requests']} requests "
+              f"(html {load['html_wire_bytes'] / 1024:.1f} KB, assets {load['asset_wire_bytes'] / 1024:.1f} KB)",
+              file=sys.stderr)
+    for path, asset in report['first_load']['assets'].items():
+        print(f"  {path}: {asset['bytes']} B -> {asset['wire_bytes']} B {asset['encoding']}, {asset['cache_control']}",
+              file=sys.stderr)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+    accepted = [coding.strip().split(';')[0] for coding in args.encoding.split(',')]
+    failures = [path for path, asset in report['first_load']['assets'].items()
+                if asset['status'] != 200 or 'immutable' not in asset['cache_control']
+                or (asset['encoding'] != 'identity' and asset['encoding'] not in accepted)]
+    if failures:
+        print(f"Assets not served immutable or in an accepted encoding: {', '.join(failures)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
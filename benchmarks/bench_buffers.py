@@ -0,0 +1,119 @@
+"""Steady-state allocations of repeated adjustments, with and without a buffer pool.
+
+Each adjustment is applied --repeat times to the same synthetic portrait, as
+slider moves on one uploaded image would, and the peak bytes allocated above
+the starting point are measured with tracemalloc for the adjustment and the
+analysis of its result. Numbers are in frames (multiples of the image's own
+size) over the steady-state runs, i.e. after the first one filled the pool.
+Exits with status 1 when a pooled adjustment allocates more than --max-kb
+(NumPy's casting buffers take a few tens of KB whatever the image size).
+With IMAGE_BACKEND=pil, brightness and saturation copy through PIL images,
+so only warmth and hue are checked.
+
+Usage:
+    python -m benchmarks.bench_buffers
+    python -m benchmarks.bench_buffers --resolution large --max-kb 128
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.core.buffers import BufferPool
+from app.services.color_service import ColorService
+from app.services.image_service import ImageService
+from benchmarks.synthetic import RESOLUTIONS, SKIN_TONES, make_portrait
+
+CASES = {
+    'warmth': {'warmth': 15},
+    'hue_shift': {'hue_shift': 2},
+    'warmth+hue_shift': {'warmth': 15, 'hue_shift': 2},
+    'all': {'brightness': 5, 'warmth': 15, 'saturation': 5, 'hue_shift': 2},
+}
+PIL_FREE = ('warmth', 'hue_shift', 'warmth+hue_shift')
+
+
+async def traced_peak(coroutine) -> Any:
+    """Await coroutine; returns its result and the peak bytes it allocated."""
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = await coroutine
+    peak = tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+    return result, peak
+
+
+async def measure(images: ImageService, colors: ColorService, image: np.ndarray, adjustments: Dict[str, Any],
+                  buffers: Optional[BufferPool], repeat: int) -> Dict[str, float]:
+    adjust_peaks, analysis_peaks = [], []
+    for _ in range(repeat):
+        out = buffers.take(image.shape) if buffers is not None else None
+        adjusted, peak = await traced_peak(images.adjust_skin_tone(image, adjustments, out=out, buffers=buffers))
+        adjust_peaks.append(peak)
+        _, peak = await traced_peak(colors.analyze_skin_tone(adjusted, buffers))
+        analysis_peaks.append(peak)
+        if buffers is not None:
+            buffers.give(adjusted)
+    # The first run fills the pool
+    steady = slice(1, None) if repeat > 1 else slice(None)
+    return {
+        'adjust_kb': max(adjust_peaks[steady]) / 1024,
+        'adjust_frames': max(adjust_peaks[steady]) / image.nbytes,
+        'analysis_frames': max(analysis_peaks[steady]) / image.nbytes,
+    }
+
+
+async def run(resolution: str, tone: str, repeat: int) -> Dict[str, Any]:
+    width, height = RESOLUTIONS[resolution]
+    image = make_portrait(width, height, SKIN_TONES[tone])
+    images, colors = ImageService(), ColorService()
+    colors.warm_up()
+    report = {'frame_bytes': image.nbytes, 'cases': {}}
+    for name, adjustments in CASES.items():
+        buffers = BufferPool()
+        report['cases'][name] = {
+            'unpooled': await measure(images, colors, image, adjustments, None, repeat),
+            'pooled': await measure(images, colors, image, adjustments, buffers, repeat),
+            'pool': buffers.stats(),
+        }
+        case = report['cases'][name]
+        print(f"{name:<18} adjust {case['unpooled']['adjust_frames']:>6.3f} -> {case['pooled']['adjust_frames']:>6.3f} frames | "
+              f"analysis {case['unpooled']['analysis_frames']:>6.3f} -> {case['pooled']['analysis_frames']:>6.3f} frames",
+              file=sys.stderr)
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolution', default='hd', choices=list(RESOLUTIONS))
+    parser.add_argument('--tone', default='medium', choices=list(SKIN_TONES))
+    parser.add_argument('--repeat', type=int, default=5, help='Adjustments per case (the first one fills the pool)')
+    parser.add_argument('--max-kb', type=float, default=256,
+                        help='Allowed steady-state allocation of a pooled adjustment, in KB')
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.resolution, args.tone, args.repeat))
+    checked = PIL_FREE if settings.image_backend == 'pil' else list(CASES)
+    failures = [name for name in checked if report['cases'][name]['pooled']['adjust_kb'] > args.max_kb]
+    report['failures'] = failures
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    if failures:
+        print(f"Pooled adjustments allocating more than {args.max_kb:g} KB: {', '.join(failures)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Parity and speed of the OpenCV enhancers (app.core.enhance) against PIL.
+
+Every operation runs on synthetic portraits and on uniform noise (which hits
+every value combination) at a range of factors, including extrapolation
+beyond 0-1 and negative factors. The outputs must equal PIL's bit for bit;
+the run exits with status 1 on any mismatch. PIL timings include the
+conversions to and from PIL images, as ImageService pays them.
+
+Usage:
+    python -m benchmarks.bench_enhance
+    python -m benchmarks.bench_enhance --resolutions large --repeat 3
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from PIL import Image
+
+from app.core import enhance
+from app.core.buffers import BufferPool
+from app.services.image_service import PIL_ENHANCERS
+from benchmarks.synthetic import RESOLUTIONS, SKIN_TONES, make_portrait
+
+FACTORS = (0.0, 0.5, 0.9, 0.95, 1.0, 1.05, 1.1, 1.25, 2.0, -0.3)
+
+
+def median_ms(func: Callable[[], Any], repeat: int) -> float:
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def compare(images: Dict[str, np.ndarray], repeat: int) -> Dict[str, Any]:
+    buffers = BufferPool()
+    report = {}
+    for name, native in enhance.ENHANCERS.items():
+        mismatched = 0
+        max_diff = 0
+        for image in images.values():
+            out = np.empty_like(image)
+            for factor in FACTORS:
+                expected = np.asarray(PIL_ENHANCERS[name](Image.fromarray(image)).enhance(factor))
+                actual = native(image, factor, out=out, buffers=buffers)
+                diff = np.abs(actual.astype(np.int16) - expected)
+                mismatched += int(np.count_nonzero(diff))
+                max_diff = max(max_diff, int(diff.max()))
+
+        timings = {}
+        for label, image in images.items():
+            out = np.empty_like(image)
+            pil_ms = median_ms(lambda: np.copyto(out, np.asarray(
+                PIL_ENHANCERS[name](Image.fromarray(image)).enhance(1.1))), repeat)
+            opencv_ms = median_ms(lambda: native(image, 1.1, out=out, buffers=buffers), repeat)
+            timings[label] = {'pil_ms': pil_ms, 'opencv_ms': opencv_ms}
+            print(f'{name:<11} {label:<16} pil {pil_ms:>7.2f} ms | opencv {opencv_ms:>7.2f} ms', file=sys.stderr)
+
+        report[name] = {'exact': mismatched == 0, 'mismatched_values': mismatched, 'max_abs_diff': max_diff,
+                        'timings': timings}
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', default='small,hd', help='Comma-separated: ' + ', '.join(RESOLUTIONS))
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs per operation and image')
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    images = {}
+    for resolution in args.resolutions.split(','):
+        width, height = RESOLUTIONS[resolution]
+        images[f'{resolution}/portrait'] = make_portrait(width, height, SKIN_TONES['medium'])
+        images[f'{resolution}/noise'] = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    report = compare(images, args.repeat)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    failures = [name for name, result in report.items() if not result['exact']]
+    if failures:
+        print(f"Not equal to PIL: {', '.join(failures)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
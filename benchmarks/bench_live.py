@@ -0,0 +1,100 @@
+"""Live camera mode driven by a scripted frame source instead of a camera.
+
+Frames are delivered at the browser's rate the way NiceGUI delivers
+websocket events (each one handled in its own task, never awaited by the
+sender), so frames arriving while one is analyzed are dropped. Reports
+frame outcomes, frame time and how often the palette was pushed, with
+warm starts (face box and cluster centers carried over) and without.
+
+Usage:
+    python -m benchmarks.bench_live
+    python -m benchmarks.bench_live --fps 10 --budget-ms 80 --script 4:light,4:deep
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.config import settings
+from app.services.color_service import ColorService
+from app.services.image_service import ImageService
+from app.services.live_service import LiveSession
+from app.services.worker_pool import WorkerPool
+from benchmarks.synthetic import ScriptedFrameSource
+
+MODES = ('warm', 'cold')
+
+
+async def play(source: ScriptedFrameSource, session: LiveSession, cold: bool) -> Dict[str, Any]:
+    frame_times: List[float] = []
+    pushes = 0
+
+    async def deliver(frame: bytes):
+        nonlocal pushes
+        if cold:
+            session.box = session.centers = None
+        result = await session.submit(frame)
+        if result is not None:
+            frame_times.append(result['elapsed_ms'])
+            pushes += result['recommendations'] is not None
+
+    tasks = []
+    start = time.perf_counter()
+    for index, frame in enumerate(source):
+        await asyncio.sleep(max(0.0, start + index / source.fps - time.perf_counter()))
+        tasks.append(asyncio.ensure_future(deliver(frame)))
+    await asyncio.gather(*tasks)
+    frame_times.sort()
+    return {
+        'frames': len(source),
+        'outcomes': dict(session.counts),
+        'palette_pushes': pushes,
+        'p50_ms': statistics.median(frame_times) if frame_times else 0.0,
+        'p95_ms': frame_times[min(len(frame_times) - 1, int(0.95 * len(frame_times)))] if frame_times else 0.0,
+    }
+
+
+def parse_script(text: str) -> List[Tuple[float, str]]:
+    return [(float(seconds), tone) for seconds, tone in (part.split(':') for part in text.split(','))]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    source = ScriptedFrameSource(parse_script(args.script), fps=args.fps, width=settings.live_frame_width)
+    images, colors = ImageService(), ColorService()
+    colors.warm_up()
+    images.warm_up()
+    pool = WorkerPool()
+    report = {}
+    for mode in MODES:
+        session = LiveSession(images, colors, pool, budget_ms=args.budget_ms)
+        report[mode] = await play(source, session, cold=mode == 'cold')
+        print(f"{mode:<5} {report[mode]['outcomes']} p50 {report[mode]['p50_ms']:.1f} ms, "
+              f"p95 {report[mode]['p95_ms']:.1f} ms", file=sys.stderr)
+    pool.shutdown()
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fps', type=float, default=settings.live_fps, help='Frames delivered per second')
+    parser.add_argument('--budget-ms', type=float, default=settings.live_frame_budget_ms, help='Per-frame budget')
+    parser.add_argument('--script', default='4:light,4:medium,4:deep', help='Comma-separated seconds:tone segments')
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
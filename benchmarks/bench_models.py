@@ -0,0 +1,144 @@
+"""Compare result dicts with the typed models in app.models.
+
+Reports per-result memory and serialize/deserialize time for:
+  dict + pickle, dict + json, model + to_bytes, model + to_json
+
+Timings cycle through results of the same skin tone that differ in their
+(randomly varied) color confidences, as real results do. The recommendation
+catalog decoded from the binary encoding is reused across them, as in a
+running server ('model + bytes'); 'model + bytes (cold)' clears it before
+every decode (only the first result of each skin tone decodes like that in a
+server). The binary encoding trades time for size: it must stay smaller than
+pickle, while encoding may take --max-encode-ratio, decoding
+--max-decode-ratio and cold decoding --max-cold-decode-ratio times as long
+as pickle. Exits with status 1 otherwise.
+
+Usage:
+    python -m benchmarks.bench_models [--iterations 2000] [--max-cold-decode-ratio 3.0]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import pickle
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.models import analysis as models
+from app.models.analysis import AnalysisResult
+from app.services.color_service import ColorService
+
+
+def sample_results(count: int = 1) -> List[Dict[str, Any]]:
+    """Produce realistic analysis + recommendations pairs of one skin tone (recommended afresh each time)."""
+    rng = np.random.default_rng(0)
+    image = np.clip(rng.normal((200, 150, 120), 8, (120, 90, 3)), 0, 255).astype(np.uint8)
+    service = ColorService()
+
+    async def run():
+        analysis = await service.analyze_skin_tone(image)
+        return [{'analysis': analysis, 'recommendations': await service.get_color_recommendations(analysis)}
+                for _ in range(count)]
+
+    return asyncio.run(run())
+
+
+def sample_result() -> Dict[str, Any]:
+    """Produce a realistic analysis + recommendations pair."""
+    return sample_results()[0]
+
+
+def cycle(func: Callable[[Any], Any], values: List[Any]) -> Callable[[], Any]:
+    """A no-argument call applying func to the next of values each time."""
+    values = itertools.cycle(values)
+    return lambda: func(next(values))
+
+
+def retained_bytes(factory: Callable[[], Any], count: int = 200) -> float:
+    """Average bytes retained per object built by factory."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del objects
+    return total / count
+
+
+def time_us(func: Callable[[], Any], iterations: int) -> float:
+    return min(timeit.repeat(func, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def cold_decode(encoded: bytes) -> AnalysisResult:
+    models._catalogs.clear()
+    return AnalysisResult.from_bytes(encoded)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--results', type=int, default=50, help='Distinct results the timings cycle through')
+    parser.add_argument('--max-encode-ratio', type=float, default=2.0,
+                        help='Allowed to_bytes time as a multiple of pickle.dumps')
+    parser.add_argument('--max-decode-ratio', type=float, default=1.5,
+                        help='Allowed from_bytes time (catalog decoded before) as a multiple of pickle.loads')
+    parser.add_argument('--max-cold-decode-ratio', type=float, default=3.0,
+                        help='Allowed cold from_bytes time as a multiple of pickle.loads')
+    args = parser.parse_args()
+
+    dicts = sample_results(args.results)
+    model_list = [AnalysisResult.from_dicts(result['analysis'], result['recommendations']) for result in dicts]
+
+    pickled = [pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL) for result in dicts]
+    dict_json = [json.dumps(result) for result in dicts]
+    model_bytes = [item.to_bytes() for item in model_list]
+    model_json = [item.to_json() for item in model_list]
+
+    rows = [
+        ('dict + pickle', len(pickled[0]),
+         cycle(lambda result: pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), dicts), cycle(pickle.loads, pickled)),
+        ('dict + json', len(dict_json[0]), cycle(json.dumps, dicts), cycle(json.loads, dict_json)),
+        ('model + bytes', len(model_bytes[0]), cycle(AnalysisResult.to_bytes, model_list),
+         cycle(AnalysisResult.from_bytes, model_bytes)),
+        ('model + bytes (cold)', len(model_bytes[0]), cycle(AnalysisResult.to_bytes, model_list),
+         cycle(cold_decode, model_bytes)),
+        ('model + json', len(model_json[0]), cycle(AnalysisResult.to_json, model_list),
+         cycle(AnalysisResult.from_json, model_json)),
+    ]
+
+    # Both sides are rebuilt from their encodings so neither shares strings with `dicts`;
+    # the models share their decoded catalog, as results of one skin tone do in a server
+    print(f"In-memory size per result: dict {retained_bytes(cycle(pickle.loads, pickled)):,.0f} B, "
+          f"model {retained_bytes(cycle(AnalysisResult.from_bytes, model_bytes)):,.0f} B")
+    print(f"{'encoding':<22}{'payload (B)':>12}{'serialize (us)':>16}{'deserialize (us)':>18}")
+    timings = {}
+    for name, size, dump, load in rows:
+        timings[name] = size, time_us(dump, args.iterations), time_us(load, args.iterations)
+        print(f"{name:<22}{size:>12,}{timings[name][1]:>16.1f}{timings[name][2]:>18.1f}")
+
+    pickle_size, pickle_dump, pickle_load = timings['dict + pickle']
+    size, dump, load = timings['model + bytes']
+    cold_load = timings['model + bytes (cold)'][2]
+    failures = []
+    if size >= pickle_size:
+        failures.append(f'to_bytes payload {size:,} B is not smaller than pickle ({pickle_size:,} B)')
+    for name, elapsed, allowed in (('from_bytes', load, args.max_decode_ratio),
+                                   ('cold from_bytes', cold_load, args.max_cold_decode_ratio)):
+        if elapsed > allowed * pickle_load:
+            failures.append(f'{name} takes {elapsed / pickle_load:.1f}x as long as pickle.loads (allowed {allowed:.1f}x)')
+    if dump > args.max_encode_ratio * pickle_dump:
+        failures.append(f'to_bytes takes {dump / pickle_dump:.1f}x as long as pickle.dumps '
+                        f'(allowed {args.max_encode_ratio:.1f}x)')
+    if failures:
+        print('; '.join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
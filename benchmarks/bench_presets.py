@@ -0,0 +1,111 @@
+"""Preset comparison wall time against a single preset, and agreement with separate analyses.
+
+Every preset of the adjuster is applied to the preview-resolution render of
+synthetic portraits and analyzed, once as the compare mode does it (one
+worker pool job, KMeans warm-started from the unadjusted image's clusters,
+see AnalysisService.analyze_presets) and once preset by preset. Exits with
+status 1 when comparing all presets takes more than --max-ratio times as
+long as analyzing one, or when a warm-started dominant color is further than
+--max-color-distance RGB units from the separate analysis. Run it under
+`taskset -c 0` to see a 1-vCPU machine, where the worker pool has a single
+thread.
+
+Usage:
+    python -m benchmarks.bench_presets
+    taskset -c 0 python -m benchmarks.bench_presets --resolutions hd --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import numpy as np
+
+from app.components.skin_tone_adjuster import PRESETS
+from app.core.buffers import BufferPool
+from app.services.analysis_service import AnalysisService
+from app.services.color_service import ColorService
+from app.services.image_service import ImageService
+from app.services.worker_pool import WorkerPool
+from benchmarks.synthetic import RESOLUTIONS, SKIN_TONES, make_portrait
+
+
+async def median_ms(func: Callable[[], Awaitable[Any]], repeat: int) -> float:
+    await func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def color_distance(first: Dict[str, Any], second: Dict[str, Any]) -> float:
+    return float(np.linalg.norm(np.subtract(first['rgb_values'], second['rgb_values'], dtype=np.float64)))
+
+
+async def run(resolutions: List[str], tones: List[str], repeat: int) -> Dict[str, Any]:
+    images, colors = ImageService(), ColorService()
+    colors.warm_up()
+    pool = WorkerPool()
+    service = AnalysisService(images, colors, pool, cache_size=0)
+    adjustments = [preset['adjustments'] for preset in PRESETS]
+    report = {'workers': pool.max_workers, 'cases': {}}
+    for resolution in resolutions:
+        for tone in tones:
+            preview = await images.create_preview(make_portrait(*RESOLUTIONS[resolution], SKIN_TONES[tone]))
+            buffers = BufferPool()
+            batched = [analysis for _, analysis, _ in await service.analyze_presets(preview, adjustments)]
+            separate = [(await service.analyze_adjusted(preview, preset))[1] for preset in adjustments]
+            case = {
+                'one_preset_ms': await median_ms(lambda: service.analyze_adjusted(preview, adjustments[0], buffers), repeat),
+                'all_presets_ms': await median_ms(lambda: service.analyze_presets(preview, adjustments, buffers), repeat),
+                'max_color_distance': max(map(color_distance, batched, separate)),
+                'category_differences': sum(a['category'] != b['category'] for a, b in zip(batched, separate)),
+            }
+            case['ratio'] = case['all_presets_ms'] / case['one_preset_ms']
+            name = f'{resolution}/{tone}'
+            report['cases'][name] = case
+            print(f"{name:<13} one {case['one_preset_ms']:>6.1f} ms, all {len(PRESETS)} "
+                  f"{case['all_presets_ms']:>6.1f} ms ({case['ratio']:.1f}x), colors within "
+                  f"{case['max_color_distance']:.1f}, {case['category_differences']} category differences",
+                  file=sys.stderr)
+    pool.shutdown()
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', default='hd,large', help='Comma-separated keys of RESOLUTIONS')
+    parser.add_argument('--tones', default=','.join(SKIN_TONES), help='Comma-separated keys of SKIN_TONES')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-ratio', type=float, default=3.0,
+                        help='Allowed time of comparing all presets as a multiple of one preset')
+    parser.add_argument('--max-color-distance', type=float, default=15.0,
+                        help='Allowed distance of a warm-started dominant color from a separate analysis')
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.resolutions.split(','), args.tones.split(','), args.repeat))
+    failures = [name for name, case in report['cases'].items()
+                if case['ratio'] > args.max_ratio or case['max_color_distance'] > args.max_color_distance]
+    report['failures'] = failures
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    if failures:
+        print(f"Preset comparisons over {args.max_ratio:g}x one preset or {args.max_color_distance:g} RGB units "
+              f"from separate analyses: {', '.join(failures)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Websocket traffic of the result and adjuster components, per update.
+
+The analysis, recommendation and adjuster components are mounted on a
+headless NiceGUI client whose outbox is metered by SessionTraffic (the same
+accounting the app exports as color_harmony_websocket_* metrics). After each
+update the pending element changes are sent as the outbox loop would (to an
+empty room) and the traffic is reported per component: elements sent,
+elements deleted and payload bytes. Scenarios: the first render, the same data
+again, a confidence-only change (what a small adjustment usually produces), a
+change of skin tone category, a slider move and a new image in the adjuster.
+Exits with status 1 when re-rendering unchanged data sends anything, a
+slider move sends more than one element, or the metering is off: updates
+attributed to the wrong component, or metered bytes differing from the
+serialized messages by more than 1%.
+
+Usage:
+    python -m benchmarks.bench_render
+    python -m benchmarks.bench_render --repeat 20
+"""
+import argparse
+import asyncio
+import copy
+import json
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+from nicegui import Client
+from nicegui import json as nicegui_json
+from nicegui.page import page
+
+from app.components.color_recommendations import ColorRecommendationsComponent
+from app.components.skin_tone_adjuster import SkinToneAdjusterComponent
+from app.components.skin_tone_analysis import SkinToneAnalysisComponent
+from app.core.traffic import SessionTraffic
+from app.services.color_service import ColorService
+from benchmarks.synthetic import RESOLUTIONS, SKIN_TONES, make_portrait
+
+State = Tuple[Dict[str, Any], Dict[str, Any], np.ndarray]
+
+# Components each scenario's update must be metered for
+EXPECTED_COMPONENTS = {
+    'first_render': {'analysis', 'recommendations'},
+    'confidence_only': {'analysis'},
+    'category_change': {'analysis', 'recommendations'},
+    'adjuster_first_image': {'adjuster'},
+    'slider_move': {'adjuster'},
+}
+
+
+class Page:
+    """The three components on a metered headless client."""
+
+    def __init__(self):
+        self.client = Client(page('/'), request=None)
+        self.traffic = SessionTraffic(self.client)
+        with self.client:
+            self.analysis = SkinToneAnalysisComponent()
+            self.recommendations = ColorRecommendationsComponent()
+            self.adjuster = SkinToneAdjusterComponent(on_adjust=lambda adjustments: None)
+        self.traffic.tag(self.analysis.container, 'analysis')
+        self.traffic.tag(self.recommendations.container, 'recommendations')
+        self.traffic.tag(self.adjuster.container, 'adjuster')
+        # Size of the messages as serialized for the socket, to check the metering against
+        self.wire_bytes = 0
+        # The initial elements are part of the page HTML, not of the websocket traffic
+        self.client.outbox.updates.clear()
+
+    async def flush(self):
+        """Send the pending element changes the way the outbox loop does."""
+        updates = self.client.outbox.updates
+        if updates:
+            data = {id: None if element is None else element._to_dict() for id, element in updates.items()}
+            updates.clear()
+            self.wire_bytes += len(nicegui_json.dumps(data).encode())
+            await self.client.outbox._emit('update', data, self.client.id)
+
+    async def render(self, state: State):
+        analysis, recommendations, image = state
+        with self.client:
+            await self.analysis.update_analysis(analysis, image)
+            await self.recommendations.update_recommendations(recommendations)
+        await self.flush()
+
+    async def show_image(self, image: np.ndarray):
+        with self.client:
+            await self.adjuster.update_image(image)
+        await self.flush()
+
+    async def move_slider(self, name: str, value: int):
+        """Deliver a slider event as the browser sends it."""
+        slider = self.adjuster.sliders[name]
+        listener_id = next(listener.id for listener in slider._event_listeners.values()
+                           if listener.type == 'update:modelValue')
+        self.client.handle_event({'id': slider.id, 'listener_id': listener_id, 'args': [json.dumps(value)]})
+        await self.flush()
+
+    async def measure(self, action: Callable[[], Awaitable[None]]) -> Dict[str, Dict[str, float]]:
+        before = self.traffic.totals()
+        start = time.perf_counter()
+        await action()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        after = self.traffic.totals()
+
+        def delta(kind: str, key: str) -> int:
+            return after[kind].get(key, 0) - before[kind].get(key, 0)
+
+        components = {key.split('.')[0] for key in after['elements']} | set(after['bytes'])
+        result = {component: {'sent': delta('elements', f'{component}.update'),
+                              'deleted': delta('elements', f'{component}.delete'),
+                              'bytes': delta('bytes', component)}
+                  for component in sorted(components)}
+        return {'ms': elapsed_ms, **{component: counts for component, counts in result.items() if any(counts.values())}}
+
+    def close(self):
+        self.client.delete()
+
+
+async def run(resolution: str, repeat: int) -> Dict[str, Any]:
+    width, height = RESOLUTIONS[resolution]
+    colors = ColorService()
+    states: Dict[str, State] = {}
+    for tone in ('medium', 'deep'):
+        image = make_portrait(width, height, SKIN_TONES[tone])
+        analysis = await colors.analyze_skin_tone(image)
+        states[tone] = (analysis, await colors.get_color_recommendations(analysis), image)
+    adjusted = copy.deepcopy(states['medium'][0])
+    adjusted['confidence'] = max(0.0, adjusted.get('confidence', 0.8) - 0.07)
+    medium_image, deep_image = states['medium'][2], states['deep'][2]
+
+    # name: (setup, measured step), both run on a fresh page
+    scenarios = {
+        'first_render': (None, lambda p: p.render(states['medium'])),
+        'same_data': (lambda p: p.render(states['medium']), lambda p: p.render(states['medium'])),
+        'confidence_only': (lambda p: p.render(states['medium']),
+                            lambda p: p.render((adjusted, states['medium'][1], medium_image))),
+        'category_change': (lambda p: p.render(states['medium']), lambda p: p.render(states['deep'])),
+        'adjuster_first_image': (None, lambda p: p.show_image(medium_image)),
+        'slider_move': (lambda p: p.show_image(medium_image), lambda p: p.move_slider('warmth', 7)),
+        'adjuster_new_image': (lambda p: p.show_image(medium_image), lambda p: p.show_image(deep_image)),
+    }
+
+    report = {'scenarios': {}, 'metered_bytes': 0, 'wire_bytes': 0}
+    for name, (setup, step) in scenarios.items():
+        runs = []
+        for _ in range(repeat if setup is not None else 1):
+            view = Page()
+            if setup is not None:
+                await setup(view)
+            runs.append(await view.measure(lambda: step(view)))
+            report['metered_bytes'] += sum(view.traffic.bytes.values())
+            report['wire_bytes'] += view.wire_bytes
+            view.close()
+        result = report['scenarios'][name] = {**runs[-1], 'ms': statistics.median(run['ms'] for run in runs)}
+        traffic = ' | '.join(f"{component} {counts['sent']}/{counts['deleted']} {counts['bytes'] / 1024:.1f} KB"
+                             for component, counts in result.items() if component != 'ms') or 'nothing sent'
+        print(f"{name:<22} {result['ms']:>6.2f} ms | {traffic}", file=sys.stderr)
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolution', default='small', choices=list(RESOLUTIONS))
+    parser.add_argument('--repeat', type=int, default=5, help='Timed updates per scenario')
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.resolution, args.repeat))
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    scenarios = report['scenarios']
+    failures = []
+    if set(scenarios['same_data']) != {'ms'}:
+        failures.append('re-rendering unchanged data sent updates')
+    slider = scenarios['slider_move']
+    if sum(counts['sent'] + counts['deleted'] for component, counts in slider.items() if component != 'ms') > 1:
+        failures.append('a slider move sent more than one element')
+    # Each update must be counted for (only) the component it changed
+    for name, components in EXPECTED_COMPONENTS.items():
+        if set(scenarios[name]) - {'ms'} != components:
+            failures.append(f"{name} metered for {sorted(set(scenarios[name]) - {'ms'})}, expected {sorted(components)}")
+    if abs(report['metered_bytes'] - report['wire_bytes']) > 0.01 * report['wire_bytes']:
+        failures.append(f"metered {report['metered_bytes']} bytes for {report['wire_bytes']} bytes of messages")
+    if failures:
+        print('; '.join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
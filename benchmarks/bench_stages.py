@@ -0,0 +1,184 @@
+"""Per-stage micro-benchmarks for the imaging and analysis pipeline.
+
+Every stage is timed separately on deterministic synthetic portraits (see
+benchmarks/synthetic.py) at several resolutions and skin tones. Results are
+written as JSON and compared against a stored baseline; the run exits with
+status 1 when any stage regresses by more than --max-regression.
+
+Usage:
+    python -m benchmarks.bench_stages                      # run + compare with baseline
+    python -m benchmarks.bench_stages --save-baseline      # record a new baseline
+    python -m benchmarks.bench_stages --resolutions small --tones medium --repeat 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from app.components.skin_tone_analysis import SkinToneAnalysisComponent
+from app.services.color_service import ColorService
+from app.services.image_service import ImageService
+from benchmarks.synthetic import RESOLUTIONS, SKIN_TONES, make_portrait
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+STAGES = (
+    'load_image', 'resize_image', '_extract_skin_pixels', '_get_dominant_color', '_calculate_confidence',
+    'get_color_recommendations', 'adjust_skin_tone', 'create_thumbnail', '_numpy_to_base64',
+)
+
+SAMPLE_ADJUSTMENTS = {'brightness': 5, 'warmth': 15, 'saturation': 5, 'hue_shift': 2}
+
+
+def measure(func: Callable[[], Any], loop: asyncio.AbstractEventLoop, repeat: int, warmup: int) -> Dict[str, float]:
+    """Time func (sync or coroutine function) and summarize in milliseconds."""
+    def call():
+        result = func()
+        if asyncio.iscoroutine(result):
+            result = loop.run_until_complete(result)
+        return result
+
+    for _ in range(warmup):
+        call()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        'median_ms': statistics.median(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        'min_ms': samples[0],
+        'repeat': repeat,
+    }
+
+
+def stage_cases(raw: np.ndarray, path: str, loop: asyncio.AbstractEventLoop) -> Dict[str, Callable[[], Any]]:
+    """Build one callable per stage, with inputs prepared exactly as the pipeline would."""
+    images = ImageService()
+    colors = ColorService()
+    display = object.__new__(SkinToneAnalysisComponent)  # _numpy_to_base64 needs no UI context
+
+    image = loop.run_until_complete(images.load_image(path))
+    skin_pixels = loop.run_until_complete(colors._extract_skin_pixels(image))
+    dominant = loop.run_until_complete(colors._get_dominant_color(skin_pixels))
+    analysis = loop.run_until_complete(colors.analyze_skin_tone(image))
+
+    return {
+        'load_image': lambda: images.load_image(path),
+        'resize_image': lambda: images.resize_image(raw),
+        '_extract_skin_pixels': lambda: colors._extract_skin_pixels(image),
+        '_get_dominant_color': lambda: colors._get_dominant_color(skin_pixels),
+        '_calculate_confidence': lambda: colors._calculate_confidence(skin_pixels, dominant),
+        'get_color_recommendations': lambda: colors.get_color_recommendations(analysis),
+        'adjust_skin_tone': lambda: images.adjust_skin_tone(image, SAMPLE_ADJUSTMENTS),
+        'create_thumbnail': lambda: images.create_thumbnail(image),
+        '_numpy_to_base64': lambda: display._numpy_to_base64(image),
+    }
+
+
+def run_suite(resolutions: List[str], tones: List[str], stages: List[str], repeat: int, warmup: int) -> Dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for resolution in resolutions:
+            width, height = RESOLUTIONS[resolution]
+            for tone in tones:
+                raw = make_portrait(width, height, SKIN_TONES[tone])
+                path = os.path.join(tmp, f'{resolution}_{tone}.jpg')
+                cv2.imwrite(path, cv2.cvtColor(raw, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+                cases = stage_cases(raw, path, loop)
+                for stage in stages:
+                    key = f'{stage}[{resolution}/{tone}]'
+                    results[key] = measure(cases[stage], loop, repeat, warmup)
+                    print(f'{key:<52}{results[key]["median_ms"]:>10.2f} ms', file=sys.stderr)
+
+    loop.close()
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float, min_delta_ms: float) -> List[Dict[str, Any]]:
+    """Return the stages whose median got slower than the allowed margin."""
+    regressions = []
+    for key, result in current['results'].items():
+        reference = baseline.get('results', {}).get(key)
+        if reference is None:
+            continue
+        before, after = reference['median_ms'], result['median_ms']
+        if after > before * (1 + max_regression) and after - before > min_delta_ms:
+            regressions.append({'stage': key, 'baseline_ms': before, 'current_ms': after, 'ratio': after / before})
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', default=','.join(RESOLUTIONS), help='Comma-separated: ' + ', '.join(RESOLUTIONS))
+    parser.add_argument('--tones', default=','.join(SKIN_TONES), help='Comma-separated: ' + ', '.join(SKIN_TONES))
+    parser.add_argument('--stages', default=','.join(STAGES), help='Comma-separated subset of stages')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output', '-o', help='Write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='Allowed slowdown ratio (0.25 = +25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.2, help='Ignore slowdowns smaller than this')
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.resolutions.split(','), args.tones.split(','), args.stages.split(','),
+                        args.repeat, args.warmup)
+
+    payload = json.dumps(current, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+        print(f'Baseline saved to {args.baseline}', file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --save-baseline to create one', file=sys.stderr)
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = compare(current, baseline, args.max_regression, args.min_delta_ms)
+    for regression in regressions:
+        print(f"REGRESSION {regression['stage']}: {regression['baseline_ms']:.2f} ms -> "
+              f"{regression['current_ms']:.2f} ms (x{regression['ratio']:.2f})", file=sys.stderr)
+    if not regressions:
+        print('No regressions against baseline', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Cold-start report: import time, time-to-first-byte and time-to-first-analysis.
+
+Import time is measured in fresh interpreters with ``python -X importtime``
+(median over --repeat runs) and broken down by top-level package. With
+--serve, the app is also started from scratch and the time from spawning
+the process to the first HTTP response and to the first completed analysis
+is recorded, together with the milestones the server reports on /metrics.
+
+Usage:
+    python -m benchmarks.bench_startup                         # import-time report
+    python -m benchmarks.bench_startup --budget-ms 1200        # exit 1 when over budget
+    python -m benchmarks.bench_startup --serve --port 8765     # also TTFB / first analysis
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import cv2
+import httpx
+
+from benchmarks.synthetic import SKIN_TONES, make_portrait
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)$')
+
+
+def measure_imports(module: str) -> Dict[str, Any]:
+    """Import `module` in a fresh interpreter; return wall time and per-package self times."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{result.stderr[-2000:]}')
+
+    # Self times never double count, so summing them per root package gives an exact breakdown
+    packages: Dict[str, float] = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            packages[match.group(2).split('.')[0]] += int(match.group(1)) / 1000
+    return {'wall_ms': wall_ms, 'import_ms': sum(packages.values()), 'packages': dict(packages)}
+
+
+def import_report(module: str, repeat: int) -> Dict[str, Any]:
+    runs = [measure_imports(module) for _ in range(repeat)]
+    packages = defaultdict(list)
+    for run in runs:
+        for name, ms in run['packages'].items():
+            packages[name].append(ms)
+    return {
+        'module': module,
+        'repeat': repeat,
+        'import_ms': statistics.median(run['import_ms'] for run in runs),
+        'wall_ms': statistics.median(run['wall_ms'] for run in runs),
+        'packages': dict(sorted(((name, statistics.median(values)) for name, values in packages.items()),
+                                key=lambda item: -item[1])),
+    }
+
+
+def serve_report(port: int, timeout: float) -> Dict[str, Any]:
+    """Spawn main.py and time the first byte and the first analysis from process start."""
+    url = f'http://127.0.0.1:{port}'
+    portrait = make_portrait(720, 960, SKIN_TONES['medium'])
+    ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(portrait, cv2.COLOR_RGB2BGR))
+
+    spawned = time.perf_counter()
+    server = subprocess.Popen([sys.executable, 'main.py'], env=dict(os.environ, PORT=str(port), HOST='127.0.0.1'),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=timeout) as http:
+            while True:
+                try:
+                    http.get(url + '/health')
+                    break
+                except httpx.TransportError:
+                    if time.perf_counter() - spawned > timeout:
+                        raise TimeoutError('server did not start')
+                    time.sleep(0.02)
+            first_byte = time.perf_counter() - spawned
+
+            response = http.post(url + '/api/analyze', files={'file': ('portrait.jpg', encoded.tobytes(), 'image/jpeg')})
+            response.raise_for_status()
+            first_analysis = time.perf_counter() - spawned
+
+            # Let the background warm-up finish, then read the server-side milestones
+            time.sleep(2.0)
+            server_milestones = {}
+            for line in http.get(url + '/metrics').text.splitlines():
+                match = re.match(r'color_harmony_startup_seconds\{phase="([^"]+)"\} (\S+)', line)
+                if match:
+                    server_milestones[match.group(1)] = float(match.group(2))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {
+        'time_to_first_byte_s': first_byte,
+        'time_to_first_analysis_s': first_analysis,
+        'server_milestones_s': server_milestones,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app.main', help='Module whose import is measured')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per measurement')
+    parser.add_argument('--top', type=int, default=10, help='Packages listed in the summary')
+    parser.add_argument('--budget-ms', type=float, help='Fail when the median import time exceeds this')
+    parser.add_argument('--serve', action='store_true', help='Also measure time-to-first-byte and first analysis')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    report = {'imports': import_report(args.module, args.repeat)}
+    imports = report['imports']
+    print(f"import {args.module}: {imports['import_ms']:.0f} ms (process wall {imports['wall_ms']:.0f} ms, "
+          f"median of {args.repeat})", file=sys.stderr)
+    for name, ms in list(imports['packages'].items())[:args.top]:
+        print(f'  {name:<28}{ms:>8.0f} ms', file=sys.stderr)
+
+    if args.serve:
+        report['serve'] = serve_report(args.port, args.timeout)
+        serve = report['serve']
+        print(f"time to first byte:     {serve['time_to_first_byte_s']:.2f} s", file=sys.stderr)
+        print(f"time to first analysis: {serve['time_to_first_analysis_s']:.2f} s", file=sys.stderr)
+        for phase, seconds in serve['server_milestones_s'].items():
+            print(f'  server {phase:<20}{seconds:.2f} s', file=sys.stderr)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+    if args.budget_ms is not None and imports['import_ms'] > args.budget_ms:
+        print(f"Import time {imports['import_ms']:.0f} ms exceeds budget {args.budget_ms:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Throughput with and without thread-count governance.
+
+Each mode runs in a fresh interpreter, since OpenMP and BLAS size their
+thread pools when they load:
+
+- ungoverned: every library picks its own thread count from the host and
+  the worker pool is sized without regard to it (the old behaviour),
+- governed:   app.core.concurrency sizes the worker pool and caps OpenCV,
+  OpenMP and BLAS so that workers x native threads matches the usable CPUs.
+
+A burst of adjust-and-analyze jobs (what a slider release does) is pushed
+through the worker pool at once; throughput and per-job latency are reported.
+
+Usage:
+    python -m benchmarks.bench_threads
+    python -m benchmarks.bench_threads --cpus 2 --jobs 32 --resolution hd
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+MODES = ('ungoverned', 'governed')
+
+
+def run_child(mode: str, jobs: int, resolution: str, cpus: int) -> Dict[str, Any]:
+    """Run the burst in this process; heavy imports happen only after the thread setup."""
+    if cpus:
+        os.sched_setaffinity(0, set(sorted(os.sched_getaffinity(0))[:cpus]))
+
+    if mode == 'governed':
+        from app.core.concurrency import concurrency
+        concurrency.configure()
+        workers, native = concurrency.worker_threads, concurrency.native_threads
+    else:
+        from app.core.concurrency import NATIVE_THREAD_ENV
+        for name in NATIVE_THREAD_ENV:
+            os.environ.pop(name, None)
+        workers, native = max(4, 2 * (os.cpu_count() or 1)), None
+
+    import asyncio
+    import cv2
+    from app.services.analysis_service import AnalysisService
+    from app.services.color_service import ColorService
+    from app.services.image_service import ImageService
+    from app.services.worker_pool import WorkerPool
+    from benchmarks.synthetic import RESOLUTIONS, SKIN_TONES, make_portrait
+
+    width, height = RESOLUTIONS[resolution]
+    image = make_portrait(width, height, SKIN_TONES['medium'])
+    colors = ColorService()
+    colors.warm_up()
+    service = AnalysisService(ImageService(), colors, WorkerPool(max_workers=workers), cache_size=0)
+
+    async def job(index: int) -> float:
+        start = time.perf_counter()
+        await service.analyze_adjusted(image, {'brightness': index % 10, 'warmth': 5, 'saturation': 0, 'hue_shift': 0})
+        return time.perf_counter() - start
+
+    async def burst() -> List[float]:
+        await job(0)  # warm-up: thread-local caches and library initialization
+        return await asyncio.gather(*(job(i) for i in range(jobs)))
+
+    start = time.perf_counter()
+    latencies = sorted(asyncio.run(burst()))
+    elapsed = time.perf_counter() - start
+    return {
+        'mode': mode,
+        'cpus_visible': os.cpu_count(),
+        'cpus_usable': len(os.sched_getaffinity(0)),
+        'worker_threads': workers,
+        'native_threads': native if native is not None else cv2.getNumThreads(),
+        'jobs': jobs,
+        'elapsed_s': elapsed,
+        'throughput_per_s': jobs / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))] * 1000,
+    }
+
+
+def run_mode(mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    command = [sys.executable, '-m', 'benchmarks.bench_threads', '--child', mode, '--jobs', str(args.jobs),
+               '--resolution', args.resolution, '--cpus', str(args.cpus)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'{mode} run failed:\n{result.stderr[-2000:]}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=24, help='Concurrent adjust-and-analyze jobs per mode')
+    parser.add_argument('--resolution', default='hd', help='Synthetic portrait size (small, hd, large)')
+    parser.add_argument('--cpus', type=int, default=0, help='Pin each run to this many cores (0 = all usable)')
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.jobs, args.resolution, args.cpus)))
+        return 0
+
+    report = {mode: run_mode(mode, args) for mode in MODES}
+    for mode, result in report.items():
+        print(f"{mode:<11} {result['worker_threads']:>2} workers x {result['native_threads']:>2} native threads: "
+              f"{result['throughput_per_s']:.2f} jobs/s, p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms",
+              file=sys.stderr)
+    report['speedup'] = report['governed']['throughput_per_s'] / report['ungoverned']['throughput_per_s']
+    print(f"governed throughput x{report['speedup']:.2f}", file=sys.stderr)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Whole-image vs tiled skin tone analysis: peak memory, time and agreement.
+
+Both analyses run on the same synthetic portraits; peak allocations are
+measured with tracemalloc (the decoded image itself is excluded, it exists
+before either analysis starts). The tiled analysis is an approximation (see
+ColorService.analyze_skin_tone_tiled): exits with status 1 when it counts
+different skin pixels, gets another undertone or variance, or its dominant
+color or confidence leaves the documented tolerance.
+
+JPEG portraits are also sent end to end through AnalysisService, as an API
+upload (analyze_bytes) and as a UI upload (analyze_file): a print-resolution
+one (--print-size, over TILED_ANALYSIS_MEGAPIXELS) must take the tiled path
+and a phone-sized one (--phone-size) must not; the UI must get both images
+at display size.
+
+Usage:
+    python -m benchmarks.bench_tiled
+    python -m benchmarks.bench_tiled --resolutions large --tile-megapixels 0.25
+    python -m benchmarks.bench_tiled --resolutions small --print-size 7000x9000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.services.analysis_service import AnalysisService
+from app.services.color_service import ColorService
+from app.services.image_service import ImageService
+from app.services.worker_pool import WorkerPool
+from benchmarks.synthetic import RESOLUTIONS, SKIN_TONES, make_portrait
+
+# Documented agreement of the tiled analysis with the whole-image one
+MAX_COLOR_DISTANCE = 20.0
+MAX_CONFIDENCE_DELTA = 0.07
+
+
+async def measure(analyze, image: np.ndarray) -> Dict[str, Any]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await analyze(image)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'result': result, 'elapsed_s': elapsed, 'peak_mb': peak / 1024 / 1024}
+
+
+async def run(resolutions: List[str], tones: List[str]) -> Dict[str, Any]:
+    colors = ColorService()
+    colors.warm_up()
+    report = {}
+    for resolution in resolutions:
+        width, height = RESOLUTIONS[resolution]
+        for tone in tones:
+            image = make_portrait(width, height, SKIN_TONES[tone])
+            whole = await measure(colors.analyze_skin_tone, image)
+            tiled = await measure(colors.analyze_skin_tone_tiled, image)
+            a, b = whole['result'], tiled['result']
+            key = f'{resolution}/{tone}'
+            report[key] = {
+                'whole': {'peak_mb': whole['peak_mb'], 'elapsed_s': whole['elapsed_s']},
+                'tiled': {'peak_mb': tiled['peak_mb'], 'elapsed_s': tiled['elapsed_s'],
+                          'strips': b['analysis_metadata']['tiled']['strips']},
+                'same_category': a['category'] == b['category'],
+                'same_undertone': a['undertone'] == b['undertone'],
+                'pixels_analyzed_equal': a['analysis_metadata']['pixels_analyzed'] == b['analysis_metadata']['pixels_analyzed'],
+                'same_variance': bool(np.allclose(a['analysis_metadata']['color_variance'],
+                                                  b['analysis_metadata']['color_variance'])),
+                'dominant_color_distance': float(np.linalg.norm(np.subtract(a['rgb_values'], b['rgb_values']))),
+                'confidence_delta': b['confidence'] - a['confidence'],
+            }
+            print(f"{key:<14} whole {whole['peak_mb']:>7.1f} MB {whole['elapsed_s']:>6.2f} s | "
+                  f"tiled {tiled['peak_mb']:>6.1f} MB {tiled['elapsed_s']:>6.2f} s | "
+                  f"{a['category']}/{b['category']}, color distance "
+                  f"{report[key]['dominant_color_distance']:.1f}", file=sys.stderr)
+    return report
+
+
+async def upload(size: str, tone: str) -> Dict[str, Any]:
+    """Analyze a WIDTHxHEIGHT JPEG portrait through AnalysisService as an API and as a UI upload."""
+    width, height = (int(value) for value in size.split('x'))
+    # Print sizes are upscaled from the largest rendered portrait, rendering them directly takes GBs
+    rendered = RESOLUTIONS['large']
+    scale = max(1.0, width / rendered[0], height / rendered[1])
+    image = make_portrait(round(width / scale), round(height / scale), SKIN_TONES[tone])
+    if scale > 1:
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+    data = cv2.imencode('.jpg', cv2.cvtColor(image, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+    pool = WorkerPool(max_workers=1)
+    service = AnalysisService(ImageService(), ColorService(), pool, cache_size=0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'portrait.jpg')
+        with open(path, 'wb') as f:
+            f.write(data)
+        try:
+            api = await service.analyze_bytes(data)
+            ui = await service.analyze_file(path)
+        finally:
+            pool.shutdown()
+
+    report = {'megapixels': width * height / 1_000_000}
+    for name, result in (('api', api), ('ui', ui)):
+        tiled = result['analysis']['analysis_metadata'].get('tiled')
+        report[name] = {'tiled': tiled is not None, 'strips': tiled['strips'] if tiled else 0,
+                        'pixels_analyzed': result['analysis']['analysis_metadata']['pixels_analyzed'],
+                        'category': result['analysis']['category']}
+    report['ui']['image_size'] = list(ui['image'].shape[1::-1])
+    print(f"upload {size} ({report['megapixels']:.1f} MP): "
+          + ' | '.join(f"{name} {'tiled in ' + str(report[name]['strips']) + ' strips' if report[name]['tiled'] else 'not tiled'}"
+                       for name in ('api', 'ui'))
+          + f", UI image {report['ui']['image_size'][0]}x{report['ui']['image_size'][1]}", file=sys.stderr)
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', default=','.join(RESOLUTIONS), help='Comma-separated: ' + ', '.join(RESOLUTIONS))
+    parser.add_argument('--tones', default=','.join(SKIN_TONES), help='Comma-separated: ' + ', '.join(SKIN_TONES))
+    parser.add_argument('--tile-megapixels', type=float, help='Override TILE_MEGAPIXELS')
+    parser.add_argument('--print-size', default='6000x8000', help='Print-resolution upload that must be tiled')
+    parser.add_argument('--phone-size', default='3024x4032', help='Phone photo upload that must not be tiled')
+    parser.add_argument('--output', '-o', help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    if args.tile_megapixels:
+        settings.tile_megapixels = args.tile_megapixels
+    report = asyncio.run(run(args.resolutions.split(','), args.tones.split(',')))
+    uploads = {'print': asyncio.run(upload(args.print_size, 'medium')),
+               'phone': asyncio.run(upload(args.phone_size, 'medium'))}
+
+    payload = json.dumps({**report, 'uploads': uploads}, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+    failures = []
+    for key, result in report.items():
+        problems = [name for name in ('pixels_analyzed_equal', 'same_undertone', 'same_variance') if not result[name]]
+        if result['dominant_color_distance'] > MAX_COLOR_DISTANCE:
+            problems.append(f"color distance {result['dominant_color_distance']:.1f}")
+        if abs(result['confidence_delta']) > MAX_CONFIDENCE_DELTA:
+            problems.append(f"confidence delta {result['confidence_delta']:+.3f}")
+        if problems:
+            failures.append(f"{key}: {', '.join(problems)}")
+    if uploads['print']['megapixels'] <= settings.tiled_analysis_megapixels:
+        failures.append(f"print upload {args.print_size} is not over TILED_ANALYSIS_MEGAPIXELS")
+    for kind, tiled in (('print', True), ('phone', False)):
+        failures += [f"{kind} upload: {name} analysis was {'not ' if tiled else ''}tiled"
+                     for name in ('api', 'ui') if uploads[kind][name]['tiled'] != tiled]
+        width, height = uploads[kind]['ui']['image_size']
+        if width > settings.max_image_width or height > settings.max_image_height:
+            failures.append(f'{kind} upload: UI image {width}x{height} exceeds the display limits')
+    if failures:
+        print('Tiled analysis failed: ' + '; '.join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""Concurrent-session load generator for the NiceGUI app.
+
+Each simulated user behaves like a browser tab: it loads ``/``, opens the
+NiceGUI socket.io connection, uploads a portrait through the page's upload
+element and then drives the adjustment sliders and "Apply Changes" button.
+Completion of each interaction is detected from the notification the app
+sends back, so latencies are end-to-end (request -> analysis -> UI update).
+
+While sessions run, the harness samples:
+  * event-loop lag: round-trip time of a tiny static request served by the app
+  * server RSS: from /proc (Linux) or ``ps`` for the server PID
+
+Usage:
+    python -m benchmarks.load_test --spawn --sessions 10 --ramp 5
+    python -m benchmarks.load_test --url http://localhost:8000 --pid 1234 --sessions 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import cv2
+import httpx
+import socketio
+
+from benchmarks.synthetic import SKIN_TONES, make_portrait
+
+ANALYSIS_DONE = 'Analysis complete'
+ADJUST_DONE = 'Skin tone adjusted'
+SLIDER_EVENT = 'update:modelValue'  # NiceGUI camel-cases event names
+
+
+@dataclass
+class LoadStats:
+    """Latency samples and resource time series collected during a run."""
+    page_load_ms: List[float] = field(default_factory=list)
+    upload_ms: List[float] = field(default_factory=list)
+    adjust_ms: List[float] = field(default_factory=list)
+    failures: List[str] = field(default_factory=list)
+    loop_lag_ms: List[Dict[str, float]] = field(default_factory=list)
+    rss_mb: List[Dict[str, float]] = field(default_factory=list)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def pick(pct: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+    return {'count': len(ordered), 'p50': pick(50), 'p95': pick(95), 'p99': pick(99), 'max': ordered[-1]}
+
+
+def parse_page(html: str) -> Dict[str, Any]:
+    """Extract the client id, NiceGUI version and initial element tree from the page."""
+    raw = re.search(r'parseElements\(String\.raw`(.*?)`\)', html, re.S).group(1)
+    for entity, char in (('&#36;', '$'), ('&#96;', '`'), ('&gt;', '>'), ('&lt;', '<'), ('&amp;', '&')):
+        raw = raw.replace(entity, char)
+    return {
+        'client_id': re.search(r"client_id['\"]?\s*:\s*['\"]([0-9a-f-]+)", html).group(1),
+        'version': re.search(r'version: "([^"]+)"', html).group(1),
+        'elements': json.loads(raw),
+    }
+
+
+class SimulatedSession:
+    """One browser tab driving the app over HTTP + socket.io."""
+
+    def __init__(self, base_url: str, image_bytes: bytes, adjustments: int, timeout: float, stats: LoadStats,
+                 seed: int = 0):
+        self.base_url = base_url.rstrip('/')
+        self.image_bytes = image_bytes
+        self.adjustments = adjustments
+        self.timeout = timeout
+        self.stats = stats
+        self.rng = random.Random(seed)
+        self.elements: Dict[str, Dict[str, Any]] = {}
+        self.client_id: Optional[str] = None
+        self.notifications: asyncio.Queue = asyncio.Queue()
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on('update', self._on_update)
+        self.sio.on('notify', self._on_notify)
+
+    async def _on_update(self, message: Dict[str, Any]):
+        for element_id, element in message.items():
+            if element is None:
+                self.elements.pop(element_id, None)
+            else:
+                self.elements[element_id] = element
+
+    async def _on_notify(self, message: Dict[str, Any]):
+        await self.notifications.put(str(message.get('message', '')))
+
+    async def _wait_for(self, marker: str) -> None:
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError(f'no "{marker}" notification within {self.timeout:.0f}s')
+            message = await asyncio.wait_for(self.notifications.get(), remaining)
+            if marker in message:
+                return
+            # Errors and rate-limit rejections end the interaction straight away
+            if message.startswith(('❌', '⏳')):
+                raise RuntimeError(message)
+
+    def _find(self, predicate) -> List[str]:
+        return [element_id for element_id, element in self.elements.items() if predicate(element)]
+
+    def _listeners(self, element_id: str, event_type: str) -> List[str]:
+        listeners = [event['listener_id'] for event in self.elements[element_id].get('events', [])
+                     if event['type'] == event_type]
+        if not listeners:
+            raise LookupError(f'element {element_id} has no {event_type} listener')
+        return listeners
+
+    async def _emit(self, element_id: str, event_type: str, args: List[Any]):
+        # A browser fires every listener registered for the DOM event
+        for listener_id in self._listeners(element_id, event_type):
+            await self.sio.emit('event', {
+                'id': int(element_id),
+                'client_id': self.client_id,
+                'listener_id': listener_id,
+                'args': [json.dumps(arg) for arg in args],
+            })
+
+    async def run(self, http: httpx.AsyncClient):
+        start = time.perf_counter()
+        response = await http.get(self.base_url + '/')
+        response.raise_for_status()
+        page = parse_page(response.text)
+        self.stats.page_load_ms.append((time.perf_counter() - start) * 1000)
+
+        self.client_id = page['client_id']
+        self.elements = page['elements']
+
+        await self.sio.connect(
+            f'{self.base_url}?client_id={self.client_id}',
+            socketio_path='/_nicegui_ws/socket.io', transports=['websocket'], wait_timeout=self.timeout,
+        )
+        try:
+            await self.sio.call('handshake', {'client_id': self.client_id, 'tab_id': str(uuid.uuid4())},
+                                timeout=self.timeout)
+
+            # Upload through the page's upload element
+            upload_id = self._find(lambda e: '/upload/' in str(e.get('props', {}).get('url', '')))[0]
+            upload_url = self.elements[upload_id]['props']['url']
+            start = time.perf_counter()
+            response = await http.post(self.base_url + upload_url,
+                                       files={'file': ('portrait.jpg', self.image_bytes, 'image/jpeg')})
+            response.raise_for_status()
+            await self._wait_for(ANALYSIS_DONE)
+            self.stats.upload_ms.append((time.perf_counter() - start) * 1000)
+
+            # Drag sliders, then apply
+            for _ in range(self.adjustments):
+                sliders = self._find(lambda e: e.get('tag', '').lower() == 'q-slider')
+                apply_button = self._find(lambda e: e.get('props', {}).get('label') == 'Apply Changes'
+                                          or e.get('text') == 'Apply Changes')[0]
+                start = time.perf_counter()
+                for slider_id in self.rng.sample(sliders, k=min(2, len(sliders))):
+                    await self._emit(slider_id, SLIDER_EVENT, [self.rng.randint(-12, 12)])
+                await self._emit(apply_button, 'click', [])
+                try:
+                    await self._wait_for(ADJUST_DONE)
+                except RuntimeError as e:
+                    # The app reported the error and stays usable; keep driving the session
+                    self.stats.failures.append(f'adjust: {e}')
+                    continue
+                self.stats.adjust_ms.append((time.perf_counter() - start) * 1000)
+        finally:
+            await self.sio.disconnect()
+
+
+async def sample_server(base_url: str, probe_path: str, pid: Optional[int], stats: LoadStats,
+                        interval: float, stop: asyncio.Event):
+    """Probe loop lag and RSS until stopped."""
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=30) as http:
+        while not stop.is_set():
+            probe_start = time.perf_counter()
+            try:
+                await http.get(base_url + probe_path)
+                lag = (time.perf_counter() - probe_start) * 1000
+                stats.loop_lag_ms.append({'t': probe_start - start, 'ms': lag})
+            except httpx.HTTPError:
+                pass
+
+            rss = read_rss_mb(pid) if pid else None
+            if rss is not None:
+                stats.rss_mb.append({'t': time.perf_counter() - start, 'mb': rss})
+
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB (Linux /proc, falling back to ps)."""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        output = subprocess.run(['ps', '-o', 'rss=', '-p', str(pid)], capture_output=True, text=True, check=True)
+        return int(output.stdout.strip()) / 1024
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+
+
+def sample_images(count: int, directory: Optional[str]) -> List[bytes]:
+    """Portrait JPEGs to upload: from a directory, or synthetic ones."""
+    if directory:
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                       if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')))
+        images = []
+        for path in paths[:count]:
+            with open(path, 'rb') as f:
+                images.append(f.read())
+        if images:
+            return images
+
+    tones = list(SKIN_TONES.values())
+    images = []
+    for index in range(count):
+        portrait = make_portrait(720, 960, tones[index % len(tones)], seed=index)
+        ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(portrait, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 88])
+        images.append(encoded.tobytes())
+    return images
+
+
+async def wait_until_ready(base_url: str, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(timeout=5) as http:
+        while time.perf_counter() < deadline:
+            try:
+                if (await http.get(base_url + '/')).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f'server at {base_url} did not become ready')
+
+
+async def run_load(args) -> Dict[str, Any]:
+    stats = LoadStats()
+    images = sample_images(max(1, args.sessions), args.images)
+
+    async with httpx.AsyncClient(timeout=args.timeout) as http:
+        version = parse_page((await http.get(args.url + '/')).text)['version']
+    probe_path = args.probe or f'/_nicegui/{version}/static/nicegui.js'
+
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_server(args.url, probe_path, args.pid, stats, args.sample_interval, stop))
+
+    async def one_session(index: int):
+        await asyncio.sleep(args.ramp * index / max(1, args.sessions))
+        session = SimulatedSession(args.url, images[index % len(images)], args.adjustments, args.timeout, stats,
+                                   seed=index)
+        try:
+            async with httpx.AsyncClient(timeout=args.timeout) as http:
+                await session.run(http)
+        except Exception as e:
+            stats.failures.append(f'session {index}: {type(e).__name__}: {e}')
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_session(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await sampler
+
+    rss_values = [sample['mb'] for sample in stats.rss_mb]
+    return {
+        'sessions': args.sessions,
+        'adjustments_per_session': args.adjustments,
+        'elapsed_s': elapsed,
+        'failures': stats.failures,
+        'latency_ms': {
+            'page_load': percentiles(stats.page_load_ms),
+            'upload_to_results': percentiles(stats.upload_ms),
+            'adjust_to_results': percentiles(stats.adjust_ms),
+        },
+        'loop_lag_ms': percentiles([sample['ms'] for sample in stats.loop_lag_ms]),
+        'rss_mb': {'start': rss_values[0], 'peak': max(rss_values), 'end': rss_values[-1]} if rss_values else None,
+        'timeseries': {'loop_lag_ms': stats.loop_lag_ms, 'rss_mb': stats.rss_mb},
+    }
+
+
+def print_summary(report: Dict[str, Any]):
+    print(f"{report['sessions']} sessions in {report['elapsed_s']:.1f}s, {len(report['failures'])} failures", file=sys.stderr)
+    for name, summary in list(report['latency_ms'].items()) + [('loop_lag', report['loop_lag_ms'])]:
+        if summary.get('count'):
+            print(f"  {name:<20} n={summary['count']:<5} p50={summary['p50']:8.0f} ms  "
+                  f"p95={summary['p95']:8.0f} ms  p99={summary['p99']:8.0f} ms", file=sys.stderr)
+    if report['rss_mb']:
+        rss = report['rss_mb']
+        print(f"  rss                  start={rss['start']:.0f} MB  peak={rss['peak']:.0f} MB  end={rss['end']:.0f} MB",
+              file=sys.stderr)
+    for failure in report['failures'][:10]:
+        print(f'  ! {failure}', file=sys.stderr)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of a running app')
+    parser.add_argument('--spawn', action='store_true', help='Start `python main.py` locally for the run')
+    parser.add_argument('--pid', type=int, help='Server PID for RSS sampling (implied by --spawn)')
+    parser.add_argument('--sessions', '-n', type=int, default=5, help='Concurrent simulated browser sessions')
+    parser.add_argument('--ramp', type=float, default=2.0, help='Seconds over which sessions are started')
+    parser.add_argument('--adjustments', type=int, default=3, help='Slider adjustments applied per session')
+    parser.add_argument('--images', help='Directory of sample photos (default: synthetic portraits)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Per-interaction timeout in seconds')
+    parser.add_argument('--sample-interval', type=float, default=0.25, help='Seconds between lag/RSS samples')
+    parser.add_argument('--probe', help='Path used to probe event-loop lag (default: a NiceGUI static file)')
+    parser.add_argument('--rate-limits', action='store_true',
+                        help='Keep the rate limits of a --spawn server (off by default: all sessions share one IP)')
+    parser.add_argument('--output', '-o', help='Write the full JSON report (with time series) here')
+    args = parser.parse_args(argv)
+    args.url = args.url.rstrip('/')
+
+    server = None
+    if args.spawn:
+        port = args.url.rsplit(':', 1)[-1]
+        env = dict(os.environ, PORT=port, HOST='127.0.0.1')
+        if not args.rate_limits:
+            env['RATE_LIMIT_ENABLED'] = 'false'
+        server = subprocess.Popen([sys.executable, 'main.py'], env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        args.pid = server.pid
+
+    try:
+        asyncio.run(wait_until_ready(args.url))
+        report = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print_summary(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
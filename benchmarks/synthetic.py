@@ -0,0 +1,95 @@
+"""Deterministic synthetic portraits for benchmarks.
+
+Images are drawn from a fixed seed so every run (and every machine) times
+exactly the same pixels: a shaded background, a skin-colored face and neck
+with soft lighting, hair, eyes and mild sensor noise.
+"""
+from typing import Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+# Representative skin tones (RGB), light to deep
+SKIN_TONES: Dict[str, Tuple[int, int, int]] = {
+    'light': (241, 194, 160),
+    'medium': (198, 140, 100),
+    'deep': (110, 76, 56),
+}
+
+# (width, height) portrait resolutions
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    'small': (480, 640),
+    'hd': (1080, 1440),
+    'large': (3000, 4000),
+}
+
+
+def make_portrait(width: int, height: int, skin_rgb: Tuple[int, int, int], seed: int = 0) -> np.ndarray:
+    """Render an RGB uint8 portrait of the given size and skin tone."""
+    rng = np.random.default_rng(seed)
+
+    # Vertical background gradient
+    top = np.array([70, 90, 120], dtype=np.float32)
+    bottom = np.array([150, 160, 175], dtype=np.float32)
+    ramp = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+    image = np.broadcast_to(top + (bottom - top) * ramp, (height, width, 3)).copy()
+
+    cx, cy = width // 2, int(height * 0.42)
+    face_axes = (int(width * 0.22), int(height * 0.24))
+    skin = tuple(float(c) for c in skin_rgb)
+
+    # Shoulders, neck and face
+    cv2.ellipse(image, (cx, height), (int(width * 0.45), int(height * 0.22)), 0, 180, 360, (40, 40, 60), -1)
+    cv2.rectangle(image, (cx - face_axes[0] // 2, cy), (cx + face_axes[0] // 2, int(height * 0.8)), skin, -1)
+    cv2.ellipse(image, (cx, cy), face_axes, 0, 0, 360, skin, -1)
+
+    # Hair
+    cv2.ellipse(image, (cx, cy - face_axes[1] // 3), (int(face_axes[0] * 1.08), int(face_axes[1] * 0.8)),
+                0, 180, 360, (45, 30, 20), -1)
+
+    # Eyes and mouth
+    eye_dx, eye_y = face_axes[0] // 2, cy - face_axes[1] // 8
+    eye_axes = (max(2, face_axes[0] // 6), max(1, face_axes[1] // 14))
+    for ex in (cx - eye_dx, cx + eye_dx):
+        cv2.ellipse(image, (ex, eye_y), eye_axes, 0, 0, 360, (245, 245, 245), -1)
+        cv2.circle(image, (ex, eye_y), max(1, eye_axes[1]), (60, 40, 30), -1)
+    cv2.ellipse(image, (cx, cy + face_axes[1] // 2), (face_axes[0] // 3, max(1, face_axes[1] // 12)),
+                0, 0, 360, (170, 80, 80), -1)
+
+    # Soft side lighting and noise
+    light = np.linspace(1.08, 0.9, width, dtype=np.float32)[None, :, None]
+    image *= light
+    image += rng.normal(0.0, 4.0, image.shape).astype(np.float32)
+
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+class ScriptedFrameSource:
+    """Stands in for the browser camera in live mode: JPEG frames as the page would send them.
+
+    Follows a script of (seconds, skin tone) segments; within each the portrait
+    drifts sideways over a fixed background, so face boxes and clusters move
+    a little from frame to frame. Frames are rendered once and replayed.
+    """
+
+    def __init__(self, script: List[Tuple[float, str]], fps: float = 5.0, width: int = 320, quality: int = 70):
+        self.fps = fps
+        self.frames: List[bytes] = []
+        height = width * 3 // 4
+        for seconds, tone in script:
+            portrait = make_portrait(height * 3 // 4, height, SKIN_TONES[tone])
+            count = max(1, int(round(seconds * fps)))
+            for index in range(count):
+                frame = np.empty((height, width, 3), dtype=np.uint8)
+                frame[:] = (90, 110, 140)
+                left = int((width - portrait.shape[1]) * (0.5 + 0.3 * np.sin(index / fps)))
+                frame[:, left:left + portrait.shape[1]] = portrait
+                ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(frame, cv2.COLOR_RGB2BGR),
+                                           [cv2.IMWRITE_JPEG_QUALITY, quality])
+                self.frames.append(encoded.tobytes())
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.frames)
+
+    def __len__(self) -> int:
+        return len(self.frames)
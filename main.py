@@ -2,6 +2,10 @@ import os
 from dotenv import load_dotenv
 from nicegui import ui
 
+# Size the OpenCV/OpenMP/BLAS thread pools before NumPy and OpenCV load
+from app.core.concurrency import concurrency
+concurrency.configure()
+
 # Import the page definitions from app.main
 import app.main  # noqa: F401
 
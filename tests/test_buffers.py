@@ -0,0 +1,62 @@
+"""Steady-state allocations of pooled adjustments and analyses, measured with tracemalloc."""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.core.buffers import BufferPool
+from app.services.color_service import ColorService
+from app.services.image_service import ImageService
+from benchmarks.bench_buffers import CASES, PIL_FREE, traced_peak
+from benchmarks.synthetic import RESOLUTIONS, SKIN_TONES, make_portrait
+
+# NumPy's casting buffers take a few tens of KB whatever the image size
+MAX_ADJUST_BYTES = 128 * 1024
+WARM_UP_RUNS = 1
+STEADY_RUNS = 3
+
+
+@pytest.fixture(scope='module')
+def services():
+    colors = ColorService()
+    colors.warm_up()
+    return ImageService(), colors
+
+
+@pytest.fixture(scope='module')
+def portrait():
+    return make_portrait(*RESOLUTIONS['small'], SKIN_TONES['medium'])
+
+
+async def adjust_and_analyze(images, colors, image, adjustments, buffers):
+    """One slider move: the adjustment and the analysis of its result, with their peak allocations."""
+    out = buffers.take(image.shape) if buffers is not None else None
+    adjusted, adjust_peak = await traced_peak(images.adjust_skin_tone(image, adjustments, out=out, buffers=buffers))
+    _, analysis_peak = await traced_peak(colors.analyze_skin_tone(adjusted, buffers))
+    if buffers is not None:
+        buffers.give(adjusted)
+    return adjust_peak, analysis_peak
+
+
+@pytest.mark.parametrize('case', list(CASES))
+def test_pooled_steady_state_allocates_no_frames(services, portrait, case):
+    if settings.image_backend == 'pil' and case not in PIL_FREE:
+        pytest.skip('PIL brightness and saturation copy the image')
+    images, colors = services
+    adjustments = CASES[case]
+
+    async def run():
+        unpooled = [await adjust_and_analyze(images, colors, portrait, adjustments, None) for _ in range(STEADY_RUNS)]
+        buffers = BufferPool()
+        for _ in range(WARM_UP_RUNS):
+            await adjust_and_analyze(images, colors, portrait, adjustments, buffers)
+        misses = buffers.misses
+        pooled = [await adjust_and_analyze(images, colors, portrait, adjustments, buffers) for _ in range(STEADY_RUNS)]
+        return unpooled, pooled, buffers.misses - misses
+
+    unpooled, pooled, steady_misses = asyncio.run(run())
+
+    assert steady_misses == 0
+    assert max(adjust for adjust, _ in pooled) <= MAX_ADJUST_BYTES
+    # Skin pixel arrays are still allocated; the full-frame masks no longer are
+    assert max(analysis for _, analysis in pooled) <= max(analysis for _, analysis in unpooled)
@@ -0,0 +1,107 @@
+"""Live camera sessions driven by scripted frames instead of a camera."""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.color_service import ColorService
+from app.services.image_service import ImageService
+from app.services.live_service import LiveSession
+from app.services.worker_pool import WorkerPool
+from benchmarks.synthetic import ScriptedFrameSource
+
+# Generous enough that only the over-budget test runs out of time
+BUDGET_MS = 10_000
+FRAME_SHAPE = (settings.live_frame_width * 3 // 4, settings.live_frame_width)
+
+
+@pytest.fixture(scope='module')
+def services():
+    images, colors = ImageService(), ColorService()
+    images.warm_up()
+    colors.warm_up()
+    pool = WorkerPool()
+    yield images, colors, pool
+    pool.shutdown()
+
+
+@pytest.fixture(scope='module')
+def source():
+    return ScriptedFrameSource([(1.0, 'light'), (1.6, 'deep')], fps=5.0, width=settings.live_frame_width)
+
+
+def play(session: LiveSession, frames) -> list:
+    """Submit frames one after another, as a camera slower than the analysis would."""
+    async def run():
+        return [await session.submit(frame) for frame in frames]
+    return asyncio.run(run())
+
+
+def test_frames_arriving_during_an_analysis_are_dropped(services, source):
+    session = LiveSession(*services, budget_ms=BUDGET_MS)
+
+    async def burst():
+        return await asyncio.gather(*(session.submit(frame) for frame in source))
+
+    results = asyncio.run(burst())
+
+    assert session.counts == {'dropped': len(source) - 1, 'changed': 1}
+    assert sum(result is not None for result in results) == 1
+
+
+def test_frames_over_budget_are_abandoned_and_keep_the_shown_result(services, source):
+    session = LiveSession(*services, budget_ms=BUDGET_MS)
+    shown = play(session, source.frames[:1])[0]
+
+    session.budget = 0
+    results = play(session, source.frames[1:4])
+
+    assert results == [None, None, None]
+    assert session.counts == {'changed': 1, 'over_budget': 3}
+    assert session.key == (shown['analysis']['category'], shown['analysis']['undertone'])
+
+
+def test_warm_starts_carry_over_between_frames(services, source, monkeypatch):
+    images, colors, pool = services
+    session = LiveSession(images, colors, pool, budget_ms=BUDGET_MS)
+    given, returned, searched = [], [], []
+    analyze_frame_pixels, detect_face = colors.analyze_frame_pixels, images.detect_face
+
+    async def recording_analyze(pixels, centers=None):
+        given.append(centers)
+        analysis, centers = await analyze_frame_pixels(pixels, centers)
+        returned.append(centers)
+        return analysis, centers
+
+    def recording_detect(gray):
+        searched.append(gray.shape)
+        return detect_face(gray)
+
+    monkeypatch.setattr(colors, 'analyze_frame_pixels', recording_analyze)
+    monkeypatch.setattr(images, 'detect_face', recording_detect)
+
+    boxes = []
+    for frame in source:
+        boxes.append(session.box)
+        searched.clear()
+        play(session, [frame])
+        # A face found in the previous frame is searched for around its box first
+        if boxes[-1] is not None:
+            assert searched[0] != FRAME_SHAPE
+
+    assert any(box is not None for box in boxes)
+    assert given[0] is None
+    assert all(centers is previous for centers, previous in zip(given[1:], returned))
+
+
+def test_recommendations_are_pushed_only_when_the_result_changes(services, source):
+    session = LiveSession(*services, budget_ms=BUDGET_MS)
+    results = play(session, source)
+
+    pushed = [(result['analysis']['category'], result['analysis']['undertone'])
+              for result in results if result['recommendations'] is not None]
+    assert results[0]['recommendations'] is not None
+    assert all(key != previous for key, previous in zip(pushed[1:], pushed))
+    # The light segment has a one-frame blip to another category; it is not pushed
+    assert [category for category, _ in pushed] == ['Light', 'Dark']
+    assert session.counts == {'changed': 2, 'unchanged': len(source) - 2}